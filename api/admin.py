@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import BlogPost, BlogSummary, BlogSpecifications, BlogSection, StoreRequest
+from .signals import blog_atomic
 
 
 class BlogSummaryInline(admin.StackedInline):
@@ -24,6 +25,19 @@ class BlogPostAdmin(admin.ModelAdmin):
     prepopulated_fields = {'slug': ('title',)}
     inlines = [BlogSummaryInline, BlogSpecsInline, BlogSectionInline]
 
+    # Une écriture annulée oublie ses reconstructions programmées (api/signals.py)
+    def changeform_view(self, request, *args, **kwargs):
+        with blog_atomic():
+            return super().changeform_view(request, *args, **kwargs)
+
+    def changelist_view(self, request, *args, **kwargs):
+        with blog_atomic():
+            return super().changelist_view(request, *args, **kwargs)
+
+    def delete_view(self, request, *args, **kwargs):
+        with blog_atomic():
+            return super().delete_view(request, *args, **kwargs)
+
 
 @admin.register(StoreRequest)
 class StoreRequestAdmin(admin.ModelAdmin):
@@ -0,0 +1,91 @@
+"""
+============================================
+API/HELPERS/BLOG.PY
+============================================
+Détail d'article matérialisé : le JSON complet de GET /api/v1/blog/<slug>/ est
+construit une fois (à l'enregistrement, via api/signals.py) puis servi depuis le cache.
+
+- build_post_detail()   : payload complet (post + résumé + specs + sections), URLs relatives,
+                          en 2 requêtes quel que soit le nombre de sections
+- get_post_detail()     : lecture cache, reconstruction si absent (None si article inconnu)
+- refresh_post_detail() : reconstruit et réécrit l'entrée d'un article
+- invalidate_post_detail() : supprime l'entrée d'un slug
+- absolutize_media()    : URLs média relatives → absolues pour la requête courante
+
+Les URLs d'images sont stockées relatives (/media/…) : une même entrée sert tous
+les hôtes, l'URL absolue est reconstruite avec un seul build_absolute_uri().
+"""
+
+from django.conf import settings
+from django.db.models import Prefetch
+
+from ..models import BlogPost, BlogSection
+from ..serializers import BlogPostDetailSerializer
+from .cache import delete_cached, get_cached, make_key, set_cached
+from .images import absolutize_variants
+
+NAMESPACE = 'blog_detail'
+
+# Champs du payload contenant une URL média (relative tant que non absolutisée)
+MEDIA_FIELDS = ('image', 'banner')
+VARIANT_FIELDS = ('image_variants', 'banner_variants')
+
+# Colonnes lues pour les sections (celles de BlogSectionSerializer + clé de jointure)
+SECTION_FIELDS = ('id', 'post_id', 'order', 'h2_title', 'paragraph', 'image', 'banner', 'banner_url')
+
+
+def post_detail_key(slug: str) -> str:
+    return make_key(NAMESPACE, slug)
+
+
+def build_post_detail(slug: str):
+    try:
+        post = (
+            BlogPost.objects
+            .select_related('summary', 'specs')
+            .prefetch_related(Prefetch(
+                'sections',
+                queryset=BlogSection.objects.only(*SECTION_FIELDS).order_by('order', 'id'),
+            ))
+            .get(slug=slug)
+        )
+    except BlogPost.DoesNotExist:
+        return None
+    return BlogPostDetailSerializer(post).data
+
+
+def refresh_post_detail(slug: str):
+    payload = build_post_detail(slug)
+    if payload is None:
+        delete_cached(post_detail_key(slug))
+    else:
+        set_cached(NAMESPACE, post_detail_key(slug), payload)
+    return payload
+
+
+def invalidate_post_detail(slug: str) -> None:
+    delete_cached(post_detail_key(slug))
+
+
+def get_post_detail(slug: str):
+    payload = get_cached(NAMESPACE, post_detail_key(slug))
+    if payload is None:
+        payload = refresh_post_detail(slug)
+    return payload
+
+
+def _absolute(url, base: str):
+    if isinstance(url, str) and url.startswith(settings.MEDIA_URL):
+        return base + url
+    return url
+
+
+def absolutize_media(payload: dict, base: str) -> dict:
+    """Préfixe par `base` (scheme + hôte) les URLs média du payload (post et sections)."""
+    payload = {k: _absolute(v, base) if k in MEDIA_FIELDS else v for k, v in payload.items()}
+    for field in VARIANT_FIELDS:
+        if payload.get(field):
+            payload[field] = absolutize_variants(payload[field], lambda url: _absolute(url, base))
+    if payload.get('sections'):
+        payload['sections'] = [absolutize_media(s, base) for s in payload['sections']]
+    return payload
@@ -0,0 +1,145 @@
+"""
+============================================
+API/HELPERS/BREAKER.PY
+============================================
+Disjoncteurs par boutique (par process).
+
+Deux disjoncteurs par store :
+- store  : le cluster répond-il ? (erreurs réseau, sélection de serveur)
+- search : l'index Atlas Search "Text" répond-il ? (toute erreur de $search)
+
+Un maxTimeMS dépassé (ExecutionTimeout, budget de la requête : helpers/deadline.py)
+ne compte pour aucun des deux : le cluster a répondu, seule cette requête est
+partielle. Quelques requêtes coûteuses n'ouvrent pas le disjoncteur de toute la boutique.
+
+Après `failures` échecs consécutifs, le disjoncteur s'ouvre pendant `cooldown` secondes :
+les requêtes n'essaient plus le store (résultat partiel, meta.boutiques_indisponibles)
+ou passent directement au fallback regex, au lieu d'attendre un timeout de 5 à 20 s.
+À la fin du cooldown, une seule requête sonde le store (half-open) : succès → fermé,
+échec → rouvert pour un nouveau cooldown.
+
+- circuit_allows(store, kind)         : la requête peut-elle appeler le store ? (peut lancer la sonde)
+- circuit_closed(store, kind)         : état fermé, sans consommer la sonde (appels annexes)
+- circuit_record(store, error, kind)  : résultat de l'appel (error=None : succès)
+- is_store_failure(error)             : erreur qui met en cause le cluster
+- is_request_timeout(error)           : maxTimeMS dépassé (réponse partielle, pas une panne)
+"""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+from pymongo.errors import ConnectionFailure, ExecutionTimeout
+
+from .metrics import counter, gauge
+
+logger = logging.getLogger('api')
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+BREAKER_STATE = gauge(
+    'toprix_breaker_state',
+    "État des disjoncteurs (0 = fermé, 1 = sonde en cours, 2 = ouvert)",
+    ('store', 'kind'),
+)
+BREAKER_REJECTED = counter(
+    'toprix_breaker_rejected_total',
+    "Appels évités par un disjoncteur ouvert",
+    ('store', 'kind'),
+)
+
+
+class StoreUnavailable(Exception):
+    """Appel non tenté : disjoncteur ouvert."""
+
+
+def is_store_failure(error: Exception) -> bool:
+    """Erreur qui met en cause le cluster (réseau, ServerSelectionTimeoutError), pas la requête."""
+    return isinstance(error, ConnectionFailure)
+
+
+def is_request_timeout(error: Exception) -> bool:
+    """maxTimeMS dépassé : budget de la requête épuisé, le store n'est pas en cause."""
+    return isinstance(error, ExecutionTimeout)
+
+
+class CircuitBreaker:
+
+    def __init__(self, store: str, kind: str, failures: int, cooldown: float):
+        self.store = store
+        self.kind = kind
+        self.threshold = failures
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            logger.warning("Disjoncteur %s/%s : %s → %s", self.store, self.kind, self.state, state)
+        self.state = state
+        BREAKER_STATE.set(STATE_VALUES[state], store=self.store, kind=self.kind)
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            # Ouvert et cooldown écoulé, ou sonde restée sans réponse : cette requête sonde
+            if time.monotonic() - self.opened_at >= self.cooldown:
+                self.opened_at = time.monotonic()
+                self._set_state(HALF_OPEN)
+                return True
+        BREAKER_REJECTED.inc(store=self.store, kind=self.kind)
+        return False
+
+    def record(self, error: Exception = None) -> None:
+        with self._lock:
+            if error is None:
+                self.failures = 0
+                if self.state != CLOSED:
+                    self._set_state(CLOSED)
+                return
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+                self._set_state(OPEN)
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def _breaker(store: str, kind: str) -> CircuitBreaker:
+    key = (store.lower(), kind)
+    breaker = _breakers.get(key)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(key)
+            if breaker is None:
+                cfg = settings.CIRCUIT_BREAKER[kind]
+                breaker = _breakers[key] = CircuitBreaker(key[0], kind, cfg['failures'], cfg['cooldown'])
+    return breaker
+
+
+def circuit_allows(store: str, kind: str = 'store') -> bool:
+    return _breaker(store, kind).allow()
+
+
+def circuit_closed(store: str, kind: str = 'store') -> bool:
+    return _breaker(store, kind).state == CLOSED
+
+
+def circuit_record(store: str, error: Exception = None, kind: str = 'store') -> None:
+    """
+    Résultat d'un appel. Un maxTimeMS dépassé n'est compté ni comme échec ni comme succès.
+    Pour kind='store', seules les erreurs is_store_failure() comptent : une autre erreur
+    prouve que le cluster a répondu (succès).
+    """
+    if error is not None and is_request_timeout(error):
+        return
+    if kind == 'store' and error is not None and not is_store_failure(error):
+        error = None
+    _breaker(store, kind).record(error)
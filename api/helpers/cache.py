@@ -0,0 +1,138 @@
+"""
+============================================
+API/HELPERS/CACHE.PY
+============================================
+Cache des réponses de l'API (backend Django `default`).
+
+- make_key()   : clé stable `toprix:<namespace>:<md5>` à partir de paramètres
+- get_cached() : lecture + comptage hit / miss par namespace
+- peek_cached() : lecture sans comptage
+- set_cached() : écriture avec la durée CACHE_TIMES[namespace] (0 : pas d'écriture), tags optionnels
+- delete_cached() : invalidation d'une entrée
+- invalidate_tags() : invalidation de toutes les entrées portant un des tags
+- tag_versions() : versions courantes de tags (états en mémoire, cf. api/helpers/presence.py)
+
+Namespaces = clés de settings.CACHE_TIMES :
+search_results, product_detail, category_list, brand_list, blog_detail.
+
+Tags (ex : `produit:<id>`, `ref:<référence>`, `marque:<nom>`, `store:<boutique>`) :
+chaque tag a une version dans le cache ; une entrée taguée mémorise les versions
+de ses tags à l'écriture et devient un miss dès qu'une d'elles a changé.
+Invalider un tag = lui donner une nouvelle version (une écriture, pas de parcours).
+Les versions vivent dans l'alias de cache `tags` (CACHE_TAG_MAX_ENTRIES entrées) : une
+page de recherche porte 20 à 40 tags, et les réponses ne doivent pas les évincer.
+Une version évincée est recréée avec une valeur neuve : l'éviction invalide, elle ne
+ressuscite jamais une entrée périmée.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+
+from .metrics import counter
+
+CACHE_REQUESTS = counter(
+    'toprix_cache_requests_total',
+    "Lectures du cache par namespace et résultat (hit / miss)",
+    ('namespace', 'result'),
+)
+
+
+def make_key(namespace: str, *parts) -> str:
+    """
+    Clé de cache stable. Les QueryDict / dict sont normalisés (paramètres triés)
+    pour que ?a=1&b=2 et ?b=2&a=1 partagent la même entrée.
+    """
+    normalized = []
+    for part in parts:
+        if hasattr(part, 'lists'):          # QueryDict
+            part = sorted((k, sorted(v)) for k, v in part.lists())
+        elif isinstance(part, dict):
+            part = sorted(part.items())
+        normalized.append(repr(part))
+    digest = hashlib.md5('|'.join(normalized).encode('utf-8')).hexdigest()
+    return f"toprix:{namespace}:{digest}"
+
+
+TAGGED = '__tags__'  # enveloppe {TAGGED: {clé de tag: version}, 'value': valeur}
+
+
+def _tag_key(tag: str) -> str:
+    return f"toprix:tag:{hashlib.md5(tag.encode('utf-8')).hexdigest()}"
+
+
+def _tags_cache():
+    return caches['tags']
+
+
+def _tag_versions(tag_keys):
+    """
+    Versions courantes des tags ; les tags inconnus reçoivent une version neuve.
+    Retourne (toutes les versions, versions déjà existantes).
+    """
+    existing = _tags_cache().get_many(tag_keys)
+    missing = {k: time.time_ns() for k in tag_keys if k not in existing}
+    if missing:
+        _tags_cache().set_many(missing, None)
+    return {**existing, **missing}, existing
+
+
+def _read(key: str):
+    """Valeur valide de `key` : (valeur ou None, périmée ?)."""
+    value = cache.get(key)
+    if isinstance(value, dict) and TAGGED in value:
+        stored = value[TAGGED]
+        if stored and _tags_cache().get_many(list(stored)) != stored:
+            return None, True
+        value = value['value']
+    return value, False
+
+
+def get_cached(namespace: str, key: str):
+    value, stale = _read(key)
+    result = 'stale' if stale else 'miss' if value is None else 'hit'
+    CACHE_REQUESTS.inc(namespace=namespace, result=result)
+    return value
+
+
+def peek_cached(key: str):
+    """Comme get_cached, sans compter la lecture (attente active : api/helpers/singleflight.py)."""
+    return _read(key)[0]
+
+
+def cache_epoch() -> int:
+    """Instant de début de calcul d'une réponse, à passer à set_cached(since=...)."""
+    return time.time_ns()
+
+
+def set_cached(namespace: str, key: str, value, timeout: int = None, tags=(), since: int = None) -> None:
+    """
+    `since` (cache_epoch() pris avant les lectures MongoDB) : si un des tags a été
+    invalidé pendant le calcul, la réponse est peut-être déjà périmée → non mise en cache.
+    """
+    if timeout is None:
+        timeout = settings.CACHE_TIMES[namespace]
+    if not timeout:
+        return
+    if tags:
+        versions, existing = _tag_versions([_tag_key(t) for t in set(tags)])
+        if since is not None and any(v > since for v in existing.values()):
+            return
+        value = {TAGGED: versions, 'value': value}
+    cache.set(key, value, timeout)
+
+
+def invalidate_tags(tags) -> None:
+    now = time.time_ns()
+    _tags_cache().set_many({_tag_key(t): now for t in set(tags)}, None)
+
+
+def tag_versions(tags) -> dict:
+    """Versions courantes des tags : un changement de valeur = au moins un tag invalidé."""
+    return _tag_versions([_tag_key(t) for t in set(tags)])[0]
+
+
+def delete_cached(key: str) -> None:
+    cache.delete(key)
@@ -0,0 +1,147 @@
+"""
+============================================
+API/HELPERS/COMPARATIF.PY
+============================================
+Offres comparatif matérialisées (collection sidecar `comparatif_offers`).
+
+Un document comparatif brut stocke les 3 boutiques à plat (16 champs "Prix Mytek",
+"URL Tunisianet"…, prix en texte). build_offer() le normalise une fois pour toutes :
+    {_id, Slug, nom, marque, reference, image, prix_min, prix_max,
+     offres: [{boutique, prix, stock, url, image}, ...] triées par prix, built_at}
+
+- build_offer()        : document matérialisé à partir d'un document comparatif
+- get_offer()          : lecture indexée par Slug (sidecar, sinon calcul à la volée)
+- sync_offer()         : mise à jour incrémentale d'une entrée (watcher change streams)
+- rebuild_all_offers() : reconstruction complète (manage.py build_comparatif_offers)
+
+Sans watcher vivant sur comparatif (api/helpers/invalidation.py), une entrée de la sidecar
+plus vieille que COMPARATIF_OFFERS['max_age'] n'est plus servie : l'offre est recalculée
+depuis comparatif (prix jamais plus anciens que le dernier build + max_age).
+"""
+
+import os
+import time
+
+from django.conf import settings
+
+from db.mongo import get_comparatif, get_comparatif_offers
+from .deadline import max_time_ms
+from .search import safe_price
+
+# Mapping des champs comparatif
+COMPARATIF_KEYS = {
+    'reference':        'Réf Mytek',
+    'mytek_nom':        'Produit Mytek',
+    'mytek_prix':       'Prix Mytek',
+    'mytek_stock':      'Stock Mytek',
+    'mytek_url':        'URL Mytek',
+    'mytek_image':      'Image Mytek',
+    'tunisianet_nom':   'Produit Tunisianet',
+    'tunisianet_prix':  'Prix Tunisianet',
+    'tunisianet_stock': 'Stock Tunisianet',
+    'tunisianet_url':   'URL Tunisianet',
+    'tunisianet_image': 'Image Tunisianet',
+    'spacenet_nom':     'Produit Spacenet',
+    'spacenet_prix':    'Prix Spacenet',
+    'spacenet_stock':   'Stock Spacenet',
+    'spacenet_url':     'URL Spacenet',
+    'spacenet_image':   'Image Spacenet',
+}
+
+# Champs lus dans comparatif pour construire une offre
+SOURCE_PROJECTION = {'Slug': 1, **{field: 1 for field in COMPARATIF_KEYS.values()}}
+
+STORES = (('mytek', 'Mytek'), ('tunisianet', 'Tunisianet'), ('spacenet', 'Spacenet'))
+
+
+def build_offer(doc: dict) -> dict:
+    """Normalise un document comparatif (offres triées par prix croissant)."""
+    d = {key: doc.get(val) for key, val in COMPARATIF_KEYS.items()}
+
+    nom = d['mytek_nom'] or d['tunisianet_nom'] or d['spacenet_nom'] or ''
+    offres = []
+    for store_key, label in STORES:
+        prix = safe_price(d[f'{store_key}_prix'])
+        if prix:
+            offres.append({
+                'boutique': label,
+                'prix': prix,
+                'stock': d[f'{store_key}_stock'] or '',
+                'url': d[f'{store_key}_url'] or '',
+                'image': d[f'{store_key}_image'] or '',
+            })
+    offres.sort(key=lambda x: x['prix'])
+
+    return {
+        '_id': doc['_id'],
+        'Slug': doc.get('Slug', ''),
+        'nom': nom,
+        'marque': nom.split()[0].title() if nom else '',  # premier mot du nom
+        'reference': d['reference'] or '',
+        'image': d['mytek_image'] or d['tunisianet_image'] or d['spacenet_image'] or '',
+        'prix_min': offres[0]['prix'] if offres else None,
+        'prix_max': offres[-1]['prix'] if offres else None,
+        'offres': offres,
+        'built_at': time.time(),
+    }
+
+
+def _fresh(offer: dict) -> bool:
+    """Entrée de la sidecar servable : tenue à jour par le watcher, ou assez récente."""
+    from .invalidation import watcher_alive  # import tardif : invalidation importe ce module
+
+    if watcher_alive('comparatif'):
+        return True
+    return time.time() - offer.get('built_at', 0) <= settings.COMPARATIF_OFFERS['max_age']
+
+
+def get_offer(slug: str):
+    """
+    Offre matérialisée d'un Slug ; calculée depuis comparatif si la sidecar n'a pas
+    (encore) l'entrée ou si elle est trop ancienne sans watcher.
+    """
+    offer = get_comparatif_offers().find_one({'Slug': slug}, max_time_ms=max_time_ms(2))
+    if offer is None or not _fresh(offer):
+        doc = get_comparatif().find_one({'Slug': slug}, SOURCE_PROJECTION, max_time_ms=max_time_ms())
+        offer = build_offer(doc) if doc else None
+    return offer
+
+
+def sync_offer(doc_id, doc) -> None:
+    """Répercute un changement comparatif (doc=None : document supprimé)."""
+    offers = get_comparatif_offers()
+    if doc is None:
+        offers.delete_one({'_id': doc_id})
+    else:
+        offers.replace_one({'_id': doc_id}, build_offer(doc), upsert=True)
+
+
+def rebuild_all_offers(batch_size: int = 1000) -> int:
+    """
+    Reconstruit toute la sidecar dans une collection temporaire, puis la renomme
+    par-dessus l'ancienne (échange atomique : les lectures voient l'ancienne ou la
+    nouvelle version, jamais une collection à moitié remplie). Les produits disparus
+    de comparatif disparaissent avec l'ancienne collection.
+    Retourne le nombre d'offres écrites.
+    """
+    offers = get_comparatif_offers()
+    tmp = offers.database[f"{offers.name}_build_{os.getpid()}"]
+    tmp.drop()
+    batch, total = [], 0
+    for doc in get_comparatif().find({}, SOURCE_PROJECTION):
+        batch.append(build_offer(doc))
+        if len(batch) >= batch_size:
+            tmp.insert_many(batch, ordered=False)
+            total += len(batch)
+            batch = []
+    if batch:
+        tmp.insert_many(batch, ordered=False)
+        total += len(batch)
+    if not total:
+        tmp.drop()
+        offers.delete_many({})
+        return 0
+    tmp.create_index('Slug')
+    tmp.rename(offers.name, dropTarget=True)
+    get_comparatif().create_index('Slug')
+    return total
@@ -0,0 +1,152 @@
+"""
+============================================
+API/HELPERS/COUNTS.PY
+============================================
+Nombre total de résultats (meta.total_items) sans charger les documents.
+
+Les listes ne chargent que la fenêtre utile à la page demandée ; le total vient d'un
+comptage par boutique, lancé dans un pool de threads pendant que la requête de page
+s'exécute :
+- recherche texte Atlas Search → $searchMeta count (mode lowerBound) ; requête multi-mots :
+  $search + $match de pertinence (relevance_match, mêmes documents que les pages affichées)
+- autres filtres               → count_documents (index category / brand / reference)
+
+Les comptages héritent du budget de la requête (helpers/deadline.py, maxTimeMS).
+Pas de comptage vers une boutique dont le disjoncteur n'est pas fermé (helpers/breaker.py).
+
+Chaque comptage s'arrête à RESULT_COUNTS['threshold'] : au-delà, le total est un
+minimum (meta.total_estime). Les comptages sont mis en cache séparément des pages
+(namespace result_counts) : changer de page ou de tri ne recompte pas.
+
+- start_count() : lance (ou relit du cache) le comptage d'une boutique → Future
+- sum_counts()  : attend les comptages → (total, exact), None si l'un a échoué
+"""
+
+import contextvars
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+from django.conf import settings
+
+from .breaker import StoreUnavailable, circuit_closed, circuit_record
+from .cache import cache_epoch, get_cached, make_key, set_cached
+from .deadline import expired, time_limit
+from .timing import timed
+
+logger = logging.getLogger('api')
+
+NAMESPACE = 'result_counts'
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor, _executor_pid
+    # Recréé après un fork (workers gunicorn / Passenger) : les threads ne sont pas hérités
+    if _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(settings.RESULT_COUNTS['workers'], thread_name_prefix='counts')
+                _executor_pid = os.getpid()
+    return _executor
+
+
+def search_meta_count_pipeline(compound: dict) -> list:
+    """Comptage Atlas Search (opérateur = compound de build_text_search_compound)."""
+    return [{
+        '$searchMeta': {
+            'index': 'Text',
+            'compound': compound,
+            'count': {'type': 'lowerBound', 'threshold': settings.RESULT_COUNTS['threshold']},
+        }
+    }]
+
+
+def count_documents(col, query: dict) -> int:
+    return col.count_documents(query, limit=settings.RESULT_COUNTS['threshold'], **time_limit())
+
+
+def search_relevance_count_pipeline(compound: dict, relevance: dict) -> list:
+    """Comptage Atlas Search restreint aux documents gardés par le filtre de pertinence."""
+    return [
+        {'$search': {'index': 'Text', 'compound': compound}},
+        {'$match': relevance},
+        {'$limit': settings.RESULT_COUNTS['threshold']},
+        {'$count': 'total'},
+    ]
+
+
+def count_text(col, compound: dict, fallback_query: dict, relevance: dict = None) -> int:
+    """
+    $searchMeta count (ou $search + $match si `relevance`), ou count_documents(fallback_query)
+    si Atlas Search est indisponible (le titre contient la requête entière : toujours pertinent).
+    """
+    try:
+        if relevance is not None:
+            docs = list(col.aggregate(search_relevance_count_pipeline(compound, relevance), **time_limit()))
+            return docs[0]['total'] if docs else 0
+        docs = list(col.aggregate(search_meta_count_pipeline(compound), **time_limit()))
+    except Exception:
+        return count_documents(col, fallback_query)
+    count = (docs[0].get('count') if docs else None) or {}
+    return count.get('lowerBound', count.get('total', 0))
+
+
+def start_count(store_name: str, parts, count) -> Future:
+    """
+    Comptage d'une boutique : `count()` exécuté dans le pool (contexte de la requête
+    copié → durées reportées dans Server-Timing, étape `count`). `parts` identifie le
+    comptage dans le cache (boutique comprise).
+    """
+    key = make_key(NAMESPACE, store_name, *parts)
+    cached = get_cached(NAMESPACE, key)
+    if cached is not None or expired() or not circuit_closed(store_name):
+        # Budget épuisé, ou disjoncteur ouvert / en sonde (la page seule sonde le store) : pas de total exact
+        future = Future()
+        if cached is not None:
+            future.set_result(cached)
+        else:
+            future.set_exception(StoreUnavailable(store_name))
+        return future
+
+    def run():
+        epoch = cache_epoch()
+        with timed('count', store_name):
+            try:
+                total = count()
+            except Exception as e:
+                circuit_record(store_name, e)
+                raise
+        set_cached(NAMESPACE, key, total, tags={f"store:{store_name.lower()}"}, since=epoch)
+        return total
+
+    return _pool().submit(contextvars.copy_context().run, run)
+
+
+def sum_counts(futures: dict):
+    """
+    Attend les comptages {store: Future} (RESULT_COUNTS['timeout'] au plus).
+    Retourne (total, exact), ou None si un comptage a échoué ou n'a pas fini à temps.
+    """
+    if not futures:
+        return None
+    done, pending = wait(futures.values(), timeout=settings.RESULT_COUNTS['timeout'])
+    if pending:
+        logger.warning("Comptage des résultats trop long : %s", ', '.join(
+            store for store, future in futures.items() if future in pending))
+        return None
+    total, exact = 0, True
+    threshold = settings.RESULT_COUNTS['threshold']
+    for store, future in futures.items():
+        try:
+            count = future.result()
+        except Exception as e:
+            logger.warning("Comptage des résultats impossible pour %s : %s", store, e)
+            return None
+        total += count
+        exact = exact and count < threshold
+    return total, exact
@@ -0,0 +1,92 @@
+"""
+============================================
+API/HELPERS/DEADLINE.PY
+============================================
+Budget de temps par requête, propagé aux requêtes MongoDB (maxTimeMS).
+
+Un endpoint décoré par @request_deadline dispose de REQUEST_DEADLINE['budgets'][endpoint]
+secondes (défaut : REQUEST_DEADLINE['default']) pour tout son travail MongoDB. Chaque
+appel reçoit sa part du temps restant : max_time_ms(parts) = restant / parts, où
+`parts` est le nombre d'appels séquentiels encore prévus (stores restants, étapes de
+fallback). Le serveur abandonne de lui-même une requête dont plus personne ne lira le
+résultat (ExecutionTimeout côté client), et un fallback qui démarrerait après
+l'échéance n'est pas lancé (expired()) : la boutique manque au résultat (meta.partiel).
+
+Le budget est porté par un ContextVar : les comptages lancés en threads
+(api/helpers/counts.py) copient le contexte et héritent de la même échéance.
+Hors requête décorée (shell, commandes), max_time_ms() renvoie None : pas de limite.
+
+- request_deadline(endpoint) : décorateur de vue
+- remaining() / expired()    : temps restant (s) / échéance dépassée
+- deadline_passed(store)     : expired(), compté dans toprix_deadline_skipped_total
+- max_time_ms(parts)         : maxTimeMS d'un appel (find / find_one : max_time_ms=…)
+- time_limit(parts)          : {'maxTimeMS': …} à passer à aggregate / count_documents
+"""
+
+import time
+from contextvars import ContextVar
+from functools import wraps
+from typing import Optional
+
+from django.conf import settings
+
+from .metrics import counter
+
+DEADLINE_SKIPPED = counter(
+    'toprix_deadline_skipped_total',
+    "Appels MongoDB non lancés : budget de la requête épuisé",
+    ('store',),
+)
+
+# Échéance (time.monotonic()) de la requête courante
+_deadline: ContextVar[Optional[float]] = ContextVar('toprix_request_deadline', default=None)
+
+
+def request_deadline(endpoint: str):
+    """Décorateur de vue : ouvre le budget de `endpoint` (un budget englobant plus court l'emporte)."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            cfg = settings.REQUEST_DEADLINE
+            if not cfg['enabled']:
+                return view(request, *args, **kwargs)
+            deadline = time.monotonic() + cfg['budgets'].get(endpoint, cfg['default'])
+            outer = _deadline.get()
+            token = _deadline.set(deadline if outer is None else min(outer, deadline))
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                _deadline.reset(token)
+        return wrapper
+    return decorator
+
+
+def remaining() -> Optional[float]:
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def deadline_passed(store: str) -> bool:
+    """Vrai si l'appel vers `store` ne doit plus être lancé."""
+    if expired():
+        DEADLINE_SKIPPED.inc(store=store.lower())
+        return True
+    return False
+
+
+def max_time_ms(parts: int = 1) -> Optional[int]:
+    """Part du temps restant pour un appel parmi `parts` appels séquentiels (au moins min_query_ms)."""
+    left = remaining()
+    if left is None:
+        return None
+    return max(int(left * 1000 / max(parts, 1)), settings.REQUEST_DEADLINE['min_query_ms'])
+
+
+def time_limit(parts: int = 1) -> dict:
+    ms = max_time_ms(parts)
+    return {} if ms is None else {'maxTimeMS': ms}
@@ -0,0 +1,147 @@
+"""
+============================================
+API/HELPERS/FACETS.PY
+============================================
+Facettes de recherche (GET /api/v1/produits/facets/) : nombre de produits par
+boutique, marque, catégorie, tranche de prix et en stock, pour les filtres courants.
+
+Une seule requête par boutique :
+- recherche texte Atlas Search → $searchMeta (collecteur facet, même opérateur compound
+  que la liste ; l'index "Text" doit mapper brand / category / etat_stock en
+  stringFacet (ou token) et price en number)
+- sinon (référence, catégorie / marque, fallback regex) → $match + $facet
+
+- mongo_facet_pipeline()  : pipeline $match + $facet
+- search_meta_pipeline()  : pipeline $searchMeta
+- parse_mongo_facets() / parse_search_meta() : résultat normalisé d'une boutique
+- merge_facets()          : fusion des boutiques → payload de l'API
+"""
+
+from typing import Dict, List
+
+# Bornes des tranches de prix (DT) ; au-delà de la dernière : tranche ouverte
+PRICE_BOUNDARIES = [0, 100, 250, 500, 1000, 2000, 5000]
+# Valeurs conservées par facette (marques, catégories) et par boutique
+FACET_LIMIT = 30
+IN_STOCK = 'En stock'
+
+OPEN_BUCKET = 'autre'
+
+
+def mongo_facet_pipeline(match: dict) -> List[Dict]:
+    """Comptages en une agrégation : $match puis un sous-pipeline par facette."""
+    def by_value(field):
+        return [
+            {'$match': {field: {'$nin': [None, '']}}},
+            {'$group': {'_id': f'${field}', 'count': {'$sum': 1}}},
+            {'$sort': {'count': -1, '_id': 1}},
+            {'$limit': FACET_LIMIT},
+        ]
+
+    return [
+        {'$match': match},
+        {'$facet': {
+            'total': [{'$count': 'count'}],
+            'marques': by_value('brand'),
+            'categories': by_value('category'),
+            'stock': [{'$match': {'etat_stock': IN_STOCK}}, {'$count': 'count'}],
+            'prix': [
+                {'$match': {'price': {'$gte': PRICE_BOUNDARIES[0]}}},
+                {'$bucket': {
+                    'groupBy': '$price',
+                    'boundaries': PRICE_BOUNDARIES,
+                    'default': OPEN_BUCKET,
+                    'output': {'count': {'$sum': 1}},
+                }},
+            ],
+        }},
+    ]
+
+
+def search_meta_pipeline(compound: dict) -> List[Dict]:
+    """Comptages Atlas Search (opérateur = compound de build_text_search_compound)."""
+    return [{
+        '$searchMeta': {
+            'index': 'Text',
+            'facet': {
+                'operator': {'compound': compound},
+                'facets': {
+                    'marques': {'type': 'string', 'path': 'brand', 'numBuckets': FACET_LIMIT},
+                    'categories': {'type': 'string', 'path': 'category', 'numBuckets': FACET_LIMIT},
+                    'stock': {'type': 'string', 'path': 'etat_stock'},
+                    'prix': {
+                        'type': 'number',
+                        'path': 'price',
+                        'boundaries': PRICE_BOUNDARIES,
+                        'default': OPEN_BUCKET,
+                    },
+                },
+            },
+            'count': {'type': 'total'},
+        }
+    }]
+
+
+def _counts(buckets) -> Dict:
+    return {b['_id']: b['count'] for b in buckets if b.get('_id') not in (None, '')}
+
+
+def parse_mongo_facets(doc: dict) -> Dict:
+    """Résultat de mongo_facet_pipeline() → {total, marques, categories, prix, en_stock}."""
+    return {
+        'total': doc['total'][0]['count'] if doc['total'] else 0,
+        'marques': _counts(doc['marques']),
+        'categories': _counts(doc['categories']),
+        'prix': _counts(doc['prix']),
+        'en_stock': doc['stock'][0]['count'] if doc['stock'] else 0,
+    }
+
+
+def parse_search_meta(doc: dict) -> Dict:
+    """Résultat de search_meta_pipeline() → même forme que parse_mongo_facets()."""
+    facet = doc.get('facet') or {}
+    stock = _counts((facet.get('stock') or {}).get('buckets', []))
+    return {
+        'total': (doc.get('count') or {}).get('total', 0),
+        'marques': _counts((facet.get('marques') or {}).get('buckets', [])),
+        'categories': _counts((facet.get('categories') or {}).get('buckets', [])),
+        'prix': _counts((facet.get('prix') or {}).get('buckets', [])),
+        'en_stock': stock.get(IN_STOCK, 0),
+    }
+
+
+def merge_facets(per_store: Dict[str, Dict], category_name) -> Dict:
+    """
+    Additionne les facettes des boutiques. Les marques sont fusionnées sans tenir
+    compte de la casse (comme /marques/) ; `category_name(slug)` donne le nom affiché.
+    """
+    marques, categories, prix = {}, {}, {}
+    for facets in per_store.values():
+        for nom, count in facets['marques'].items():
+            slug = str(nom).lower().strip()
+            entry = marques.setdefault(slug, {'slug': slug, 'nom': str(nom).title(), 'nombre_produits': 0})
+            entry['nombre_produits'] += count
+        for slug, count in facets['categories'].items():
+            entry = categories.setdefault(slug, {'slug': slug, 'nom': category_name(slug), 'nombre_produits': 0})
+            entry['nombre_produits'] += count
+        for bucket, count in facets['prix'].items():
+            prix[bucket] = prix.get(bucket, 0) + count
+
+    tranches = []
+    for i, lower in enumerate(PRICE_BOUNDARIES[:-1]):
+        tranches.append({'min': lower, 'max': PRICE_BOUNDARIES[i + 1], 'nombre_produits': prix.get(lower, 0)})
+    tranches.append({'min': PRICE_BOUNDARIES[-1], 'max': None, 'nombre_produits': prix.get(OPEN_BUCKET, 0)})
+
+    def ranked(entries):
+        return sorted(entries.values(), key=lambda x: (-x['nombre_produits'], x['slug']))[:FACET_LIMIT]
+
+    return {
+        'boutiques': [
+            {'slug': name.lower(), 'nom': name, 'nombre_produits': facets['total']}
+            for name, facets in per_store.items()
+        ],
+        'marques': ranked(marques),
+        'categories': ranked(categories),
+        'prix': tranches,
+        'en_stock': sum(f['en_stock'] for f in per_store.values()),
+    }
@@ -0,0 +1,137 @@
+"""
+============================================
+API/HELPERS/FILTERS.PY
+============================================
+Filtres multi-valeurs de /produits/ et /produits/facets/ (marque=a,b,c, categorie=a,b,
+boutique=a,b) : une seule requête par store au lieu d'une par valeur.
+
+Les valeurs ne sont pas normalisées dans les collections (ex : 'samsung' chez Mytek,
+'SAMSUNG' chez Spacenet). Le vocabulaire d'un champ par store (valeur en minuscules →
+orthographes stockées) est lu une fois par $group sur l'index, puis mis en cache
+(namespace field_values, tags store:<nom> et marques / categories, invalidés par le
+watcher). Le filtre devient un $in d'égalités exactes, servi par l'index brand_1 /
+category_1, au lieu d'une regex insensible à la casse par valeur. Un store qui n'a
+aucune des valeurs demandées n'est pas interrogé.
+
+Le quota par marque (pages demandées) est appliqué dans la même agrégation ($group
+par marque normalisée + $topN sur _id : mémoire bornée à `quota` docs par marque, même
+sélection d'une requête à l'autre), puis les marques sont alternées à la fusion.
+Serveur sans $topN (MongoDB < 5.2, mongomock) : une requête triée et limitée par marque.
+
+- split_values()     : 'a, B,a' → ['a', 'b']
+- slugify_fr()       : slug d'un segment de category_path ('Téléphonie' → 'telephonie')
+- field_vocabulary() : {minuscule: [orthographes]} d'un champ pour un store
+- in_filter()        : {'$in': [...]} des orthographes stockées, None si aucune
+- quota_pipeline()   : au plus `quota` docs par valeur normalisée de `field`
+- quota_docs()       : quota_pipeline exécuté (ou son équivalent requête par valeur)
+- interleave_by()    : round-robin par valeur normalisée à la fusion
+"""
+
+import re
+import unicodedata
+from itertools import zip_longest
+from typing import Dict, List, Optional
+
+from pymongo.errors import OperationFailure
+
+from .cache import get_cached, make_key, set_cached
+from .deadline import max_time_ms, time_limit
+
+NAMESPACE = 'field_values'
+# Tag de liste invalidé par le watcher quand le champ change (api/helpers/invalidation.py)
+FIELD_TAGS = {'brand': 'marques', 'category': 'categories'}
+
+
+def split_values(raw: str) -> List[str]:
+    """Valeurs d'un paramètre multi-valeurs, en minuscules, sans doublons (ordre conservé)."""
+    values = []
+    for value in raw.split(','):
+        value = value.strip().lower()
+        if value and value not in values:
+            values.append(value)
+    return values
+
+
+def slugify_fr(text: str) -> str:
+    """Convertit un texte français en slug URL (minuscules, tirets, sans accents)."""
+    text = (text or '').strip().lower()
+    text = ''.join(
+        c for c in unicodedata.normalize('NFD', text)
+        if unicodedata.category(c) != 'Mn'
+    )
+    text = re.sub(r'[^a-z0-9]+', '-', text)
+    return text.strip('-')
+
+
+def field_vocabulary(store_name: str, col, field: str, parts: int = 1) -> Dict[str, List[str]]:
+    """Orthographes stockées de `field` dans le store, regroupées par valeur en minuscules."""
+    key = make_key(NAMESPACE, store_name, field)
+    vocabulary = get_cached(NAMESPACE, key)
+    if vocabulary is not None:
+        return vocabulary
+    vocabulary = {}
+    pipeline = [{'$sort': {field: 1}}, {'$group': {'_id': f'${field}'}}]
+    for doc in col.aggregate(pipeline, **time_limit(parts)):
+        if isinstance(doc['_id'], str) and doc['_id'].strip():
+            vocabulary.setdefault(doc['_id'].strip().lower(), []).append(doc['_id'])
+    set_cached(NAMESPACE, key, vocabulary, tags={f"store:{store_name.lower()}", FIELD_TAGS[field]})
+    return vocabulary
+
+
+def in_filter(store_name: str, col, field: str, values: List[str], parts: int = 1) -> Optional[dict]:
+    """{'$in': orthographes} des `values` (minuscules) présentes dans le store ; None si aucune."""
+    vocabulary = field_vocabulary(store_name, col, field, parts)
+    stored = [spelling for value in values for spelling in vocabulary.get(value, [])]
+    return {'$in': stored} if stored else None
+
+
+def quota_pipeline(match: dict, field: str, quota: int, projection: dict) -> List[Dict]:
+    """
+    Docs de `match`, au plus `quota` par valeur de `field` (casse ignorée), en une agrégation :
+    les `quota` plus petits _id de chaque valeur, valeurs dans l'ordre alphabétique.
+    """
+    return [
+        {'$match': match},
+        {'$project': projection},
+        {'$group': {
+            '_id': {'$toLower': f'${field}'},
+            'docs': {'$topN': {'n': quota, 'sortBy': {'_id': 1}, 'output': '$$ROOT'}},
+        }},
+        {'$sort': {'_id': 1}},
+        {'$unwind': '$docs'},
+        {'$replaceRoot': {'newRoot': '$docs'}},
+    ]
+
+
+# Opérateur d'accumulation inconnu du serveur ($topN avant MongoDB 5.2)
+UNKNOWN_OPERATOR_CODES = (15952, 168)
+
+
+def quota_docs(col, match: dict, field: str, quota: int, projection: dict, parts: int = 1) -> List[Dict]:
+    """
+    quota_pipeline() sur `col`. Sans $topN : une requête par valeur normalisée de
+    match[field]['$in'] (in_filter), triée par _id et limitée à `quota` — même résultat.
+    """
+    try:
+        return list(col.aggregate(quota_pipeline(match, field, quota, projection),
+                                  allowDiskUse=True, **time_limit(parts)))
+    except (OperationFailure, NotImplementedError) as e:
+        if isinstance(e, OperationFailure) and e.code not in UNKNOWN_OPERATOR_CODES:
+            raise
+    spellings: Dict[str, list] = {}
+    for value in match[field]['$in']:
+        spellings.setdefault(str(value).lower(), []).append(value)
+    docs = []
+    for i, key in enumerate(sorted(spellings)):
+        query = {**match, field: {'$in': spellings[key]}}
+        docs.extend(col.find(query, projection, max_time_ms=max_time_ms(parts - 1 + len(spellings) - i))
+                    .sort('_id', 1).limit(quota))
+    return docs
+
+
+def interleave_by(docs: list, field: str) -> list:
+    """Alterne les docs par valeur de `field` (casse ignorée), ordre conservé dans chaque valeur."""
+    groups: dict = {}
+    for doc in docs:
+        groups.setdefault(str(doc.get(field) or '').lower(), []).append(doc)
+    return [doc for groupe in zip_longest(*groups.values()) for doc in groupe if doc is not None]
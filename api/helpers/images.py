@@ -0,0 +1,184 @@
+"""
+============================================
+API/HELPERS/IMAGES.PY
+============================================
+Variantes responsives des images du blog (BlogPost.image, BlogSection.image / banner).
+
+Pour chaque original :
+- versions redimensionnées WebP + JPEG aux largeurs IMAGE_VARIANTS['widths']
+  (jamais agrandies au-delà de l'original)
+- placeholder flou de quelques pixels, inline en data URI (pas de requête)
+
+Stockage : MEDIA_ROOT/derivatives/<hash du contenu>/<largeur>.webp|.jpg
+→ un même fichier uploadé deux fois partage ses variantes, un fichier remplacé
+  obtient un nouveau dossier (pas d'invalidation CDN / navigateur à gérer).
+
+Génération à l'upload (api/signals.py) ou, à défaut, à la première sérialisation.
+Le résultat (URLs + placeholder) est écrit dans un manifeste sur disque,
+MEDIA_ROOT/derivatives/manifests/<md5 du nom de l'original>.json, et mémorisé dans le
+cache (namespace image_variants). Sur un miss du cache (autre process, éviction), le
+manifeste suffit tant que l'original n'a pas changé (taille, date) et que ses fichiers
+existent : l'original n'est ni relu ni décodé.
+"""
+
+import base64
+import hashlib
+import io
+import json
+import logging
+import os
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+from .cache import get_cached, make_key, set_cached
+
+logger = logging.getLogger('api')
+
+NAMESPACE = 'image_variants'
+DERIVATIVES_DIR = 'derivatives'
+MANIFESTS_DIR = 'manifests'  # pas de collision avec les dossiers <hash> (hexadécimal)
+
+
+def _content_hash(fieldfile) -> str:
+    digest = hashlib.sha256()
+    with fieldfile.open('rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:20]
+
+
+def _save_atomic(img: Image.Image, path: str, fmt: str, **params) -> None:
+    tmp = f"{path}.tmp{os.getpid()}"
+    img.save(tmp, fmt, **params)
+    os.replace(tmp, path)
+
+
+def _placeholder(img: Image.Image) -> str:
+    width = settings.IMAGE_VARIANTS['placeholder_width']
+    thumb = img.copy()
+    thumb.thumbnail((width, width * 4))
+    buf = io.BytesIO()
+    thumb.save(buf, 'JPEG', quality=40)
+    return 'data:image/jpeg;base64,' + base64.b64encode(buf.getvalue()).decode('ascii')
+
+
+def _generate(fieldfile) -> dict:
+    cfg = settings.IMAGE_VARIANTS
+    content_hash = _content_hash(fieldfile)
+    rel_dir = f"{DERIVATIVES_DIR}/{content_hash}"
+    abs_dir = os.path.join(settings.MEDIA_ROOT, DERIVATIVES_DIR, content_hash)
+    os.makedirs(abs_dir, exist_ok=True)
+
+    with fieldfile.open('rb') as f:
+        original = ImageOps.exif_transpose(Image.open(f))
+        original.load()
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA' if 'transparency' in original.info else 'RGB')
+    # JPEG sans canal alpha : fond blanc
+    flat = original
+    if original.mode == 'RGBA':
+        flat = Image.new('RGB', original.size, (255, 255, 255))
+        flat.paste(original, mask=original.getchannel('A'))
+
+    # Largeurs inférieures à l'original + la plus grande possible (original plafonné)
+    widths = sorted({w for w in cfg['widths'] if w < original.width} | {min(original.width, max(cfg['widths']))})
+    webp, jpeg = [], []
+    for width in widths:
+        height = round(original.height * width / original.width)
+        for fmt, ext, source, srcset, params in (
+            ('WEBP', 'webp', original, webp, {'quality': cfg['quality'], 'method': 4}),
+            ('JPEG', 'jpg', flat, jpeg, {'quality': cfg['quality'], 'optimize': True, 'progressive': True}),
+        ):
+            path = os.path.join(abs_dir, f"{width}.{ext}")
+            if not os.path.exists(path):
+                resized = source if width == source.width else source.resize((width, height), Image.LANCZOS)
+                _save_atomic(resized, path, fmt, **params)
+            srcset.append(f"{settings.MEDIA_URL}{rel_dir}/{width}.{ext} {width}w")
+
+    return {
+        'srcset': ', '.join(webp),
+        'srcset_jpeg': ', '.join(jpeg),
+        'placeholder': _placeholder(flat),
+        'width': original.width,
+        'height': original.height,
+    }
+
+
+def _manifest_path(name: str) -> str:
+    digest = hashlib.md5(name.encode('utf-8')).hexdigest()
+    return os.path.join(settings.MEDIA_ROOT, DERIVATIVES_DIR, MANIFESTS_DIR, f"{digest}.json")
+
+
+def _source_stamp(fieldfile) -> list:
+    """Taille et date de l'original (un stat, sans lecture)."""
+    stat = os.stat(fieldfile.path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _variant_files(variants: dict) -> list:
+    """Chemins disque des fichiers référencés par les srcset."""
+    urls = (entry.rsplit(' ', 1)[0] for key in ('srcset', 'srcset_jpeg')
+            for entry in variants[key].split(', ') if entry)
+    return [os.path.join(settings.MEDIA_ROOT, url[len(settings.MEDIA_URL):]) for url in urls]
+
+
+def _read_manifest(fieldfile):
+    """Variantes du manifeste si l'original est inchangé et tous ses fichiers présents, sinon None."""
+    try:
+        with open(_manifest_path(fieldfile.name), encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest['name'] != fieldfile.name or manifest['source'] != _source_stamp(fieldfile):
+            return None
+        variants = manifest['variants']
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    if not all(os.path.exists(path) for path in _variant_files(variants)):
+        return None
+    return variants
+
+
+def _write_manifest(fieldfile, variants: dict) -> None:
+    path = _manifest_path(fieldfile.name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'name': fieldfile.name, 'source': _source_stamp(fieldfile), 'variants': variants}, f)
+    os.replace(tmp, path)
+
+
+def ensure_variants(fieldfile):
+    """
+    Variantes d'un ImageField (URLs relatives à MEDIA_URL). None si pas d'image
+    ou original illisible : le frontend retombe alors sur l'URL d'origine.
+    """
+    if not fieldfile:
+        return None
+    key = make_key(NAMESPACE, fieldfile.name)
+    variants = get_cached(NAMESPACE, key)
+    if variants is None:
+        variants = _read_manifest(fieldfile)
+        if variants is None:
+            try:
+                variants = _generate(fieldfile)
+            except Exception as e:
+                logger.warning("Variantes impossibles pour %s : %s", fieldfile.name, e)
+                return None
+            try:
+                _write_manifest(fieldfile, variants)
+            except OSError as e:
+                logger.warning("Manifeste des variantes non écrit pour %s : %s", fieldfile.name, e)
+        set_cached(NAMESPACE, key, variants)
+    return variants
+
+
+def absolutize_variants(variants, to_absolute):
+    """Applique `to_absolute` à chaque URL des srcset (le placeholder est inline)."""
+    if not variants:
+        return variants
+
+    def srcset(value):
+        entries = (entry.rsplit(' ', 1) for entry in value.split(', ') if entry)
+        return ', '.join(f"{to_absolute(url)} {descriptor}" for url, descriptor in entries)
+
+    return {**variants, 'srcset': srcset(variants['srcset']), 'srcset_jpeg': srcset(variants['srcset_jpeg'])}
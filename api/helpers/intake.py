@@ -0,0 +1,246 @@
+"""
+============================================
+API/HELPERS/INTAKE.PY
+============================================
+File d'écriture différée des demandes (POST /api/v1/demandes/).
+
+La requête valide le formulaire puis ajoute une ligne JSON au journal du process
+(DEMANDES_INTAKE['dir']/demandes-<pid>.jsonl), horodatée à la réception
+(`submitted_at` → created_at), et répond aussitôt : aucune écriture SQLite sur le
+chemin de la requête.
+
+Un thread par process vide le journal toutes les `flush_interval` secondes :
+1. le journal est renommé (les nouveaux ajouts partent dans un fichier neuf)
+2. insertion groupée (bulk_create) des demandes dont l'`intake_id` n'est pas encore en
+   base → rejouer un lot déjà inséré ne crée pas de doublon ; si la base refuse le
+   groupe (IntegrityError), insertion ligne par ligne : une demande refusée est
+   journalisée (niveau ERROR, contenu complet) et comptée `result="dropped"`
+3. suppression du lot, puis email de notification (hors requête)
+
+Chaque lot est traité indépendamment : une base momentanément indisponible
+(OperationalError) laisse le lot en place pour le tour suivant ; un lot illisible ou
+refusé par la base est déplacé dans DEMANDES_INTAKE['dir']/quarantine/ (à inspecter
+à la main) sans bloquer les suivants.
+
+Les journaux d'un process mort (redémarrage, crash) sont repris au démarrage du
+serveur (start_intake_flusher(), core/wsgi.py), ou par `python manage.py flush_demandes`.
+"""
+
+import glob
+import json
+import logging
+import os
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import IntegrityError, OperationalError, close_old_connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from ..models import StoreRequest
+from .metrics import counter
+
+logger = logging.getLogger('api')
+
+DEMANDES_FLUSHED = counter(
+    'toprix_demandes_flushed_total',
+    "Demandes traitées par le flusher (result=ok|duplicate|dropped|error|quarantine)",
+    ('result',),
+)
+
+
+def _journal_dir() -> str:
+    path = str(settings.DEMANDES_INTAKE['dir'])
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class _Intake:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pid = None
+
+    @property
+    def journal(self) -> str:
+        return os.path.join(_journal_dir(), f"demandes-{os.getpid()}.jsonl")
+
+    def _ensure_flusher(self) -> None:
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name='demandes-flusher', daemon=True).start()
+
+    def enqueue(self, data: dict) -> None:
+        self._ensure_flusher()
+        line = json.dumps({
+            **data, 'intake_id': uuid.uuid4().hex, 'submitted_at': timezone.now().isoformat(),
+        }, ensure_ascii=False) + '\n'
+        with self._lock:
+            with open(self.journal, 'a', encoding='utf-8') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _run(self) -> None:
+        self.recover_orphans()
+        while True:
+            self._wakeup.wait(settings.DEMANDES_INTAKE['flush_interval'])
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error("Flush des demandes impossible : %s", e)
+            finally:
+                close_old_connections()
+
+    def flush(self) -> int:
+        """
+        Insère le journal du process courant (et ses lots restés en échec) ;
+        retourne le nombre de demandes insérées.
+        """
+        with self._lock:
+            if os.path.exists(self.journal):
+                os.replace(self.journal, f"{self.journal}.{uuid.uuid4().hex[:8]}.batch")
+        pending = glob.glob(f"{self.journal}.*.batch")
+        pending += glob.glob(os.path.join(_journal_dir(), f"*.{os.getpid()}.claimed"))
+        return sum(self._flush_safely(path) for path in sorted(pending))
+
+    def recover_orphans(self) -> int:
+        """Reprend les journaux et lots laissés par des process arrêtés."""
+        total = 0
+        for path in glob.glob(os.path.join(_journal_dir(), 'demandes-*.jsonl*')):
+            # Propriétaire : dernier process ayant revendiqué le fichier, sinon son créateur
+            name = os.path.basename(path)
+            pid = int(name.split('.')[-2] if name.endswith('.claimed') else name.split('-')[1].split('.')[0])
+            if pid == os.getpid() or _pid_alive(pid):
+                continue
+            claimed = f"{path}.{os.getpid()}.claimed"
+            try:
+                os.replace(path, claimed)  # un seul process gagne la reprise
+            except FileNotFoundError:
+                continue
+            total += self._flush_safely(claimed)
+        return total
+
+    def _flush_safely(self, path: str) -> int:
+        """_flush_batch sans interrompre les lots suivants ; 0 si le lot n'est pas inséré."""
+        try:
+            return self._flush_batch(path)
+        except OperationalError as e:
+            # Base verrouillée / indisponible : lot conservé pour le prochain tour
+            logger.warning("Lot de demandes %s non inséré (réessai) : %s", os.path.basename(path), e)
+        except Exception as e:
+            _quarantine(path, e)
+        return 0
+
+    def _flush_batch(self, path: str) -> int:
+        with open(path, encoding='utf-8') as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+        size = settings.DEMANDES_INTAKE['batch_size']
+        inserted = []
+        try:
+            for i in range(0, len(entries), size):
+                inserted += _insert(entries[i:i + size])
+        except Exception:
+            DEMANDES_FLUSHED.inc(len(entries), result='error')
+            # Lot conservé (.batch / .claimed) : repris au tour suivant ou mis en quarantaine
+            raise
+        os.remove(path)
+        DEMANDES_FLUSHED.inc(len(inserted), result='ok')
+        logger.info("%s demande(s) enregistrée(s)", len(inserted))
+        _notify(inserted)
+        return len(inserted)
+
+
+def _insert(entries: list) -> list:
+    """Insère un groupe de lignes du journal ; retourne celles réellement insérées."""
+    ids = [e['intake_id'] for e in entries if e.get('intake_id')]
+    known = set(StoreRequest.objects.filter(intake_id__in=ids).values_list('intake_id', flat=True))
+    fresh = [e for e in entries if e.get('intake_id') not in known]
+    if len(fresh) < len(entries):
+        # Lot rejoué après une insertion réussie (crash avant la suppression du fichier)
+        DEMANDES_FLUSHED.inc(len(entries) - len(fresh), result='duplicate')
+    try:
+        with transaction.atomic():
+            StoreRequest.objects.bulk_create([_request(e) for e in fresh])
+        return fresh
+    except IntegrityError:
+        pass
+    # Une ligne refusée : insertion une à une pour ne perdre qu'elle
+    inserted = []
+    for entry in fresh:
+        try:
+            with transaction.atomic():
+                _request(entry).save(force_insert=True)
+        except IntegrityError as e:
+            DEMANDES_FLUSHED.inc(result='dropped')
+            logger.error("Demande refusée par la base (%s), non enregistrée : %s",
+                         e, json.dumps(entry, ensure_ascii=False))
+            continue
+        inserted.append(entry)
+    return inserted
+
+
+def _request(entry: dict) -> StoreRequest:
+    """StoreRequest d'une ligne du journal ; created_at = réception (anciennes lignes : maintenant)."""
+    entry = dict(entry)
+    submitted_at = entry.pop('submitted_at', None)
+    return StoreRequest(**entry, created_at=parse_datetime(submitted_at) if submitted_at else timezone.now())
+
+
+def _quarantine(path: str, error: Exception) -> None:
+    """Met de côté un lot inutilisable (JSON invalide, champ refusé par la base)."""
+    target_dir = os.path.join(_journal_dir(), 'quarantine')
+    os.makedirs(target_dir, exist_ok=True)
+    target = os.path.join(target_dir, os.path.basename(path))
+    try:
+        os.replace(path, target)
+    except FileNotFoundError:
+        return
+    DEMANDES_FLUSHED.inc(result='quarantine')
+    logger.error("Lot de demandes mis en quarantaine (%s) : %s", error, target)
+
+
+def _notify(entries: list) -> None:
+    recipient = settings.DEMANDES_INTAKE['notify_email']
+    if not recipient or not entries:
+        return
+    lines = [
+        f"- [{e['request_type']}] {e.get('store_name') or e.get('product_name') or '?'}"
+        f" — {e['contact_person']} <{e['email']}> {e['phone']}"
+        for e in entries
+    ]
+    try:
+        send_mail(
+            f"Toprix : {len(entries)} nouvelle(s) demande(s)",
+            '\n'.join(lines),
+            settings.DEFAULT_FROM_EMAIL,
+            [recipient],
+        )
+    except Exception as e:
+        logger.warning("Email de notification des demandes non envoyé : %s", e)
+
+
+intake = _Intake()
+
+
+def start_intake_flusher() -> None:
+    """Démarre le flusher du process (reprise des journaux orphelins sans attendre un POST)."""
+    intake._ensure_flusher()
@@ -0,0 +1,332 @@
+"""
+============================================
+API/HELPERS/INVALIDATION.PY
+============================================
+Invalidation ciblée du cache produits à partir des écritures des scrapers.
+
+Chaque collection (tunisianet, mytek, spacenet, comparatif) est suivie par un
+change stream MongoDB (full_document='updateLookup', et image avant modification
+quand le serveur la fournit : MongoDB 6.0+, changeStreamPreAndPostImages activé).
+Un changement invalide uniquement les tags concernés (cf. api/helpers/cache.py),
+pour le document après et avant modification :
+- produit:<_id>, ref:<référence>           → détail produit, pages de recherche qui l'affichent
+- produit:<Slug>                           → détail comparatif
+- categorie:<slug>, marque:<nom>           → recherches filtrées sur cette catégorie / marque
+- categories, marques                      → listes agrégées (insert / delete / champ modifié)
+- presence:<store>                         → résumé de présence du store (api/helpers/presence.py)
+- store:<store>                            → catégorie / marque modifiée sans image avant
+                                             modification (ancien tag inconnu)
+
+Les tags sont regroupés et invalidés au plus une fois par `debounce` secondes : un
+scrape qui réécrit 10 000 produits ne provoque pas 10 000 écritures de cache.
+Le resume token est conservé sur disque, seulement une fois les tags de ses
+événements invalidés : après un redémarrage, le suivi reprend au dernier lot
+appliqué (sans position connue, tout le store est invalidé par prudence).
+
+Sans change streams (MongoDB standalone) : si CACHE_INVALIDATION['marker_collection']
+est défini, le dernier document de cette collection (même base que le store) est
+relu toutes les `poll_interval` secondes ; quand son champ `marker_field` change,
+tout le store est invalidé (tag store:<nom>).
+
+Pour comparatif, le watcher tient aussi à jour la collection d'offres matérialisées
+(api/helpers/comparatif.py) avant d'invalider le cache.
+
+Chaque store suivi publie un battement dans l'alias de cache `tags` toutes les
+`heartbeat` secondes (watcher_alive()) : les résumés de présence (api/helpers/presence.py)
+ne sont utilisés que si un watcher invalide effectivement leurs tags.
+
+Lancement : `python manage.py watch_products`, ou dans chaque process WSGI si
+CACHE_INVALIDATION['in_process'] (cache LocMem, un seul process).
+"""
+
+import logging
+import os
+import threading
+import time
+
+from bson import json_util
+from django.conf import settings
+from django.core.cache import caches
+from pymongo.errors import OperationFailure, PyMongoError
+
+from db.mongo import MongoDBPool
+from .cache import invalidate_tags
+from .comparatif import sync_offer
+from .metrics import counter
+
+logger = logging.getLogger('api')
+
+WATCHED_STORES = ('tunisianet', 'mytek', 'spacenet', 'comparatif')
+COMPARATIF_REFERENCE = 'Réf Mytek'
+
+INVALIDATION_EVENTS = counter(
+    'toprix_cache_invalidation_events_total',
+    "Changements MongoDB reçus par le watcher, par store et opération",
+    ('store', 'operation'),
+)
+INVALIDATED_TAGS = counter(
+    'toprix_cache_invalidated_tags_total',
+    "Tags de cache invalidés par le watcher",
+)
+
+# Champs dont la modification change les listes catégories / marques
+LIST_FIELDS = {'category', 'category_path', 'subcategory', 'brand'}
+# ... et le résumé de présence du store (api/helpers/presence.py)
+PRESENCE_FIELDS = LIST_FIELDS | {'reference'}
+
+
+def _document_tags(store: str, doc: dict) -> set:
+    tags = set()
+    if store == 'comparatif':
+        if doc.get('Slug'):
+            tags.add(f"produit:{doc['Slug']}")
+        if doc.get(COMPARATIF_REFERENCE):
+            tags.add(f"ref:{str(doc[COMPARATIF_REFERENCE]).lower()}")
+        return tags
+    if doc.get('reference'):
+        tags.add(f"ref:{str(doc['reference']).lower()}")
+    if doc.get('category'):
+        tags.add(f"categorie:{str(doc['category']).lower()}")
+    if doc.get('brand'):
+        tags.add(f"marque:{str(doc['brand']).lower()}")
+    return tags
+
+
+def tags_for_change(store: str, change: dict) -> set:
+    """Tags à invalider pour un événement de change stream."""
+    operation = change.get('operationType')
+    if operation in ('drop', 'rename', 'dropDatabase', 'invalidate'):
+        return {f"store:{store}"}
+
+    tags = set()
+    doc_id = (change.get('documentKey') or {}).get('_id')
+    if doc_id is not None:
+        tags.add(f"produit:{doc_id}")
+
+    # Avant et après : un produit qui change de catégorie / marque sort aussi des anciennes
+    before = change.get('fullDocumentBeforeChange')
+    tags |= _document_tags(store, change.get('fullDocument') or {})
+    tags |= _document_tags(store, before or {})
+    if store == 'comparatif':
+        return tags
+
+    description = change.get('updateDescription') or {}
+    updated = set(description.get('updatedFields') or {}) | set(description.get('removedFields') or ())
+    if operation == 'update' and before is None and updated & (LIST_FIELDS | {'reference'}):
+        # Ancienne valeur inconnue : ses tags ne peuvent pas être ciblés
+        tags.add(f"store:{store}")
+    if operation in ('insert', 'delete', 'replace') or updated & LIST_FIELDS:
+        tags.update(('categories', 'marques'))
+    if operation in ('insert', 'delete', 'replace') or updated & PRESENCE_FIELDS:
+        tags.add(f"presence:{store}")
+    return tags
+
+
+class _TagBatcher:
+    """
+    Accumule les tags et les invalide en une fois toutes les `debounce` secondes.
+    add() retourne le numéro du lot ; `flushed` = nombre de lots invalidés (les lots
+    < flushed sont appliqués, leurs resume tokens peuvent être enregistrés).
+    """
+
+    def __init__(self, debounce: float):
+        self.debounce = debounce
+        self.flushed = 0
+        self._batch = 0
+        self._tags = set()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='cache-invalidation', daemon=True)
+        self._thread.start()
+
+    def add(self, tags) -> int:
+        with self._lock:
+            self._tags.update(tags)
+            return self._batch
+
+    def flush(self) -> None:
+        with self._lock:
+            tags, self._tags = self._tags, set()
+            batch = self._batch
+            self._batch += 1
+        if tags:
+            try:
+                invalidate_tags(tags)
+            except Exception:
+                with self._lock:  # réessayés avec le lot suivant
+                    self._tags |= tags
+                raise
+            INVALIDATED_TAGS.inc(len(tags))
+            logger.debug("%s tag(s) de cache invalidé(s)", len(tags))
+        self.flushed = batch + 1
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.debounce)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error("Invalidation du cache impossible : %s", e)
+
+
+def _heartbeat_key(store: str) -> str:
+    return f"toprix:watcher:{store}"
+
+
+def _beat(store: str, interval: float) -> None:
+    """Battement du suivi de `store`, valable 3 intervalles."""
+    caches['tags'].set(_heartbeat_key(store), time.time(), 3 * interval)
+
+
+def watcher_alive(store: str) -> bool:
+    """Un watcher (ce process ou watch_products) suit-il `store` en ce moment ?"""
+    return caches['tags'].get(_heartbeat_key(store)) is not None
+
+
+def _token_path(store: str) -> str:
+    path = os.path.join(settings.BASE_DIR, 'var', 'changestreams')
+    os.makedirs(path, exist_ok=True)
+    return os.path.join(path, f"{store}.json")
+
+
+def _load_token(store: str):
+    try:
+        with open(_token_path(store), encoding='utf-8') as f:
+            return json_util.loads(f.read())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _save_token(store: str, token) -> None:
+    path = _token_path(store)
+    with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+        f.write(json_util.dumps(token))
+    os.replace(f"{path}.tmp", path)
+
+
+class StoreWatcher(threading.Thread):
+    """Suit une collection ; bascule sur le marqueur de scrape si les change streams sont absents."""
+
+    def __init__(self, store: str, batcher: _TagBatcher):
+        super().__init__(name=f'watch-{store}', daemon=True)
+        self.store = store
+        self.batcher = batcher
+        self.before_change = True  # passe à False si le serveur refuse l'option
+
+    def _collection(self):
+        return MongoDBPool().get_collection(self.store)
+
+    def run(self) -> None:
+        while True:
+            try:
+                self._watch()
+            except OperationFailure as e:
+                if settings.CACHE_INVALIDATION['marker_collection']:
+                    logger.warning("Change streams indisponibles pour %s (%s) : suivi du marqueur de scrape",
+                                   self.store, e)
+                    self._poll_marker()
+                    return
+                logger.error("Change streams indisponibles pour %s : %s", self.store, e)
+            except PyMongoError as e:
+                logger.warning("Change stream %s interrompu : %s", self.store, e)
+            except Exception as e:
+                logger.error("Watcher %s : %s", self.store, e)
+            time.sleep(settings.CACHE_INVALIDATION['retry_delay'])
+
+    def _open(self, **kwargs):
+        """Change stream avec image avant modification si le serveur la connaît (MongoDB 6.0+)."""
+        if self.before_change:
+            try:
+                return self._collection().watch(full_document_before_change='whenAvailable', **kwargs)
+            except OperationFailure as e:
+                if e.code in (260, 280, 286):
+                    raise
+                logger.info("Images avant modification indisponibles pour %s : %s", self.store, e)
+                self.before_change = False
+        return self._collection().watch(**kwargs)
+
+    def _watch(self) -> None:
+        token = _load_token(self.store)
+        if token is None:
+            # Pas de position connue : des changements ont pu être manqués
+            self.batcher.add({f"store:{self.store}"})
+        kwargs = {'full_document': 'updateLookup'}
+        if token is not None:
+            kwargs['resume_after'] = token
+        try:
+            stream = self._open(**kwargs)
+        except OperationFailure as e:
+            if token is None or e.code not in (260, 280, 286):  # token invalide / historique expiré
+                raise
+            logger.warning("Resume token %s expiré, reprise sans historique", self.store)
+            os.remove(_token_path(self.store))
+            self.batcher.add({f"store:{self.store}"})
+            stream = self._open(full_document='updateLookup')
+
+        logger.info("Change stream %s démarré", self.store)
+        tokens = {}  # lot du batcher → dernier resume token de ce lot
+        heartbeat = settings.CACHE_INVALIDATION['heartbeat']
+        last_beat = 0.0
+        with stream:
+            while stream.alive:
+                if time.monotonic() - last_beat >= heartbeat:
+                    _beat(self.store, heartbeat)
+                    last_beat = time.monotonic()
+                change = stream.try_next()
+                if change is not None:
+                    INVALIDATION_EVENTS.inc(store=self.store, operation=change.get('operationType', '?'))
+                    if self.store == 'comparatif' and change.get('documentKey'):
+                        self._sync_offer(change)
+                    tokens[self.batcher.add(tags_for_change(self.store, change))] = stream.resume_token
+                self._save_flushed(tokens)
+
+    def _save_flushed(self, tokens: dict) -> None:
+        """Enregistre le token le plus récent dont les tags sont déjà invalidés."""
+        done = [batch for batch in tokens if batch < self.batcher.flushed]
+        if done:
+            _save_token(self.store, tokens[max(done)])
+            for batch in done:
+                del tokens[batch]
+
+    def _sync_offer(self, change: dict) -> None:
+        # fullDocument absent (suppression, document déjà supprimé) → entrée retirée
+        try:
+            sync_offer(change['documentKey']['_id'], change.get('fullDocument'))
+        except PyMongoError as e:
+            logger.warning("Offre comparatif %s non synchronisée : %s", change['documentKey']['_id'], e)
+
+    def _poll_marker(self) -> None:
+        cfg = settings.CACHE_INVALIDATION
+        store_cfg = settings.MONGODB_CONFIG[self.store]
+        last = None
+        while True:
+            try:
+                client = MongoDBPool().get_client(self.store)
+                marker = client[store_cfg['db']][cfg['marker_collection']].find_one(sort=[('_id', -1)])
+                value = (marker or {}).get(cfg['marker_field'])
+                # Première lecture comprise : un scrape a pu passer pendant l'arrêt
+                if value is not None and value != last:
+                    INVALIDATION_EVENTS.inc(store=self.store, operation='marker')
+                    self.batcher.add({f"store:{self.store}"})
+                    last = value
+                _beat(self.store, cfg['poll_interval'])
+            except Exception as e:
+                logger.warning("Lecture du marqueur de scrape %s impossible : %s", self.store, e)
+            time.sleep(cfg['poll_interval'])
+
+
+_started = False
+_start_lock = threading.Lock()
+
+
+def start_watchers(stores=WATCHED_STORES) -> list:
+    """Démarre un watcher par store (une seule fois par process)."""
+    global _started
+    with _start_lock:
+        if _started:
+            return []
+        _started = True
+    batcher = _TagBatcher(settings.CACHE_INVALIDATION['debounce'])
+    watchers = [StoreWatcher(store, batcher) for store in stores]
+    for watcher in watchers:
+        watcher.start()
+    return watchers
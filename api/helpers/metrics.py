@@ -0,0 +1,165 @@
+"""
+============================================
+API/HELPERS/METRICS.PY
+============================================
+Métriques agrégées en mémoire (par process), sans dépendance externe.
+
+- Counter   : compteur monotone par jeu de labels
+- Gauge     : valeur instantanée (inc / dec / set)
+- Histogram : compteurs cumulés par bucket + somme + nombre, par jeu de labels
+- REGISTRY  : toutes les métriques déclarées, dans l'ordre de déclaration
+- render_text() : format d'exposition texte Prometheus (servi par /metrics)
+
+Chaque observation prend un verrou par métrique et incrémente quelques entiers :
+le coût reste négligeable sur le chemin chaud.
+"""
+
+import bisect
+import threading
+from typing import Dict, Tuple
+
+# Buckets en secondes (latences HTTP / MongoDB)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REGISTRY: Dict[str, '_Metric'] = {}
+_registry_lock = threading.Lock()
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+
+class Counter(_Metric):
+    """Compteur monotone (nom terminé par _total)."""
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def snapshot(self) -> Dict[Tuple[str, ...], float]:
+        with self._lock:
+            return dict(self._series)
+
+
+class Gauge(Counter):
+    """Valeur instantanée (connexions en cours, taille de file…)."""
+    kind = 'gauge'
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = value
+
+
+class Histogram(_Metric):
+    """Histogramme cumulatif à la Prometheus, labels passés en kwargs."""
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            serie = self._series.get(key)
+            if serie is None:
+                serie = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                serie[0][index] += 1
+            serie[1] += value
+            serie[2] += 1
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Tuple[list, float, int]]:
+        """Copie cohérente : {labels: (compteurs cumulés par bucket, somme, nombre)}."""
+        with self._lock:
+            series = {key: (list(s[0]), s[1], s[2]) for key, s in self._series.items()}
+        result = {}
+        for key, (counts, total, count) in series.items():
+            cumulative, running = [], 0
+            for c in counts:
+                running += c
+                cumulative.append(running)
+            result[key] = (cumulative, total, count)
+        return result
+
+
+def _register(cls, name: str, *args, **kwargs):
+    with _registry_lock:
+        if name not in REGISTRY:
+            REGISTRY[name] = cls(name, *args, **kwargs)
+        return REGISTRY[name]
+
+
+def counter(name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+    """Déclare (ou retourne) le compteur `name` du registre."""
+    return _register(Counter, name, documentation, labelnames)
+
+
+def gauge(name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+    """Déclare (ou retourne) la jauge `name` du registre."""
+    return _register(Gauge, name, documentation, labelnames)
+
+
+def histogram(name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+    """Déclare (ou retourne) l'histogramme `name` du registre."""
+    return _register(Histogram, name, documentation, labelnames, buckets)
+
+
+# ============================================
+# EXPOSITION TEXTE (format Prometheus 0.0.4)
+# ============================================
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render_text() -> str:
+    """Sérialise tout le registre au format d'exposition texte."""
+    with _registry_lock:
+        metrics = list(REGISTRY.values())
+
+    lines = []
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        if isinstance(metric, Histogram):
+            for key, (cumulative, total, count) in sorted(metric.snapshot().items()):
+                for bound, value in zip(metric.buckets, cumulative):
+                    le = f'le="{bound}"'
+                    lines.append(f"{metric.name}_bucket{_labels(metric.labelnames, key, le)} {value}")
+                le = 'le="+Inf"'
+                lines.append(f"{metric.name}_bucket{_labels(metric.labelnames, key, le)} {count}")
+                lines.append(f"{metric.name}_sum{_labels(metric.labelnames, key)} {_number(total)}")
+                lines.append(f"{metric.name}_count{_labels(metric.labelnames, key)} {count}")
+        else:
+            for key, value in sorted(metric.snapshot().items()):
+                lines.append(f"{metric.name}{_labels(metric.labelnames, key)} {_number(value)}")
+    return '\n'.join(lines) + '\n'
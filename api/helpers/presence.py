@@ -0,0 +1,193 @@
+"""
+============================================
+API/HELPERS/PRESENCE.PY
+============================================
+Résumés de présence par store : marques, catégories, sous-catégories et références
+présentes dans chaque collection, en mémoire (par process).
+
+Avant d'interroger les stores, les vues retirent ceux qui ne peuvent rien renvoyer
+(prune_stores) : /marques/<nom>/ ne sollicite que les boutiques qui ont la marque, une
+référence n'est cherchée que là où elle existe, et le budget de la requête
+(helpers/deadline.py) est partagé entre les seuls stores restants.
+
+Un résumé est un frozenset de valeurs en minuscules par type (sets exacts plutôt qu'un
+filtre de Bloom : quelques Mo par store pour ~30 000 références) :
+- marque         : brand
+- categorie      : category
+- sous_categorie : '<category>/<subcategory>' et '<category>/<slugify_fr(2e segment de category_path)>'
+- reference      : reference
+
+Construction : deux $group sur la collection, dans un thread (jamais dans la requête).
+Tant qu'un résumé n'est pas prêt ou n'est plus à jour, le store est interrogé normalement.
+Un résumé est périmé quand un des tags store:<nom> / presence:<nom> a changé depuis sa
+construction (watcher, api/helpers/invalidation.py : chaque scrape les invalide) ou
+après STORE_PRESENCE['max_age'] secondes.
+
+Seul le watcher confirme qu'un résumé est à jour : sans battement récent du watcher de
+ce store (watcher_alive()), les tags ne bougent pas et le résumé n'est ni construit ni
+utilisé — tous les stores sont interrogés.
+
+- may_match(store, categories, marques, references) : le store peut-il avoir un résultat ?
+- prune_stores(stores, ..., keep)                   : stores (get_col, nom) à interroger
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from django.conf import settings
+
+from db.mongo import MongoDBPool
+from .breaker import circuit_closed, circuit_record
+from .cache import tag_versions
+from .filters import slugify_fr
+from .invalidation import watcher_alive
+from .metrics import counter, gauge
+
+logger = logging.getLogger('api')
+
+KINDS = ('marque', 'categorie', 'sous_categorie', 'reference')
+
+PRESENCE_VALUES = gauge(
+    'toprix_presence_values',
+    "Valeurs distinctes des résumés de présence, par store et type",
+    ('store', 'kind'),
+)
+PRESENCE_SKIPPED = counter(
+    'toprix_presence_skipped_total',
+    "Stores non interrogés : aucune des valeurs demandées dans le résumé de présence",
+    ('store',),
+)
+
+
+def _variants(value) -> set:
+    """Formes en minuscules d'une valeur stockée (telle quelle et sans espaces autour)."""
+    if not isinstance(value, str) or not value.strip():
+        return set()
+    return {value.lower(), value.strip().lower()}
+
+
+class StorePresence:
+
+    def __init__(self, values: Dict[str, frozenset], versions: dict):
+        self.values = values
+        self.versions = versions  # versions des tags au début de la construction
+        self.built_at = time.monotonic()
+
+    def fresh(self, store: str) -> bool:
+        if time.monotonic() - self.built_at >= settings.STORE_PRESENCE['max_age']:
+            return False
+        return tag_versions(_tags(store)) == self.versions
+
+    def has_any(self, kind: str, values: Iterable[str]) -> bool:
+        return any(value.lower() in self.values[kind] for value in values)
+
+
+def _tags(store: str) -> set:
+    return {f"store:{store}", f"presence:{store}"}
+
+
+def build_presence(store: str) -> StorePresence:
+    """Lit les valeurs présentes dans la collection de `store` (nom en minuscules)."""
+    versions = tag_versions(_tags(store))
+    col = MongoDBPool().get_collection(store)
+    limit = {'maxTimeMS': settings.STORE_PRESENCE['build_timeout'] * 1000}
+    values = {kind: set() for kind in KINDS}
+
+    taxonomy = [{'$group': {'_id': {
+        'brand': '$brand', 'category': '$category', 'subcategory': '$subcategory', 'path': '$category_path',
+    }}}]
+    for doc in col.aggregate(taxonomy, allowDiskUse=True, **limit):
+        key = doc['_id']
+        values['marque'] |= _variants(key.get('brand'))
+        parents = _variants(key.get('category'))
+        values['categorie'] |= parents
+        sous = _variants(key.get('subcategory'))
+        path = key.get('path')
+        if isinstance(path, str) and '>' in path:
+            sous.add(slugify_fr(path.split('>')[1]))
+        values['sous_categorie'] |= {f"{parent}/{s}" for parent in parents for s in sous if s}
+
+    for doc in col.aggregate([{'$group': {'_id': '$reference'}}], allowDiskUse=True, **limit):
+        values['reference'] |= _variants(doc['_id'])
+
+    return StorePresence({kind: frozenset(v) for kind, v in values.items()}, versions)
+
+
+_summaries: Dict[str, StorePresence] = {}
+_building = set()  # (pid, store) : un seul thread de construction par store et par process
+_lock = threading.Lock()
+
+
+def _rebuild(store: str) -> None:
+    started = time.monotonic()
+    try:
+        summary = _summaries[store] = build_presence(store)
+        circuit_record(store)
+    except Exception as e:
+        circuit_record(store, e)
+        logger.warning("Résumé de présence %s non construit : %s", store, e)
+        return
+    finally:
+        with _lock:
+            _building.discard((os.getpid(), store))
+    for kind, values in summary.values.items():
+        PRESENCE_VALUES.set(len(values), store=store, kind=kind)
+    logger.info("Résumé de présence %s construit en %.2f s (%s)", store, time.monotonic() - started,
+                ', '.join(f"{kind}={len(v)}" for kind, v in summary.values.items()))
+
+
+def _summary(store_name: str) -> Optional[StorePresence]:
+    """Résumé à jour du store, ou None (reconstruction lancée en arrière-plan)."""
+    if not settings.STORE_PRESENCE['enabled']:
+        return None
+    store = store_name.lower()
+    if not watcher_alive(store):
+        return None  # fraîcheur invérifiable : pas de résumé
+    summary = _summaries.get(store)
+    if summary is not None and summary.fresh(store):
+        return summary
+    if not circuit_closed(store):
+        return None
+    with _lock:
+        if (os.getpid(), store) in _building:
+            return None
+        _building.add((os.getpid(), store))
+    threading.Thread(target=_rebuild, args=(store,), name=f'presence-{store}', daemon=True).start()
+    return None
+
+
+def may_match(store_name: str, categories=(), marques=(), references=()) -> bool:
+    """
+    Faux seulement si le résumé du store est à jour et qu'un critère non vide n'y a
+    aucune valeur. categories : slugs `parent` ou `parent/sous`.
+    """
+    if not (categories or marques or references):
+        return True
+    summary = _summary(store_name)
+    if summary is None:
+        return True
+    if categories:
+        parents = [c for c in categories if '/' not in c]
+        sous = [c for c in categories if '/' in c]
+        if not (summary.has_any('categorie', parents) or summary.has_any('sous_categorie', sous)):
+            return False
+    if marques and not summary.has_any('marque', marques):
+        return False
+    return not references or summary.has_any('reference', references)
+
+
+def prune_stores(stores: list, categories=(), marques=(), references=(), keep=()) -> list:
+    """
+    Stores [(get_col, nom)] qui peuvent avoir un résultat pour ces critères ; ceux de
+    `keep` (résultat déjà constaté) sont toujours gardés.
+    """
+    kept = []
+    for get_col, store_name in stores:
+        if store_name in keep or may_match(store_name, categories, marques, references):
+            kept.append((get_col, store_name))
+        else:
+            PRESENCE_SKIPPED.inc(store=store_name.lower())
+    return kept
@@ -0,0 +1,177 @@
+"""
+============================================
+API/HELPERS/QUERYLOG.PY
+============================================
+Journal de fréquence des recherches, pour préchauffer le cache (manage.py prewarm_cache).
+
+Chaque process compte, en mémoire bornée, les valeurs les plus fréquentes par type :
+- requete   : paramètres complets de /produits/ (clé de cache exacte, rejouable)
+- q         : requête texte nettoyée (clean_search_query, minuscules)
+- categorie : slug catégorie filtré (chaque valeur de categorie=a,b)
+- marque    : marque filtrée
+
+Algorithme Space-Saving : au plus QUERY_LOG['capacity'] compteurs par type ; une valeur
+nouvelle quand la table est pleine remplace le plus petit compteur (et en hérite, +1).
+Les valeurs fréquentes restent toujours dans la table, leur compte est surestimé
+d'au plus le compteur remplacé. Les valeurs sont rangées par compte (buckets) : le
+plus petit compteur est trouvé et déplacé en O(1), sous le verrou de chaque requête.
+
+Alimenté par @record_search (produits_list), hits de cache compris.
+Un thread par process écrit son instantané dans QUERY_LOG['dir']/<pid>.json toutes les
+`flush_interval` secondes ; top() fusionne les instantanés de tous les process (ceux de
+plus de `max_age` secondes sont ignorés puis supprimés).
+"""
+
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+
+from .filters import split_values
+from .search import clean_search_query
+
+logger = logging.getLogger('api')
+
+KINDS = ('requete', 'q', 'categorie', 'marque')
+# Requêtes rejouées par prewarm_cache : non comptées
+PREWARM_USER_AGENT = 'ToprixPrewarm/1.0'
+
+
+class SpaceSaving:
+    """Compteurs des `capacity` valeurs les plus fréquentes d'un flux."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.counts = {}
+        self._buckets = {}  # compte → {valeur: None}, dans l'ordre d'arrivée
+        self._min = 0       # plus petit compte présent
+
+    def _move(self, value: str, old: int, new: int) -> None:
+        bucket = self._buckets[old]
+        del bucket[value]
+        if not bucket:
+            del self._buckets[old]
+            if self._min == old:
+                self._min = new
+        self._buckets.setdefault(new, {})[value] = None
+        self.counts[value] = new
+
+    def add(self, value: str) -> None:
+        count = self.counts.get(value)
+        if count is not None:
+            self._move(value, count, count + 1)
+        elif len(self.counts) < self.capacity:
+            self._buckets.setdefault(1, {})[value] = None
+            self.counts[value] = 1
+            self._min = 1
+        else:
+            # Le plus ancien des plus petits compteurs cède sa place (et son compte, +1)
+            bucket = self._buckets[self._min]
+            victim = next(iter(bucket))
+            del bucket[victim], self.counts[victim]
+            bucket[value] = None
+            self._move(value, self._min, self._min + 1)
+
+
+def request_key(params) -> str:
+    """Paramètres d'une requête (QueryDict) → query string triée, rejouable à l'identique."""
+    return urlencode(sorted((k, v) for k, values in params.lists() for v in values))
+
+
+class _QueryLog:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._trackers = {}
+
+    def _ensure_flusher(self) -> None:
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # Après un fork, les compteurs hérités appartiennent au parent
+            self._pid = os.getpid()
+            self._trackers = {kind: SpaceSaving(settings.QUERY_LOG['capacity']) for kind in KINDS}
+            threading.Thread(target=self._run, name='querylog-flusher', daemon=True).start()
+
+    def record(self, params) -> None:
+        """Compte une recherche /produits/ (params = request.GET)."""
+        if not settings.QUERY_LOG['enabled']:
+            return
+        self._ensure_flusher()
+        q = clean_search_query(params.get('q', '').strip()).lower()
+        categories = split_values(params.get('categorie', ''))
+        marques = split_values(params.get('marque', ''))
+        with self._lock:
+            self._trackers['requete'].add(request_key(params))
+            if q:
+                self._trackers['q'].add(q)
+            for categorie in categories:
+                self._trackers['categorie'].add(categorie)
+            for marque in marques:
+                self._trackers['marque'].add(marque)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {kind: dict(tracker.counts) for kind, tracker in self._trackers.items()}
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(settings.QUERY_LOG['flush_interval'])
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning("Écriture du journal des recherches impossible : %s", e)
+
+    def flush(self) -> None:
+        directory = str(settings.QUERY_LOG['dir'])
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{os.getpid()}.json")
+        with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump({'updated': time.time(), 'counts': self.snapshot()}, f, ensure_ascii=False)
+        os.replace(f"{path}.tmp", path)
+
+
+def top(kind: str, n: int) -> list:
+    """Les `n` valeurs les plus fréquentes de `kind`, tous process confondus : [(valeur, compte)]."""
+    totals = {}
+    oldest = time.time() - settings.QUERY_LOG['max_age']
+    for path in glob.glob(os.path.join(str(settings.QUERY_LOG['dir']), '*.json')):
+        try:
+            with open(path, encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if snapshot.get('updated', 0) < oldest:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # supprimé entre-temps par un autre process
+            continue
+        for value, count in snapshot['counts'].get(kind, {}).items():
+            totals[value] = totals.get(value, 0) + count
+    return sorted(totals.items(), key=lambda item: (-item[1], item[0]))[:n]
+
+
+query_log = _QueryLog()
+
+
+def record_search(view):
+    """Décorateur de vue : compte chaque requête, hits de cache compris (à placer avant @single_flight)."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            if request.META.get('HTTP_USER_AGENT') != PREWARM_USER_AGENT:
+                query_log.record(request.GET)
+        except Exception as e:
+            logger.warning("Journal des recherches : %s", e)
+        return view(request, *args, **kwargs)
+    return wrapper
@@ -7,7 +7,9 @@ Portage depuis comparer/helpers/search.py (toprix.tn) adapté pour l'API REST.
 
 Fonctionnalités :
 - Nettoyage et détection du type de requête
+- Lecture des prix (safe_price : texte / nombre → float > 0 ou None)
 - Construction de pipelines MongoDB Atlas Search
+- Filtres prix / promo / stock compilés dans les pipelines (pas de post-filtrage)
 - Filtrage post-recherche par pertinence
 - Calcul du minimumShouldMatch dynamique
 """
@@ -15,10 +17,18 @@ Fonctionnalités :
 import re
 import math
 import logging
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
+
+from .metrics import counter
 
 logger = logging.getLogger('api')
 
+RELEVANCE_DOCS = counter(
+    'toprix_relevance_docs_total',
+    "Docs passés au filtre de pertinence (result=in) et conservés (result=kept)",
+    ('result',),
+)
+
 # ============================================
 # PROJECTION POUR LES PIPELINES ATLAS SEARCH
 # Inclut tous les champs nécessaires à format_produit_from_store()
@@ -84,12 +94,67 @@ def calculate_min_should_match(num_words: int) -> int:
         return math.ceil(num_words * 0.3)
 
 
-def build_reference_pipeline(query: str, skip: int = 0, limit: int = 10) -> List[Dict]:
+# ============================================
+# FILTRES PRIX / PROMO / STOCK
+# ============================================
+
+def safe_price(val):
+    """Convertit une valeur en float > 0, sinon None."""
+    try:
+        p = float(val)
+        return p if p > 0 else None
+    except (ValueError, TypeError):
+        return None
+
+
+def build_match_filter(prix_min=None, prix_max=None, en_promo=False, en_stock=False) -> Dict:
+    """
+    Filtres prix / promo / stock en syntaxe find / $match
+    (pipeline référence, fallback regex, branche catégorie / marque).
+    """
+    query_filter = {}
+    if prix_min is not None or prix_max is not None:
+        price_filter = {}
+        if prix_min is not None:
+            price_filter['$gte'] = prix_min
+        if prix_max is not None:
+            price_filter['$lte'] = prix_max
+        query_filter['price'] = price_filter
+    if en_promo:
+        query_filter['discount'] = {'$gt': 0}
+    if en_stock:
+        query_filter['etat_stock'] = 'En stock'
+    return query_filter
+
+
+def build_search_filters(prix_min=None, prix_max=None, en_promo=False, en_stock=False) -> List[Dict]:
+    """
+    Mêmes filtres en clauses Atlas Search (compound.filter : n'affectent pas le score).
+    L'index "Text" doit mapper `price` / `discount` en number et `etat_stock` en token
+    (définition : docs/deployment.md) ; sinon Atlas renvoie 0 résultat sans erreur.
+    """
+    filters = []
+    if prix_min is not None or prix_max is not None:
+        price_range = {'path': 'price'}
+        if prix_min is not None:
+            price_range['gte'] = prix_min
+        if prix_max is not None:
+            price_range['lte'] = prix_max
+        filters.append({'range': price_range})
+    if en_promo:
+        filters.append({'range': {'path': 'discount', 'gt': 0}})
+    if en_stock:
+        filters.append({'equals': {'path': 'etat_stock', 'value': 'En stock'}})
+    return filters
+
+
+def build_reference_pipeline(query: str, skip: int = 0, limit: int = 10, filters: Dict = None) -> List[Dict]:
     """
     Pipeline MongoDB pour une recherche par référence produit.
+    `filters` : filtres prix / promo / stock (build_match_filter).
 
     Étapes :
-    1. $match exact sur le champ `reference` (case-insensitive)
+    1. $match exact sur le champ `reference` (case-insensitive) + filtres
     2. $addFields : exact_match (1 si correspondance parfaite)
     3. $sort : exact_match DESC, price ASC
     4. $skip / $limit
@@ -99,7 +164,8 @@ def build_reference_pipeline(query: str, skip: int = 0, limit: int = 10) -> List
     return [
         {
             '$match': {
-                'reference': {'$regex': f'^{re.escape(query)}$', '$options': 'i'}
+                'reference': {'$regex': f'^{re.escape(query)}$', '$options': 'i'},
+                **(filters or {}),
             }
         },
         {
@@ -120,9 +186,10 @@ def build_reference_pipeline(query: str, skip: int = 0, limit: int = 10) -> List
     ]
 
 
-def build_text_search_pipeline(query: str, num_words: int, skip: int = 0, limit: int = 10) -> List[Dict]:
+def build_text_search_compound(query: str, num_words: int, filters: List[Dict] = None) -> Dict:
     """
-    Pipeline MongoDB Atlas Search pour une recherche textuelle.
+    Opérateur compound Atlas Search d'une recherche textuelle (partagé par le
+    pipeline de résultats et les $searchMeta de facettes / comptage).
 
     Priorités (compound should) :
     1. Phrase exacte complète  → boost x10
@@ -130,47 +197,61 @@ def build_text_search_pipeline(query: str, num_words: int, skip: int = 0, limit:
     3. Fuzzy match (maxEdits 1) → boost x2
 
     minimumShouldMatch calculé dynamiquement selon le nombre de mots.
+    `filters` : clauses compound.filter (build_search_filters).
+    """
+    compound = {
+        'should': [
+            # Priorité 1 : phrase exacte complète
+            {
+                'phrase': {
+                    'query': query,
+                    'path': 'title',
+                    'score': {'boost': {'value': 10}}
+                }
+            },
+            # Priorité 2 : mots exacts
+            {
+                'text': {
+                    'query': query,
+                    'path': 'title',
+                    'score': {'boost': {'value': 5}}
+                }
+            },
+            # Priorité 3 : fuzzy (tolérance fautes de frappe)
+            {
+                'text': {
+                    'query': query,
+                    'path': 'title',
+                    'fuzzy': {'maxEdits': 1},
+                    'score': {'boost': {'value': 2}}
+                }
+            },
+        ],
+        'minimumShouldMatch': calculate_min_should_match(num_words),
+    }
+    if filters:
+        compound['filter'] = filters
+    return compound
+
+
+def build_text_search_pipeline(query: str, num_words: int, skip: int = 0, limit: int = 10,
+                               filters: List[Dict] = None) -> List[Dict]:
+    """
+    Pipeline MongoDB Atlas Search pour une recherche textuelle
+    (opérateur : build_text_search_compound).
+    `filters` : clauses compound.filter (build_search_filters) appliquées par Atlas.
+
     Tri : starts_with_query DESC, search_score DESC.
 
     Nécessite un index Atlas Search nommé "Text" sur le champ `title`.
     """
-    min_should_match = calculate_min_should_match(num_words)
     projection = {**SEARCH_PROJECTION, 'search_score': 1, 'starts_with_query': 1}
 
     return [
         {
             '$search': {
                 'index': 'Text',
-                'compound': {
-                    'should': [
-                        # Priorité 1 : phrase exacte complète
-                        {
-                            'phrase': {
-                                'query': query,
-                                'path': 'title',
-                                'score': {'boost': {'value': 10}}
-                            }
-                        },
-                        # Priorité 2 : mots exacts
-                        {
-                            'text': {
-                                'query': query,
-                                'path': 'title',
-                                'score': {'boost': {'value': 5}}
-                            }
-                        },
-                        # Priorité 3 : fuzzy (tolérance fautes de frappe)
-                        {
-                            'text': {
-                                'query': query,
-                                'path': 'title',
-                                'fuzzy': {'maxEdits': 1},
-                                'score': {'boost': {'value': 2}}
-                            }
-                        },
-                    ],
-                    'minimumShouldMatch': min_should_match
-                }
+                'compound': build_text_search_compound(query, num_words, filters),
             }
         },
         {
@@ -198,6 +279,44 @@ def build_text_search_pipeline(query: str, num_words: int, skip: int = 0, limit:
     ]
 
 
+def build_search_probe(query: str, num_words: int) -> List[Dict]:
+    """
+    Même recherche texte sans filtres, un seul _id : distingue « aucun produit dans
+    les filtres » d'un index "Text" qui ne mappe pas les champs filtrés.
+    """
+    return [
+        {'$search': {'index': 'Text', 'compound': build_text_search_compound(query, num_words)}},
+        {'$limit': 1},
+        {'$project': {'_id': 1}},
+    ]
+
+
+def _min_words_found(num_words: int, required: int) -> int:
+    """Mots de la requête (≥ 2 caractères) que le titre doit contenir."""
+    if num_words == 2:
+        return 1
+    if num_words <= 5:
+        return math.ceil(required * 0.6)
+    return math.ceil(required * 0.3)
+
+
+def relevance_match(query_words: List[str], num_words: int) -> Optional[Dict]:
+    """
+    Condition $match équivalente à filter_by_relevance : le comptage des résultats
+    (api/helpers/counts.py) compte les mêmes documents que ceux affichés.
+    None si la requête n'est pas post-filtrée.
+    """
+    required_words = [w.lower() for w in query_words if len(w) >= 2]
+    if num_words < 2 or not required_words:
+        return None
+    found = [
+        {'$cond': [{'$regexMatch': {'input': {'$ifNull': ['$title', '']}, 'regex': re.escape(word), 'options': 'i'}},
+                   1, 0]}
+        for word in required_words
+    ]
+    return {'$expr': {'$gte': [{'$add': found}, _min_words_found(num_words, len(required_words))]}}
+
+
 def filter_by_relevance(raw_docs: List[Dict], query_words: List[str], num_words: int) -> List[Dict]:
     """
     Post-filtre par pertinence pour les recherches multi-mots.
@@ -222,23 +341,19 @@ def filter_by_relevance(raw_docs: List[Dict], query_words: List[str], num_words:
         title_lower = doc.get('title', '').lower()
         words_found = sum(1 for word in required_words if word in title_lower)
 
-        if num_words == 2:
-            is_relevant = words_found >= 1
-        elif num_words <= 5:
-            is_relevant = words_found >= math.ceil(len(required_words) * 0.6)
-        else:
-            is_relevant = words_found >= math.ceil(len(required_words) * 0.3)
-
-        if is_relevant:
+        if words_found >= _min_words_found(num_words, len(required_words)):
             doc['_relevance_score'] = words_found / len(required_words)
             filtered.append(doc)
 
+    RELEVANCE_DOCS.inc(len(raw_docs), result='in')
+    RELEVANCE_DOCS.inc(len(filtered), result='kept')
+
     filtered.sort(key=lambda d: d.get('_relevance_score', 0), reverse=True)
     for doc in filtered:
         doc.pop('_relevance_score', None)
 
     if len(raw_docs) > len(filtered):
-        logger.info(f"Filtrage pertinence : {len(raw_docs)} → {len(filtered)} produits")
+        logger.debug("Filtrage pertinence : %s → %s produits", len(raw_docs), len(filtered))
 
     return filtered
 
@@ -257,7 +372,7 @@ def filter_exact_matches(raw_docs: List[Dict]) -> Tuple[List[Dict], bool]:
     if exact:
         for doc in exact:
             doc.pop('exact_match', None)
-        logger.info(f"{len(exact)} exact match(es) référence")
+        logger.debug("%s exact match(es) référence", len(exact))
         return exact, True
     else:
         for doc in raw_docs:
@@ -0,0 +1,63 @@
+"""
+============================================
+API/HELPERS/SESSIONS.PY
+============================================
+Purge périodique des sessions expirées (équivalent de `manage.py clearsessions`).
+
+Démarrée par core/wsgi.py : un thread par process WSGI, mais un verrou fichier
+(fcntl, non bloquant) garantit qu'un seul process purge à la fois. Intervalle :
+settings.SESSION_SWEEP_INTERVAL (0 = désactivé, ex. si un cron lance clearsessions).
+"""
+
+import fcntl
+import logging
+import os
+import threading
+from importlib import import_module
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger('api')
+
+_started = False
+_start_lock = threading.Lock()
+
+
+def sweep_expired_sessions() -> bool:
+    """Purge si aucun autre process ne le fait déjà ; retourne True si la purge a eu lieu."""
+    lock_path = os.path.join(settings.BASE_DIR, 'var', 'sessions-sweep.lock')
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    with open(lock_path, 'w') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        try:
+            import_module(settings.SESSION_ENGINE).SessionStore.clear_expired()
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            close_old_connections()
+    return True
+
+
+def _run(interval: int) -> None:
+    stop = threading.Event()
+    while not stop.wait(interval):
+        try:
+            if sweep_expired_sessions():
+                logger.info("Sessions expirées purgées")
+        except Exception as e:
+            logger.warning("Purge des sessions impossible : %s", e)
+
+
+def start_session_sweeper() -> None:
+    global _started
+    interval = settings.SESSION_SWEEP_INTERVAL
+    if not interval:
+        return
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+    threading.Thread(target=_run, args=(interval,), name='session-sweeper', daemon=True).start()
@@ -0,0 +1,199 @@
+"""
+============================================
+API/HELPERS/SINGLEFLIGHT.PY
+============================================
+Regroupement des requêtes identiques simultanées (single-flight).
+
+Quand une page produit est partagée, des dizaines de requêtes identiques arrivent
+avant que la première réponse soit en cache ; chacune interrogerait les 3 stores.
+Avec @single_flight, sur un miss, une seule requête calcule (le « leader ») :
+- dans le process : les autres threads attendent le résultat du leader en mémoire
+  (même statut, même contenu, y compris un 404)
+- entre process : le leader prend un bail dans le cache partagé (cache.add, expire
+  après SINGLE_FLIGHT['lease'] s) ; les autres process relisent la clé de cache
+  jusqu'à ce que la réponse y soit écrite
+
+Un follower calcule lui-même si le leader échoue, si le bail disparaît sans réponse
+en cache (réponse partielle, non mise en cache) ou après SINGLE_FLIGHT['wait'] s.
+L'attente est aussi bornée par le budget restant de la requête (@request_deadline placé
+au-dessus de @single_flight) : un leader lent ne retient pas ses followers au-delà de
+l'échéance de leur endpoint.
+Le bail entre process n'a d'effet qu'avec un cache partagé (CACHE_BACKEND non LocMem).
+
+coalesce() applique le même regroupement, dans le process, à un calcul quelconque dont
+le résultat n'est pas une réponse en cache (ex : miniature écrite sur disque).
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+from .cache import get_cached, peek_cached
+from .deadline import remaining
+from .metrics import counter
+from .timing import timed
+
+logger = logging.getLogger('api')
+
+SINGLE_FLIGHT = counter(
+    'toprix_single_flight_total',
+    "Misses de cache par rôle (leader ; follower / remote : résultat d'un leader du process / d'un autre process ; fallback : calcul propre)",
+    ('namespace', 'role'),
+)
+
+
+class _Flight:
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None  # (data, status) du leader ; None si le leader a échoué
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def _wait_limit() -> float:
+    """Attente max d'un follower : SINGLE_FLIGHT['wait'], bornée par le budget restant de la requête."""
+    wait = settings.SINGLE_FLIGHT['wait']
+    left = remaining()
+    return wait if left is None else max(0.0, min(wait, left))
+
+
+def _lease_key(key: str) -> str:
+    return f"{key}:lease"
+
+
+def _wait_remote(key: str, deadline: float):
+    """Attend qu'un autre process écrive la réponse ; None si elle ne viendra pas."""
+    lease_key = _lease_key(key)
+    poll = settings.SINGLE_FLIGHT['poll']
+    while time.monotonic() < deadline:
+        time.sleep(poll)
+        value = peek_cached(key)
+        if value is not None:
+            return value
+        if cache.get(lease_key) is None:
+            return peek_cached(key)  # bail rendu : réponse écrite juste avant, ou non cacheable
+    return None
+
+
+def _lead(namespace: str, key: str, compute):
+    """Calcul du leader du process, précédé (si possible) du bail partagé."""
+    cfg = settings.SINGLE_FLIGHT
+    token = f"{os.getpid()}:{uuid.uuid4().hex}"
+    if not cache.add(_lease_key(key), token, cfg['lease']):
+        # Un autre process calcule déjà cette réponse
+        with timed('coalesce'):
+            value = _wait_remote(key, time.monotonic() + _wait_limit())
+        if value is not None:
+            SINGLE_FLIGHT.inc(namespace=namespace, role='remote')
+            return Response(value)
+        SINGLE_FLIGHT.inc(namespace=namespace, role='fallback')
+        return compute()
+    SINGLE_FLIGHT.inc(namespace=namespace, role='leader')
+    try:
+        return compute()
+    finally:
+        if cache.get(_lease_key(key)) == token:
+            cache.delete(_lease_key(key))
+
+
+class _Call:
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None  # exception du leader, relancée chez les followers
+
+
+_calls = {}
+
+
+def coalesce(namespace: str, key: str, compute):
+    """
+    Un seul compute() à la fois par clé dans le process : les appels concurrents
+    attendent le leader et reçoivent son résultat (ou son exception). Après
+    _wait_limit() s sans réponse, un follower calcule lui-même.
+    """
+    if not settings.SINGLE_FLIGHT['enabled']:
+        return compute()
+    with _flights_lock:
+        call = _calls.get(key)
+        leader = call is None
+        if leader:
+            call = _calls[key] = _Call()
+
+    if not leader:
+        with timed('coalesce'):
+            finished = call.done.wait(_wait_limit())
+        if not finished:
+            SINGLE_FLIGHT.inc(namespace=namespace, role='fallback')
+            return compute()
+        SINGLE_FLIGHT.inc(namespace=namespace, role='follower')
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    SINGLE_FLIGHT.inc(namespace=namespace, role='leader')
+    try:
+        call.result = compute()
+        return call.result
+    except Exception as e:
+        call.error = e
+        raise
+    finally:
+        with _flights_lock:
+            _calls.pop(key, None)
+        call.done.set()
+
+
+def single_flight(namespace: str, key_func):
+    """
+    Décorateur de vue : lecture du cache `namespace` à la clé key_func(request, *args, **kwargs),
+    puis, sur un miss, un seul calcul par clé. La vue écrit elle-même la réponse
+    (set_cached) à cette clé ; elle ne relit plus le cache.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            key = key_func(request, *args, **kwargs)
+            cached = get_cached(namespace, key)
+            if cached is not None:
+                return Response(cached)
+            if not settings.SINGLE_FLIGHT['enabled']:
+                return view(request, *args, **kwargs)
+
+            with _flights_lock:
+                flight = _flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = _flights[key] = _Flight()
+
+            if not leader:
+                with timed('coalesce'):
+                    finished = flight.done.wait(_wait_limit())
+                if finished and flight.result is not None:
+                    SINGLE_FLIGHT.inc(namespace=namespace, role='follower')
+                    data, status = flight.result
+                    return Response(data, status=status)
+                SINGLE_FLIGHT.inc(namespace=namespace, role='fallback')
+                return view(request, *args, **kwargs)
+
+            try:
+                response = _lead(namespace, key, lambda: view(request, *args, **kwargs))
+                flight.result = (response.data, response.status_code)
+                return response
+            finally:
+                with _flights_lock:
+                    _flights.pop(key, None)
+                flight.done.set()
+        return wrapper
+    return decorator
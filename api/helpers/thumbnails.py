@@ -0,0 +1,236 @@
+"""
+============================================
+API/HELPERS/THUMBNAILS.PY
+============================================
+Miniatures des images produits (servies par GET /api/v1/images/miniature/).
+
+Les cartes produits pointaient directement vers les images pleine taille des boutiques
+(mytek.tn, tunisianet.com.tn, spacenet.tn). Le proxy :
+- télécharge l'image distante une seule fois (hôtes autorisés uniquement, y compris à
+  chaque redirection ; taille bornée ; téléchargements simultanés d'une même miniature
+  regroupés par coalesce(), api/helpers/singleflight.py)
+- la redimensionne avec Pillow (largeurs IMAGE_PROXY['widths'], WebP), après contrôle
+  des dimensions annoncées (IMAGE_PROXY['max_pixels'], avant tout décodage)
+- la stocke sur disque sous sha256(url, largeur) → fichier immuable
+- évince les fichiers les moins récemment servis au-delà de IMAGE_PROXY['max_bytes']
+
+- thumbnail_url()  : URL publique de la miniature d'une image distante ('' si non proxifiable)
+- get_thumbnail()  : chemin du fichier sur disque (téléchargé / généré si absent)
+- open_thumbnail() : (chemin, fichier ouvert), régénéré si évincé entre-temps
+"""
+
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+import urllib.request
+from urllib.parse import urlencode, urlparse
+
+from django.conf import settings
+from PIL import Image
+
+from .metrics import counter
+from .singleflight import coalesce
+
+logger = logging.getLogger('api')
+
+THUMBNAIL_REQUESTS = counter(
+    'toprix_thumbnail_requests_total',
+    "Miniatures servies par résultat (hit disque, miss = téléchargement, error)",
+    ('result',),
+)
+
+
+# Formats décodés par le proxy (pas de décodeur exotique sur une entrée distante)
+SOURCE_FORMATS = ('JPEG', 'PNG', 'WEBP', 'GIF')
+
+
+class ThumbnailError(Exception):
+    """Image distante refusée, injoignable ou illisible."""
+
+
+def _host_allowed(url: str) -> bool:
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        return False
+    host = parsed.hostname.lower()
+    return any(host == allowed or host.endswith('.' + allowed)
+               for allowed in settings.IMAGE_PROXY['allowed_hosts'])
+
+
+def thumbnail_url(image_url: str, width: int = None) -> str:
+    """URL de la miniature (API_BASE_URL + route du proxy), '' si l'image n'est pas proxifiable."""
+    if not image_url or not _host_allowed(image_url):
+        return ''
+    width = width or settings.IMAGE_PROXY['default_width']
+    return f"{settings.API_BASE_URL}/api/v1/images/miniature/?{urlencode({'url': image_url, 'w': width})}"
+
+
+def _cache_path(url: str, width: int) -> str:
+    digest = hashlib.sha256(f"{url}|{width}".encode('utf-8')).hexdigest()
+    return os.path.join(settings.IMAGE_PROXY['dir'], digest[:2], f"{digest}.webp")
+
+
+class _AllowlistRedirectHandler(urllib.request.HTTPRedirectHandler):
+    """Suit une redirection seulement vers un hôte autorisé (pas de rebond vers le réseau interne)."""
+    max_redirections = 3
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        if not _host_allowed(newurl):
+            raise ThumbnailError(f"redirection vers un hôte non autorisé : {urlparse(newurl).hostname}")
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+_opener = urllib.request.build_opener(_AllowlistRedirectHandler)
+
+
+def _download(url: str) -> bytes:
+    cfg = settings.IMAGE_PROXY
+    req = urllib.request.Request(url, headers={'User-Agent': 'ToprixThumbnailer/1.0'})
+    try:
+        with _opener.open(req, timeout=cfg['timeout']) as response:
+            if not _host_allowed(response.geturl()):
+                raise ThumbnailError("hôte final non autorisé")
+            data = response.read(cfg['max_source_bytes'] + 1)
+    except ThumbnailError:
+        raise
+    except Exception as e:
+        raise ThumbnailError(f"téléchargement impossible : {e}") from e
+    if len(data) > cfg['max_source_bytes']:
+        raise ThumbnailError("image source trop volumineuse")
+    return data
+
+
+def _resize(data: bytes, width: int) -> bytes:
+    max_pixels = settings.IMAGE_PROXY['max_pixels']
+    try:
+        # open() ne lit que l'en-tête : dimensions contrôlées avant de décoder, sans toucher
+        # à Image.MAX_IMAGE_PIXELS (global, partagé avec api/helpers/images.py)
+        img = Image.open(io.BytesIO(data), formats=SOURCE_FORMATS)
+        if img.width * img.height > max_pixels:
+            raise ThumbnailError(f"image trop grande une fois décodée : {img.width}×{img.height}")
+        img.load()
+    except ThumbnailError:
+        raise
+    except Exception as e:
+        raise ThumbnailError(f"image illisible : {e}") from e
+    if img.mode not in ('RGB', 'RGBA'):
+        img = img.convert('RGBA' if 'transparency' in img.info else 'RGB')
+    if img.width > width:
+        img = img.resize((width, round(img.height * width / img.width)), Image.LANCZOS)
+    buf = io.BytesIO()
+    img.save(buf, 'WEBP', quality=settings.IMAGE_PROXY['quality'], method=4)
+    return buf.getvalue()
+
+
+# ============================================
+# ÉVICTION LRU (taille totale du dossier)
+# ============================================
+
+class _DiskLRU:
+    """
+    Taille du cache suivie en mémoire (recalculée au premier usage). Au-delà de
+    max_bytes, les fichiers au mtime le plus ancien sont supprimés jusqu'à 90 %
+    de la limite ; un hit rafraîchit le mtime du fichier servi.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._size = None
+
+    def _scan(self, root: str) -> list:
+        entries = []
+        for dirpath, _, filenames in os.walk(root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def touch(self, path: str) -> None:
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def added(self, size: int) -> None:
+        cfg = settings.IMAGE_PROXY
+        with self._lock:
+            if self._size is None:
+                self._size = sum(e[1] for e in self._scan(cfg['dir']))
+            else:
+                self._size += size
+            if self._size <= cfg['max_bytes']:
+                return
+            entries = sorted(self._scan(cfg['dir']))
+            total = sum(e[1] for e in entries)
+            target = cfg['max_bytes'] * 0.9
+            for _, file_size, path in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    total -= file_size
+                except FileNotFoundError:
+                    pass
+            self._size = total
+
+
+_lru = _DiskLRU()
+
+
+def get_thumbnail(url: str, width: int) -> str:
+    """Chemin local de la miniature ; ThumbnailError si l'URL / la largeur est refusée ou l'image KO."""
+    cfg = settings.IMAGE_PROXY
+    if width not in cfg['widths']:
+        raise ThumbnailError(f"largeur non autorisée : {width}")
+    if not _host_allowed(url):
+        raise ThumbnailError("hôte non autorisé")
+
+    path = _cache_path(url, width)
+    if os.path.exists(path):
+        THUMBNAIL_REQUESTS.inc(result='hit')
+        _lru.touch(path)
+        return path
+    # Misses simultanés de la même miniature : un seul téléchargement
+    return coalesce('thumbnail', path, lambda: _generate(url, width, path))
+
+
+def open_thumbnail(url: str, width: int):
+    """
+    (chemin, fichier ouvert en lecture) de la miniature. L'éviction LRU peut supprimer le
+    fichier entre get_thumbnail() et open() : il est alors régénéré une fois.
+    """
+    for _ in range(2):
+        path = get_thumbnail(url, width)
+        try:
+            return path, open(path, 'rb')
+        except FileNotFoundError:
+            logger.info("Miniature évincée avant lecture, régénérée : %s", url)
+    raise ThumbnailError("miniature évincée pendant sa génération")
+
+
+def _generate(url: str, width: int, path: str) -> str:
+    if os.path.exists(path):  # écrite par un leader qui vient de finir
+        THUMBNAIL_REQUESTS.inc(result='hit')
+        return path
+    start = time.perf_counter()
+    try:
+        thumb = _resize(_download(url), width)
+    except ThumbnailError:
+        THUMBNAIL_REQUESTS.inc(result='error')
+        raise
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp{os.getpid()}.{threading.get_ident()}"
+    with open(tmp, 'wb') as f:
+        f.write(thumb)
+    os.replace(tmp, path)
+    _lru.added(len(thumb))
+    THUMBNAIL_REQUESTS.inc(result='miss')
+    logger.debug("Miniature %spx générée en %.0f ms : %s", width, (time.perf_counter() - start) * 1000, url)
+    return path
@@ -0,0 +1,96 @@
+"""
+============================================
+API/HELPERS/TIMING.PY
+============================================
+Chronométrage des étapes du chemin chaud, par requête.
+
+- RequestTimer : durées cumulées par étape pour la requête courante
+- timed()      : context manager qui chronomètre une étape (optionnellement par store)
+- record()     : ajoute une durée déjà mesurée
+
+Le timer courant est porté par un ContextVar (activé par ServerTimingMiddleware).
+Hors requête (shell, commandes), les mesures sont simplement ignorées.
+
+Étapes utilisées dans api/views.py :
+  pipeline   construction des pipelines / filtres MongoDB
+  mongo      requêtes MongoDB (une entrée par store : mongo-mytek, …)
+  count      comptage du total par store (threads, en parallèle de mongo)
+  coalesce   attente du résultat d'une requête identique en cours (single-flight)
+  relevance  post-filtrage par pertinence
+  format     équilibrage, dédoublonnage, formatage, tri
+  serialize  rendu JSON de la réponse DRF
+  total      durée totale dans Django
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from .metrics import histogram
+
+STAGE_SECONDS = histogram(
+    'toprix_stage_duration_seconds',
+    "Durée des étapes du chemin chaud par endpoint",
+    ('endpoint', 'stage', 'store'),
+)
+
+_current: ContextVar[Optional['RequestTimer']] = ContextVar('toprix_request_timer', default=None)
+
+
+class RequestTimer:
+    """Durées cumulées (secondes) par (étape, store) pour une requête."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}  # (stage, store) → secondes, ordre d'insertion conservé
+
+    def add(self, stage: str, seconds: float, store: str = '') -> None:
+        key = (stage, store.lower())
+        with self._lock:
+            self._stages[key] = self._stages.get(key, 0.0) + seconds
+
+    def items(self):
+        with self._lock:
+            return list(self._stages.items())
+
+    def server_timing(self) -> str:
+        """Valeur du header Server-Timing (durées en ms)."""
+        return ', '.join(
+            f"{stage}-{store};dur={seconds * 1000:.1f}" if store else f"{stage};dur={seconds * 1000:.1f}"
+            for (stage, store), seconds in self.items()
+        )
+
+    def observe(self, endpoint: str) -> None:
+        """Reporte les durées de la requête dans l'histogramme agrégé."""
+        for (stage, store), seconds in self.items():
+            STAGE_SECONDS.observe(seconds, endpoint=endpoint, stage=stage, store=store)
+
+
+def activate(timer: RequestTimer):
+    return _current.set(timer)
+
+
+def deactivate(token) -> None:
+    _current.reset(token)
+
+
+def current() -> Optional[RequestTimer]:
+    return _current.get()
+
+
+def record(stage: str, seconds: float, store: str = '') -> None:
+    timer = _current.get()
+    if timer is not None:
+        timer.add(stage, seconds, store)
+
+
+@contextmanager
+def timed(stage: str, store: str = ''):
+    """Chronomètre le bloc et l'ajoute à l'étape `stage` (ex : timed('mongo', 'Mytek'))."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start, store)
@@ -0,0 +1,140 @@
+"""
+============================================
+BENCH — python manage.py bench
+============================================
+Benchmark reproductible des endpoints produits :
+1. génère un catalogue synthétique (bench/catalogue.py)
+2. l'écrit dans un MongoDB local ou dans un stand-in en mémoire (mongomock)
+3. redirige MONGODB_CONFIG vers ces collections
+4. rejoue un mix de requêtes (bench/scenarios.py) et affiche p50/p95/p99 par endpoint
+
+Exemples :
+  python manage.py bench --backend mongomock --size 2000
+  python manage.py bench --uri mongodb://localhost:27017 --output bench/results/main.json
+  python manage.py bench --compare bench/results/main.json
+"""
+import json
+import logging
+import subprocess
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from api.helpers.comparatif import rebuild_all_offers
+from bench.catalogue import generate_catalogue, seed_database
+from bench.runner import format_report, replay, summarize
+from bench.scenarios import build_requests
+from db.mongo import MongoDBPool
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, text=True,
+        ).strip()
+    except Exception:
+        return 'inconnu'
+
+
+class Command(BaseCommand):
+    help = "Benchmark des endpoints produits sur un catalogue synthétique"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backend', choices=['mongodb', 'mongomock'], default='mongodb',
+                            help="mongodb (instance locale) ou mongomock (stand-in en mémoire)")
+        parser.add_argument('--uri', default='mongodb://localhost:27017',
+                            help="URI du MongoDB local (backend mongodb)")
+        parser.add_argument('--db', default='toprix_bench', help="Base utilisée pour le catalogue")
+        parser.add_argument('--size', type=int, default=5000, help="Nombre de produits distincts")
+        parser.add_argument('--requests', type=int, default=1000, help="Requêtes mesurées")
+        parser.add_argument('--warmup', type=int, default=50, help="Requêtes de chauffe (non mesurées)")
+        parser.add_argument('--concurrency', type=int, default=1, help="Threads clients")
+        parser.add_argument('--seed', type=int, default=42, help="Graine du catalogue et du mix")
+        parser.add_argument('--output', help="Fichier JSON où écrire les résultats")
+        parser.add_argument('--compare', help="Résultats JSON de référence (écarts en %%)")
+        parser.add_argument('--no-cache', action='store_true',
+                            help="Désactive le cache Django (mesure le coût MongoDB brut)")
+        parser.add_argument('--verbose-logs', action='store_true',
+                            help="Conserver les logs INFO du logger api pendant le run")
+
+    def handle(self, *args, **opts):
+        client = self._make_client(opts)
+
+        self.stdout.write(f"Génération du catalogue ({opts['size']} produits, seed {opts['seed']})…")
+        catalogue = generate_catalogue(opts['size'], opts['seed'])
+        store_config = seed_database(client, opts['db'], catalogue)
+        for name, cfg in store_config.items():
+            settings.MONGODB_CONFIG[name] = {**settings.MONGODB_CONFIG.get(name, {}), **cfg}
+            MongoDBPool().register_client(name, client)
+        # Détail comparatif servi par les offres matérialisées, comme en production
+        rebuild_all_offers()
+        counts = ', '.join(f"{k}={len(v)}" for k, v in catalogue.items())
+        self.stdout.write(f"Catalogue chargé : {counts}")
+
+        # Les runs doivent partir d'un cache vide pour rester comparables
+        for alias in settings.CACHES:
+            caches[alias].clear()
+        if not opts['verbose_logs']:
+            logging.getLogger('api').setLevel(logging.ERROR)
+
+        paths = build_requests(catalogue, opts['requests'] + opts['warmup'], opts['seed'])
+        if opts['no_cache']:
+            dummy = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+            with override_settings(CACHES=dummy):
+                results, wall = replay(paths, warmup=opts['warmup'], concurrency=opts['concurrency'])
+        else:
+            results, wall = replay(paths, warmup=opts['warmup'], concurrency=opts['concurrency'])
+        summary = summarize(results, wall)
+        summary['meta'] = {
+            'commit': _git_commit(),
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'backend': opts['backend'],
+            'size': opts['size'],
+            'requests': opts['requests'],
+            'warmup': opts['warmup'],
+            'concurrency': opts['concurrency'],
+            'seed': opts['seed'],
+            'cache': not opts['no_cache'],
+        }
+
+        baseline = None
+        if opts['compare']:
+            with open(opts['compare'], encoding='utf-8') as f:
+                baseline = json.load(f)
+            base_meta = baseline.get('meta', {})
+            self.stdout.write(f"Référence : commit {base_meta.get('commit', '?')}")
+            differences = [
+                key for key in ('backend', 'size', 'requests', 'warmup', 'concurrency', 'seed', 'cache')
+                if base_meta.get(key) != summary['meta'][key]
+            ]
+            if differences:
+                self.stdout.write(self.style.WARNING(
+                    f"Paramètres différents de la référence ({', '.join(differences)}) : comparaison non fiable"
+                ))
+        self.stdout.write(format_report(summary, baseline))
+
+        if opts['output']:
+            with open(opts['output'], 'w', encoding='utf-8') as f:
+                json.dump(summary, f, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"Résultats écrits dans {opts['output']}"))
+
+    def _make_client(self, opts):
+        if opts['backend'] == 'mongomock':
+            try:
+                import mongomock
+            except ImportError:
+                raise CommandError(
+                    "Backend mongomock indisponible : pip install -r requirements-dev.txt "
+                    "(ou --backend mongodb avec un MongoDB local)")
+            return mongomock.MongoClient()
+
+        from pymongo import MongoClient
+        client = MongoClient(opts['uri'], serverSelectionTimeoutMS=3000)
+        try:
+            client.admin.command('ping')
+        except Exception as e:
+            raise CommandError(f"MongoDB local injoignable ({opts['uri']}) : {e}")
+        return client
@@ -0,0 +1,37 @@
+"""
+============================================
+BENCH_SQLITE — python manage.py bench_sqlite
+============================================
+Contention SQLite : lectures de la liste du blog pendant des insertions de demandes,
+avec le comportement SQLite par défaut puis avec settings.SQLITE_PRAGMAS.
+Base temporaire : la base du projet n'est pas touchée.
+
+Exemple :
+  python manage.py bench_sqlite --readers 8 --writers 2 --duration 10
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from bench.sqlite_contention import DEFAULT_PROFILE, format_comparison, run_profile
+
+
+class Command(BaseCommand):
+    help = "Benchmark de contention SQLite (PRAGMA par défaut vs SQLITE_PRAGMAS)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4, help="Connexions en lecture")
+        parser.add_argument('--writers', type=int, default=2, help="Connexions en écriture")
+        parser.add_argument('--duration', type=float, default=5.0, help="Durée par profil (s)")
+        parser.add_argument('--posts', type=int, default=2000, help="Articles en base")
+
+    def handle(self, *args, **opts):
+        params = {k: opts[k] for k in ('readers', 'writers', 'duration', 'posts')}
+        profiles = {
+            'defaut': {**DEFAULT_PROFILE, 'busy_timeout': settings.SQLITE_PRAGMAS['busy_timeout']},
+            'configure': settings.SQLITE_PRAGMAS,
+        }
+        results = {}
+        for name, pragmas in profiles.items():
+            self.stdout.write(f"Profil {name} : {', '.join(f'{k}={v}' for k, v in pragmas.items())}")
+            results[name] = run_profile(pragmas, **params)
+        self.stdout.write(format_comparison(results))
@@ -0,0 +1,22 @@
+"""
+============================================
+BUILD_COMPARATIF_OFFERS — python manage.py build_comparatif_offers
+============================================
+Reconstruit la collection d'offres comparatif matérialisées (api/helpers/comparatif.py)
+et crée les index Slug. À lancer après chaque import complet de comparatif ; entre deux
+imports, `watch_products` tient la collection à jour.
+"""
+from django.core.management.base import BaseCommand
+
+from api.helpers.comparatif import rebuild_all_offers
+
+
+class Command(BaseCommand):
+    help = "Reconstruit les offres comparatif matérialisées (prix min / max, offres triées)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **opts):
+        total = rebuild_all_offers(opts['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{total} offre(s) matérialisée(s)"))
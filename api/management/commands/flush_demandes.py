@@ -0,0 +1,19 @@
+"""
+============================================
+FLUSH_DEMANDES — python manage.py flush_demandes
+============================================
+Insère en base les demandes encore en attente dans les journaux d'écriture différée
+(api/helpers/intake.py) : journaux de process arrêtés, lots restés en échec.
+À lancer après un arrêt brutal, ou en cron par sécurité.
+"""
+from django.core.management.base import BaseCommand
+
+from api.helpers.intake import intake
+
+
+class Command(BaseCommand):
+    help = "Insère les demandes en attente dans les journaux d'écriture différée"
+
+    def handle(self, *args, **opts):
+        total = intake.recover_orphans()
+        self.stdout.write(self.style.SUCCESS(f"{total} demande(s) insérée(s)"))
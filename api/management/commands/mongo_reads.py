@@ -0,0 +1,58 @@
+"""
+============================================
+MONGO_READS — python manage.py mongo_reads
+============================================
+Affiche la read preference de chaque store (db/mongo.py) et les membres du replica
+set qui servent réellement les lectures : `--samples` requêtes de catalogue et de
+recherche (hedged) par store, regroupées par serveur.
+
+Pour vérifier la configuration contre un replica set local (cf. docs/deployment.md) :
+  MONGODB_MYTEK_URI="mongodb://localhost:27017,localhost:27018,localhost:27019/?replicaSet=rs0" \\
+      python manage.py mongo_reads --samples 50
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from db.mongo import MongoDBPool
+
+STORES = ('tunisianet', 'mytek', 'spacenet', 'comparatif')
+
+
+class Command(BaseCommand):
+    help = "Read preference par store et membres du replica set qui servent les lectures"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--samples', type=int, default=20, help="Lectures par store (défaut : 20)")
+        parser.add_argument('--store', choices=STORES, help="Un seul store")
+
+    def handle(self, *args, **opts):
+        pool = MongoDBPool()
+        for store in [opts['store']] if opts['store'] else STORES:
+            client = pool.get_client(store)
+            self.stdout.write(f"── {store}")
+            self.stdout.write(f"   topologie         : {client.topology_description.topology_type_name}")
+            for hedged in (False, True):
+                label = 'recherche (hedged)' if hedged else 'lectures'
+                col = pool.get_collection(store, hedged)
+                self.stdout.write(f"   {label:<18}: {col.read_preference}")
+                served = Counter()
+                for _ in range(opts['samples']):
+                    cursor = col.aggregate([{'$sample': {'size': 1}}, {'$project': {'_id': 1}}]) if hedged \
+                        else col.find({}, {'_id': 1}).limit(1)
+                    list(cursor)
+                    served[self._member(client, cursor.address)] += 1
+                for member, count in served.most_common():
+                    self.stdout.write(f"      {count:>5}  {member}")
+        self.stdout.write(f"maxStalenessSeconds : {settings.MONGODB_READS['max_staleness']}")
+
+    def _member(self, client, address) -> str:
+        if address is None:
+            return '?'
+        host = f"{address[0]}:{address[1]}"
+        if address == client.primary:
+            return f"{host} (primaire)"
+        if address in client.secondaries:
+            return f"{host} (secondaire)"
+        return host
@@ -0,0 +1,76 @@
+"""
+============================================
+PREWARM_CACHE — python manage.py prewarm_cache
+============================================
+Rejoue les recherches les plus fréquentes (api/helpers/querylog.py) pour que les
+premiers visiteurs après un déploiement ou un scrape tombent sur des entrées chaudes.
+
+- sans --base-url : les vues sont appelées dans ce process → remplit le cache partagé
+  (CACHE_BACKEND non LocMem ; avec LocMem, seul ce process en profiterait)
+- avec --base-url : requêtes HTTP vers l'API déployée → réchauffe aussi le cache
+  LocMem du worker qui répond
+
+Rejoue les N requêtes complètes les plus fréquentes, puis les N catégories et marques
+les plus filtrées (/produits/?categorie=… / ?marque=…) si elles n'y étaient pas déjà.
+"""
+import time
+import urllib.request
+from urllib.parse import urlencode
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from api import views
+from api.helpers.querylog import PREWARM_USER_AGENT, top
+
+
+class Command(BaseCommand):
+    help = "Préchauffe le cache avec les recherches les plus fréquentes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=50, help="Nombre de valeurs par type (défaut : 50)")
+        parser.add_argument('--base-url', default='',
+                            help="Rejouer en HTTP vers cette API (ex. https://api.toprix.tn)")
+        parser.add_argument('--show', action='store_true', help="Afficher les tops sans rien rejouer")
+
+    def handle(self, *args, **opts):
+        requetes = top('requete', opts['top'])
+        if opts['show']:
+            for kind in ('requete', 'q', 'categorie', 'marque'):
+                self.stdout.write(f"── {kind}")
+                for value, count in top(kind, opts['top']):
+                    self.stdout.write(f"{count:>8}  {value}")
+            return
+
+        queries = [value for value, _ in requetes]
+        for kind in ('categorie', 'marque'):
+            for value, _ in top(kind, opts['top']):
+                query = urlencode({kind: value})
+                if query not in queries:
+                    queries.append(query)
+
+        replay = self._http if opts['base_url'] else self._local
+        warmed, start = 0, time.perf_counter()
+        for query in queries:
+            try:
+                status = replay(query, opts['base_url'].rstrip('/'))
+            except Exception as e:
+                self.stderr.write(f"{query} : {e}")
+                continue
+            if status == 200:
+                warmed += 1
+            else:
+                self.stderr.write(f"{query} : HTTP {status}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{warmed}/{len(queries)} recherche(s) préchauffée(s) en {time.perf_counter() - start:.1f} s"))
+
+    def _local(self, query: str, base_url: str) -> int:
+        request = RequestFactory().get(f"/api/v1/produits/?{query}", HTTP_USER_AGENT=PREWARM_USER_AGENT)
+        return views.produits_list(request).status_code
+
+    def _http(self, query: str, base_url: str) -> int:
+        req = urllib.request.Request(f"{base_url}/api/v1/produits/?{query}",
+                                     headers={'User-Agent': PREWARM_USER_AGENT})
+        with urllib.request.urlopen(req, timeout=30) as response:
+            response.read()
+            return response.status
@@ -0,0 +1,39 @@
+"""
+============================================
+WATCH_PRODUCTS — python manage.py watch_products
+============================================
+Process dédié au suivi des écritures des scrapers (api/helpers/invalidation.py) :
+invalide les entrées de cache produits concernées, au fil des change streams.
+
+Le cache doit être partagé avec les process WSGI (CACHE_BACKEND non LocMem),
+sinon les invalidations n'atteignent pas l'API.
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.helpers.invalidation import WATCHED_STORES, start_watchers
+
+
+class Command(BaseCommand):
+    help = "Invalide le cache produits au fil des change streams MongoDB"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--store', action='append', choices=WATCHED_STORES,
+                            help="Store à suivre (répétable, défaut : tous)")
+
+    def handle(self, *args, **opts):
+        if 'locmem' in settings.CACHES['default']['BACKEND'].lower():
+            raise CommandError(
+                "Cache LocMem : invalidations invisibles pour l'API. Définir CACHE_BACKEND "
+                "(ex. FileBasedCache) ou CACHE_INVALIDATION_IN_PROCESS=True."
+            )
+        stores = opts['store'] or WATCHED_STORES
+        start_watchers(stores)
+        self.stdout.write(f"Suivi de : {', '.join(stores)} (Ctrl+C pour arrêter)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            self.stdout.write("Arrêt")
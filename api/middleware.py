@@ -0,0 +1,78 @@
+"""
+============================================
+API/MIDDLEWARE.PY — Middlewares de l'API
+============================================
+"""
+import time
+
+from django.conf import settings
+
+from .helpers import timing
+from .helpers.metrics import counter
+
+REQUESTS = counter(
+    'toprix_requests_total',
+    "Requêtes API par endpoint et code HTTP",
+    ('endpoint', 'status'),
+)
+EMPTY_RESULTS = counter(
+    'toprix_empty_results_total',
+    "Réponses API sans résultat (liste data vide ou 404)",
+    ('endpoint',),
+)
+
+
+def _timing_visible(request) -> bool:
+    """Server-Timing : pour tous si SERVER_TIMING, sinon seulement avec le jeton METRICS_TOKEN."""
+    if settings.SERVER_TIMING:
+        return True
+    token = settings.METRICS_TOKEN
+    return bool(token) and request.headers.get('Authorization') == f'Bearer {token}'
+
+
+def _is_empty(response) -> bool:
+    if response.status_code == 404:
+        return True
+    data = getattr(response, 'data', None)
+    return isinstance(data, dict) and data.get('data') == []
+
+
+class ServerTimingMiddleware:
+    """
+    Active un RequestTimer pour chaque requête :
+    - header `Server-Timing` avec les étapes mesurées (SERVER_TIMING, ou requête
+      portant `Authorization: Bearer <METRICS_TOKEN>`)
+    - durées reportées dans l'histogramme toprix_stage_duration_seconds
+    - compteurs toprix_requests_total / toprix_empty_results_total
+    Le rendu JSON des réponses DRF est mesuré comme étape `serialize`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = timing.RequestTimer()
+        token = timing.activate(timer)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            timing.deactivate(token)
+        timer.add('total', time.perf_counter() - start)
+
+        match = getattr(request, 'resolver_match', None)
+        if match and match.url_name and not match.namespaces:  # endpoints API (hors admin)
+            timer.observe(match.url_name)
+            REQUESTS.inc(endpoint=match.url_name, status=response.status_code)
+            if _is_empty(response):
+                EMPTY_RESULTS.inc(endpoint=match.url_name)
+        if _timing_visible(request):
+            response['Server-Timing'] = timer.server_timing()
+        return response
+
+    def process_template_response(self, request, response):
+        start = time.perf_counter()
+        response.add_post_render_callback(
+            lambda r: timing.record('serialize', time.perf_counter() - start)
+        )
+        return response
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-19 10:58
+
+from django.db import migrations, models
+from django.db.models.functions import Substr
+
+
+def fill_excerpt(apps, schema_editor):
+    BlogPost = apps.get_model('api', 'BlogPost')
+    BlogPost.objects.update(excerpt=Substr('content', 1, 300))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogpost',
+            name='excerpt',
+            field=models.CharField(blank=True, default='', editable=False, max_length=300),
+        ),
+        migrations.RunPython(fill_excerpt, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='blogpost',
+            index=models.Index(fields=['-published_date', '-id'], name='blogpost_published_idx'),
+        ),
+    ]
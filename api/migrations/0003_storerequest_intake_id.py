@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 11:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_blogpost_excerpt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storerequest',
+            name='intake_id',
+            field=models.CharField(blank=True, editable=False, max_length=32, null=True, unique=True),
+        ),
+    ]
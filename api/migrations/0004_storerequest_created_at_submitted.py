@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-19 11:54
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_storerequest_intake_id'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='storerequest',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -7,6 +7,8 @@ Blog + Demandes (repris du projet toprix)
 from django.db import models
 from django.utils import timezone
 
+EXCERPT_LENGTH = 300
+
 
 # ============================================
 # BLOG
@@ -16,6 +18,8 @@ class BlogPost(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     content = models.TextField()
+    # Résumé pré-calculé (300 premiers caractères de content) : la liste ne charge pas le contenu complet
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, blank=True, default='', editable=False)
     image = models.ImageField(upload_to='blog/', blank=True, null=True)
     published_date = models.DateTimeField(default=timezone.now)
     launch_date = models.DateField(null=True, blank=True)
@@ -23,10 +27,18 @@ class BlogPost(models.Model):
 
     class Meta:
         ordering = ['-published_date']
+        indexes = [models.Index(fields=['-published_date', '-id'], name='blogpost_published_idx')]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        self.excerpt = (self.content or '')[:EXCERPT_LENGTH]
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'content' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'excerpt'}
+        super().save(*args, **kwargs)
+
 
 class BlogSummary(models.Model):
     post = models.OneToOneField(BlogPost, on_delete=models.CASCADE, related_name='summary')
@@ -92,7 +104,10 @@ class StoreRequest(models.Model):
     phone = models.CharField(max_length=20)
     message = models.TextField(blank=True, null=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Identifiant attribué à la réception (api/helpers/intake.py) : rend l'insertion différée idempotente
+    intake_id = models.CharField(max_length=32, unique=True, null=True, blank=True, editable=False)
+    # Date de réception de la demande (fixée par le flusher, pas à l'insertion différée)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
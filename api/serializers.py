@@ -6,6 +6,16 @@ API/SERIALIZERS.PY — Sérialiseurs DRF
 from django.conf import settings
 from rest_framework import serializers
 from .models import BlogPost, BlogSummary, BlogSpecifications, BlogSection, StoreRequest
+from .helpers.images import absolutize_variants, ensure_variants
+
+
+def image_variants(fieldfile, request=None):
+    """srcset WebP / JPEG + placeholder d'une image (URLs absolues si request fournie)."""
+    variants = ensure_variants(fieldfile)
+    if request is None:
+        return variants
+    base = request.build_absolute_uri('/')[:-1]
+    return absolutize_variants(variants, lambda url: base + url)
 
 
 class BlogSummarySerializer(serializers.ModelSerializer):
@@ -31,11 +41,19 @@ class BlogSpecsSerializer(serializers.ModelSerializer):
 
 class BlogSectionSerializer(serializers.ModelSerializer):
     image = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
     banner = serializers.SerializerMethodField()
+    banner_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = BlogSection
-        fields = ['order', 'h2_title', 'paragraph', 'image', 'banner', 'banner_url']
+        fields = ['order', 'h2_title', 'paragraph', 'image', 'image_variants', 'banner', 'banner_variants', 'banner_url']
+
+    def get_image_variants(self, obj):
+        return image_variants(obj.image, self.context.get('request'))
+
+    def get_banner_variants(self, obj):
+        return image_variants(obj.banner, self.context.get('request'))
 
     def get_image(self, obj):
         if obj.image:
@@ -66,6 +84,7 @@ class BlogPostListSerializer(serializers.ModelSerializer):
             'slug': data['slug'],
             'titre': instance.title,
             'image': data['image'],
+            'image_variants': image_variants(instance.image, self.context.get('request')),
             'date_publication': instance.published_date.isoformat(),
             'resume': data['resume'],
         }
@@ -77,8 +96,8 @@ class BlogPostListSerializer(serializers.ModelSerializer):
         return None
 
     def get_resume(self, obj):
-        # Résumé : texte brut des 300 premiers caractères du contenu
-        return obj.content[:300] if obj.content else ''
+        # Résumé pré-calculé à l'enregistrement (300 premiers caractères du contenu)
+        return obj.excerpt
 
 
 class BlogPostDetailSerializer(serializers.ModelSerializer):
@@ -124,11 +143,14 @@ class BlogPostDetailSerializer(serializers.ModelSerializer):
             'titre': instance.title,
             'contenu': instance.content,
             'image': image_url,
+            'image_variants': image_variants(instance.image, request),
             'date_publication': instance.published_date.isoformat(),
-            'resume': instance.content[:300] if instance.content else '',
+            'resume': instance.excerpt,
             'avantages': avantages,
             'inconvenients': inconvenients,
             'specifications': specifications,
+            # Sections ordonnées : à précharger (Prefetch ordonné, cf. api/helpers/blog.py)
+            'sections': BlogSectionSerializer(instance.sections.all(), many=True, context=self.context).data,
         }
 
 
@@ -0,0 +1,89 @@
+"""
+============================================
+API/SIGNALS.PY — Invalidation du détail d'article matérialisé
+============================================
+Toute écriture sur BlogPost, BlogSummary, BlogSpecifications ou BlogSection :
+1. supprime immédiatement l'entrée de cache de l'article (ancien slug compris)
+2. programme une reconstruction après commit (transaction.on_commit) — qui génère au
+   passage les variantes responsives des images nouvellement uploadées (api/helpers/images.py)
+
+Un enregistrement admin (article + inlines) déclenche plusieurs signaux dans la même
+transaction : la reconstruction n'a lieu qu'une fois par article, après le commit.
+Les slugs programmés sont suivis par connexion : le callback les retire après le commit,
+blog_atomic() les oublie si le bloc est annulé (l'admin des articles passe par lui).
+Hors transaction, on_commit s'exécute tout de suite : rien ne reste en attente.
+"""
+import weakref
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .helpers.blog import invalidate_post_detail, refresh_post_detail
+from .models import BlogPost, BlogSection, BlogSpecifications, BlogSummary
+
+# Connexion → slugs dont la reconstruction attend le commit
+_pending = weakref.WeakKeyDictionary()
+
+
+@contextmanager
+def blog_atomic(using=None):
+    """transaction.atomic qui oublie les reconstructions programmées si le bloc est annulé."""
+    connection = transaction.get_connection(using)
+    try:
+        with transaction.atomic(using=using):
+            yield
+    except BaseException:
+        # Un savepoint annulé peut avoir emporté des callbacks : tout oublier fait au pire
+        # programmer une reconstruction de plus, jamais en perdre une
+        _pending.pop(connection, None)
+        raise
+
+
+def _schedule_refresh(slug: str) -> None:
+    invalidate_post_detail(slug)
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        _pending.pop(connection, None)  # reste d'une transaction annulée hors blog_atomic()
+    pending = _pending.setdefault(connection, set())
+    if slug in pending:
+        return
+    pending.add(slug)
+
+    def refresh():
+        pending.discard(slug)
+        refresh_post_detail(slug)
+
+    transaction.on_commit(refresh)
+
+
+@receiver(pre_save, sender=BlogPost)
+def blog_post_slug_change(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        return
+    old_slug = BlogPost.objects.filter(pk=instance.pk).values_list('slug', flat=True).first()
+    if old_slug and old_slug != instance.slug:
+        invalidate_post_detail(old_slug)
+
+
+@receiver(post_save, sender=BlogPost)
+@receiver(post_delete, sender=BlogPost)
+def blog_post_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _schedule_refresh(instance.slug)
+
+
+@receiver(post_save, sender=BlogSummary)
+@receiver(post_save, sender=BlogSpecifications)
+@receiver(post_save, sender=BlogSection)
+@receiver(post_delete, sender=BlogSummary)
+@receiver(post_delete, sender=BlogSpecifications)
+@receiver(post_delete, sender=BlogSection)
+def blog_related_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # Suppression en cascade d'un article : le post est déjà traité par blog_post_changed
+    slug = BlogPost.objects.filter(pk=instance.post_id).values_list('slug', flat=True).first()
+    if slug:
+        _schedule_refresh(slug)
@@ -0,0 +1,80 @@
+"""
+Détail d'article (api/helpers/blog.py) : nombre de requêtes SQL indépendant du
+nombre de sections, sections ordonnées, réponse servie depuis le cache ; une seule
+reconstruction par transaction, même après une écriture annulée (api/signals.py).
+"""
+from django.test import TestCase
+from django.urls import reverse
+
+from api import signals
+from api.helpers.blog import build_post_detail, post_detail_key
+from api.helpers.cache import get_cached
+from api.models import BlogPost, BlogSection, BlogSpecifications, BlogSummary
+from api.signals import blog_atomic
+from .utils import isolate, jpeg
+
+
+class BlogDetailQueriesTests(TestCase):
+
+    def setUp(self):
+        isolate(self)
+
+    def make_post(self, slug: str, orders) -> BlogPost:
+        post = BlogPost.objects.create(title=slug, slug=slug, content='contenu', image=jpeg(f'{slug}.jpg'))
+        BlogSummary.objects.create(post=post, advantages='a\nb', disadvantages='c')
+        BlogSpecifications.objects.create(post=post, ram='8 Go')
+        for order in orders:
+            BlogSection.objects.create(
+                post=post, order=order, h2_title=f'Section {order}', paragraph='texte',
+                image=jpeg(f'{slug}-{order}.jpg'), banner=jpeg(f'{slug}-{order}-banner.jpg'),
+            )
+        return post
+
+    def test_queries_do_not_grow_with_sections(self):
+        self.make_post('une-section', [1])
+        self.make_post('huit-sections', range(8))
+        # Article + résumé + specs (jointure), puis sections (un Prefetch)
+        with self.assertNumQueries(2):
+            build_post_detail('une-section')
+        with self.assertNumQueries(2):
+            payload = build_post_detail('huit-sections')
+        self.assertEqual(len(payload['sections']), 8)
+        self.assertTrue(all(s['image_variants'] and s['banner_variants'] for s in payload['sections']))
+
+    def test_sections_are_ordered(self):
+        self.make_post('ordre', [3, 1, 2])
+        payload = build_post_detail('ordre')
+        self.assertEqual([s['order'] for s in payload['sections']], [1, 2, 3])
+
+    def test_cached_detail_runs_no_query(self):
+        self.make_post('cache', [1, 2])
+        url = reverse('blog-detail', args=['cache'])
+        # secure=True : pas de redirection HTTPS (SECURE_SSL_REDIRECT quand DEBUG=False)
+        self.assertEqual(self.client.get(url, HTTP_HOST='localhost', secure=True).status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_HOST='localhost', secure=True)
+        self.assertEqual(len(response.json()['sections']), 2)
+
+
+class BlogRefreshTests(TestCase):
+
+    def setUp(self):
+        isolate(self)
+        self.addCleanup(signals._pending.clear)
+
+    def test_one_refresh_per_transaction(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            post = BlogPost.objects.create(title='t', slug='unique', content='c')
+            BlogSummary.objects.create(post=post, advantages='a', disadvantages='b')
+            post.save()
+        self.assertEqual(len(callbacks), 1)
+        self.assertIsNotNone(get_cached('blog_detail', post_detail_key('unique')))
+
+    def test_rolled_back_write_does_not_block_next_refresh(self):
+        with self.assertRaises(RuntimeError), blog_atomic():
+            BlogPost.objects.create(title='t', slug='annule', content='c')
+            raise RuntimeError
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            BlogPost.objects.create(title='t', slug='annule', content='c')
+        self.assertEqual(len(callbacks), 1)
+        self.assertIsNotNone(get_cached('blog_detail', post_detail_key('annule')))
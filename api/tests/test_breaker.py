@@ -0,0 +1,110 @@
+"""
+Disjoncteurs (api/helpers/breaker.py) : un maxTimeMS dépassé rend la requête partielle
+sans ouvrir le disjoncteur ; les pannes réseau l'ouvrent. Vues catégorie / marque :
+une seule admission par boutique (la sonde half-open est bien envoyée), boutiques
+écartées signalées dans meta, 503 quand aucune n'a répondu.
+Stand-in MongoDB : mongomock (requirements-dev.txt).
+"""
+from unittest import mock
+
+import mongomock
+from django.core.cache import caches
+from django.test import SimpleTestCase
+from django.urls import reverse
+from pymongo.errors import ExecutionTimeout, ServerSelectionTimeoutError
+
+from api import views
+from api.helpers import breaker
+from api.helpers.breaker import circuit_closed, circuit_record
+
+
+class BreakerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.addCleanup(breaker._breakers.clear)
+
+    def test_execution_timeouts_do_not_open(self):
+        for _ in range(20):
+            circuit_record('lent', ExecutionTimeout('maxTimeMS'))
+            circuit_record('lent', ExecutionTimeout('maxTimeMS'), kind='search')
+        self.assertTrue(circuit_closed('lent'))
+        self.assertTrue(circuit_closed('lent', 'search'))
+
+    def test_server_selection_timeouts_open(self):
+        for _ in range(5):
+            circuit_record('panne', ServerSelectionTimeoutError('injoignable'))
+        self.assertFalse(circuit_closed('panne'))
+
+
+class _Down:
+    """Collection injoignable."""
+
+    def __getattr__(self, name):
+        raise ServerSelectionTimeoutError('injoignable')
+
+
+class StoreViewsBreakerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.addCleanup(breaker._breakers.clear)
+        for alias in caches:
+            caches[alias].clear()
+        db = mongomock.MongoClient().db
+        self.cols = {}
+        for store in ('Mytek', 'Spacenet'):
+            self.cols[store] = db[store.lower()]
+            self.cols[store].insert_many([
+                {'title': f'PC {store} {i}', 'price': 1000.0 + i, 'brand': 'HP',
+                 'category': 'informatique', 'subcategory': 'pc-portable'}
+                for i in range(3)
+            ])
+        patcher = mock.patch.object(views, 'get_all_stores', return_value=[
+            (lambda hedged=False, store=store: self.cols[store], store) for store in self.cols
+        ])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def open_circuit(self, store, elapsed=False):
+        for _ in range(5):
+            circuit_record(store, ServerSelectionTimeoutError('injoignable'))
+        if elapsed:
+            breaker._breaker(store, 'store').opened_at = 0.0  # cooldown écoulé : prochaine requête = sonde
+
+    def get(self, name, **kwargs):
+        return self.client.get(reverse(name, kwargs=kwargs), HTTP_HOST='localhost', secure=True)
+
+    def test_half_open_probe_is_sent_once(self):
+        self.open_circuit('Mytek', elapsed=True)
+        response = self.get('categorie-detail', slug='informatique')
+        self.assertEqual(response.status_code, 200)
+        sources = {p['boutique'] for p in response.json()['data']}
+        self.assertIn('Mytek', sources)
+        self.assertNotIn('partiel', response.json()['meta'])
+        self.assertTrue(circuit_closed('Mytek'))
+
+    def test_rejected_store_flags_partial_response(self):
+        self.open_circuit('Spacenet')
+        for name, kwargs in (('categorie-detail', {'slug': 'informatique'}),
+                             ('sous-categorie-detail', {'parent': 'informatique', 'sous': 'pc-portable'}),
+                             ('marque-detail', {'nom': 'hp'})):
+            response = self.get(name, **kwargs)
+            self.assertEqual(response.status_code, 200, name)
+            self.assertTrue(response.json()['meta']['partiel'], name)
+            self.assertEqual(response.json()['meta']['boutiques_indisponibles'], ['Spacenet'], name)
+
+    def test_failing_store_flags_partial_response(self):
+        self.cols['Spacenet'] = _Down()
+        response = self.get('marque-detail', nom='hp')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['meta']['boutiques_indisponibles'], ['Spacenet'])
+
+    def test_every_store_down_is_503(self):
+        self.open_circuit('Mytek')
+        self.cols['Spacenet'] = _Down()
+        for name, kwargs in (('categorie-detail', {'slug': 'informatique'}),
+                             ('sous-categorie-detail', {'parent': 'informatique', 'sous': 'pc-portable'}),
+                             ('marque-detail', {'nom': 'hp'})):
+            self.assertEqual(self.get(name, **kwargs).status_code, 503, name)
+
+    def test_unknown_category_is_still_404(self):
+        self.assertEqual(self.get('categorie-detail', slug='inconnue').status_code, 404)
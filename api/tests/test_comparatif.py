@@ -0,0 +1,68 @@
+"""
+Offres comparatif matérialisées (api/helpers/comparatif.py) : normalisation, mise à jour
+incrémentale, reconstruction complète, entrée trop ancienne recalculée sans watcher.
+Stand-in MongoDB : mongomock (requirements-dev.txt).
+"""
+import time
+from unittest import mock
+
+import mongomock
+from django.core.cache import caches
+from django.test import SimpleTestCase
+
+from api.helpers import comparatif
+from api.helpers.comparatif import build_offer, get_offer, rebuild_all_offers, sync_offer
+from api.helpers.invalidation import _beat
+
+
+def _doc(_id, slug, mytek='', tunisianet='', spacenet=''):
+    return {
+        '_id': _id, 'Slug': slug, 'Réf Mytek': f'REF{_id}', 'Produit Mytek': 'hp laptop 15',
+        'Prix Mytek': mytek, 'Prix Tunisianet': tunisianet, 'Prix Spacenet': spacenet,
+        'URL Mytek': 'https://www.mytek.tn/p', 'Image Tunisianet': 'https://www.tunisianet.com.tn/i.jpg',
+    }
+
+
+class ComparatifOffersTests(SimpleTestCase):
+
+    def setUp(self):
+        caches['tags'].clear()
+        db = mongomock.MongoClient().db
+        self.source, self.offers = db.comparatif, db.comparatif_offers
+        for name, col in (('get_comparatif', self.source), ('get_comparatif_offers', self.offers)):
+            patcher = mock.patch.object(comparatif, name, return_value=col)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_build_offer_sorts_and_skips_missing_prices(self):
+        offer = build_offer(_doc(1, 'hp-15', mytek='1299.0', tunisianet='abc', spacenet='1199'))
+        self.assertEqual([o['boutique'] for o in offer['offres']], ['Spacenet', 'Mytek'])
+        self.assertEqual((offer['prix_min'], offer['prix_max']), (1199.0, 1299.0))
+        self.assertEqual((offer['nom'], offer['marque'], offer['reference']), ('hp laptop 15', 'Hp', 'REF1'))
+        self.assertEqual(offer['image'], 'https://www.tunisianet.com.tn/i.jpg')
+
+    def test_sync_offer_upserts_and_deletes(self):
+        sync_offer(1, _doc(1, 'hp-15', mytek='100'))
+        sync_offer(1, _doc(1, 'hp-15', mytek='90'))
+        self.assertEqual(self.offers.find_one({'_id': 1})['prix_min'], 90.0)
+        sync_offer(1, None)
+        self.assertEqual(self.offers.count_documents({}), 0)
+
+    def test_rebuild_replaces_collection(self):
+        self.offers.insert_one({'_id': 99, 'Slug': 'disparu'})
+        self.source.insert_many([_doc(i, f'p-{i}', mytek=str(10 * i)) for i in range(1, 6)])
+        self.assertEqual(rebuild_all_offers(batch_size=2), 5)
+        self.assertEqual(sorted(d['_id'] for d in self.offers.find()), [1, 2, 3, 4, 5])
+
+    def test_stale_entry_without_watcher_is_rebuilt_live(self):
+        self.source.insert_one(_doc(1, 'hp-15', mytek='90'))
+        self.offers.insert_one({**build_offer(_doc(1, 'hp-15', mytek='100')), 'built_at': time.time() - 7200})
+        self.assertEqual(get_offer('hp-15')['prix_min'], 90.0)
+        _beat('comparatif', 10)  # watcher vivant : la sidecar est tenue à jour
+        self.assertEqual(get_offer('hp-15')['prix_min'], 100.0)
+
+    def test_recent_entry_is_served_from_sidecar(self):
+        self.source.insert_one(_doc(1, 'hp-15', mytek='90'))
+        self.offers.insert_one(build_offer(_doc(1, 'hp-15', mytek='100')))
+        self.assertEqual(get_offer('hp-15')['prix_min'], 100.0)
+        self.assertIsNone(get_offer('inconnu'))
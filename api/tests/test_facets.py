@@ -0,0 +1,95 @@
+"""
+Facettes (api/helpers/facets.py) : lecture des résultats $facet et $searchMeta, fusion des
+boutiques (marques sans tenir compte de la casse, tranches de prix, tranche ouverte).
+"""
+import mongomock
+from django.test import SimpleTestCase
+
+from api.helpers.facets import (
+    FACET_LIMIT,
+    OPEN_BUCKET,
+    PRICE_BOUNDARIES,
+    merge_facets,
+    mongo_facet_pipeline,
+    parse_mongo_facets,
+    parse_search_meta,
+)
+
+
+def _facets(total=0, marques=None, categories=None, prix=None, en_stock=0) -> dict:
+    return {'total': total, 'marques': marques or {}, 'categories': categories or {},
+            'prix': prix or {}, 'en_stock': en_stock}
+
+
+class ParseFacetsTests(SimpleTestCase):
+
+    def test_mongo_facets_from_pipeline(self):
+        col = mongomock.MongoClient().db.produits
+        col.insert_many([
+            {'brand': 'HP', 'category': 'pc', 'price': 50.0, 'etat_stock': 'En stock'},
+            {'brand': 'HP', 'category': 'pc', 'price': 1200.0, 'etat_stock': 'Sur commande'},
+            {'brand': '', 'category': 'ecran', 'price': 9000.0, 'etat_stock': 'En stock'},
+            {'brand': 'Asus', 'category': None, 'price': 300.0},
+        ])
+        doc = next(col.aggregate(mongo_facet_pipeline({})))
+        self.assertEqual(parse_mongo_facets(doc), {
+            'total': 4,
+            'marques': {'HP': 2, 'Asus': 1},
+            'categories': {'pc': 2, 'ecran': 1},
+            'prix': {0: 1, 250: 1, 1000: 1, OPEN_BUCKET: 1},
+            'en_stock': 2,
+        })
+
+    def test_mongo_facets_empty_match(self):
+        col = mongomock.MongoClient().db.produits
+        doc = next(col.aggregate(mongo_facet_pipeline({'brand': 'inconnue'})))
+        self.assertEqual(parse_mongo_facets(doc), _facets())
+
+    def test_search_meta(self):
+        doc = {
+            'count': {'total': 12},
+            'facet': {
+                'marques': {'buckets': [{'_id': 'HP', 'count': 7}, {'_id': '', 'count': 2}]},
+                'categories': {'buckets': [{'_id': 'pc', 'count': 12}]},
+                'stock': {'buckets': [{'_id': 'En stock', 'count': 5}, {'_id': 'Épuisé', 'count': 7}]},
+                'prix': {'buckets': [{'_id': 500, 'count': 9}, {'_id': OPEN_BUCKET, 'count': 3}]},
+            },
+        }
+        self.assertEqual(parse_search_meta(doc), _facets(
+            total=12, marques={'HP': 7}, categories={'pc': 12}, prix={500: 9, OPEN_BUCKET: 3}, en_stock=5))
+        self.assertEqual(parse_search_meta({}), _facets())
+
+
+class MergeFacetsTests(SimpleTestCase):
+
+    def test_brands_merge_case_insensitively(self):
+        merged = merge_facets({
+            'Mytek': _facets(total=5, marques={'HP': 3, 'Asus': 2}, en_stock=4),
+            'Tunisianet': _facets(total=4, marques={'hp': 4}, en_stock=1),
+        }, str.upper)
+        self.assertEqual(merged['marques'], [
+            {'slug': 'hp', 'nom': 'Hp', 'nombre_produits': 7},
+            {'slug': 'asus', 'nom': 'Asus', 'nombre_produits': 2},
+        ])
+        self.assertEqual(merged['boutiques'], [
+            {'slug': 'mytek', 'nom': 'Mytek', 'nombre_produits': 5},
+            {'slug': 'tunisianet', 'nom': 'Tunisianet', 'nombre_produits': 4},
+        ])
+        self.assertEqual(merged['en_stock'], 5)
+
+    def test_price_tranches_and_open_bucket(self):
+        merged = merge_facets({
+            'Mytek': _facets(prix={0: 2, 1000: 1, OPEN_BUCKET: 4}),
+            'Spacenet': _facets(prix={0: 1, OPEN_BUCKET: 1}),
+        }, str)
+        tranches = merged['prix']
+        self.assertEqual(len(tranches), len(PRICE_BOUNDARIES))
+        self.assertEqual(tranches[0], {'min': 0, 'max': 100, 'nombre_produits': 3})
+        self.assertEqual(tranches[4], {'min': 1000, 'max': 2000, 'nombre_produits': 1})
+        self.assertEqual(tranches[-1], {'min': PRICE_BOUNDARIES[-1], 'max': None, 'nombre_produits': 5})
+
+    def test_categories_are_named_and_capped(self):
+        categories = {f'cat-{i:02d}': i + 1 for i in range(FACET_LIMIT + 5)}
+        merged = merge_facets({'Mytek': _facets(categories=categories)}, lambda slug: slug.replace('-', ' '))
+        self.assertEqual(len(merged['categories']), FACET_LIMIT)
+        self.assertEqual(merged['categories'][0], {'slug': 'cat-34', 'nom': 'cat 34', 'nombre_produits': 35})
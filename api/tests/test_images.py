@@ -0,0 +1,36 @@
+"""
+Variantes responsives (api/helpers/images.py) : un miss du cache relit le manifeste
+sur disque au lieu de relire et décoder l'original.
+"""
+import os
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import TestCase
+
+from api.helpers import images
+from api.models import BlogPost
+from .utils import isolate, jpeg
+
+
+class VariantManifestTests(TestCase):
+
+    def setUp(self):
+        isolate(self)
+        self.post = BlogPost.objects.create(title='t', slug='t', content='c', image=jpeg('t.jpg', (800, 600)))
+
+    def test_cache_miss_reads_manifest_without_decoding(self):
+        variants = images.ensure_variants(self.post.image)
+        caches['default'].clear()
+        with mock.patch.object(images, '_generate', wraps=images._generate) as generate:
+            self.assertEqual(images.ensure_variants(self.post.image), variants)
+        generate.assert_not_called()
+
+    def test_missing_variant_file_regenerates(self):
+        variants = images.ensure_variants(self.post.image)
+        os.remove(images._variant_files(variants)[0])
+        caches['default'].clear()
+        with mock.patch.object(images, '_generate', wraps=images._generate) as generate:
+            self.assertEqual(images.ensure_variants(self.post.image), variants)
+        generate.assert_called_once()
+        self.assertTrue(all(os.path.exists(p) for p in images._variant_files(variants)))
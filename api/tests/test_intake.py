@@ -0,0 +1,80 @@
+"""
+Écriture différée des demandes (api/helpers/intake.py) : date de réception conservée,
+lot invalide mis en quarantaine sans bloquer les autres, ligne refusée par la base
+journalisée sans perdre ses voisines, journaux orphelins repris.
+"""
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api.helpers.intake import _pid_alive, intake
+from api.models import StoreRequest
+
+DEMANDE = {
+    'request_type': 'store', 'store_name': 'Boutique', 'contact_person': 'Contact',
+    'email': 'contact@example.com', 'phone': '20000000',
+}
+
+
+class IntakeFlushTests(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        intake_settings = override_settings(DEMANDES_INTAKE={**settings.DEMANDES_INTAKE, 'dir': self.dir})
+        intake_settings.enable()
+        self.addCleanup(intake_settings.disable)
+        # Pas de thread flusher : les tests appellent flush() eux-mêmes
+        patcher = mock.patch.object(intake, '_ensure_flusher')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write_batch(self, name: str, lines) -> str:
+        path = os.path.join(self.dir, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.writelines(f"{line}\n" for line in lines)
+        return path
+
+    def test_created_at_is_submission_time(self):
+        submitted = timezone.now() - timedelta(minutes=5)
+        with mock.patch('api.helpers.intake.timezone.now', return_value=submitted):
+            intake.enqueue(DEMANDE)
+        self.assertEqual(intake.flush(), 1)
+        self.assertEqual(StoreRequest.objects.get().created_at, submitted)
+
+    def test_bad_batch_is_quarantined_without_blocking_others(self):
+        bad = self.write_batch(f"demandes-{os.getpid()}.jsonl.00000000.batch", ['{pas du json'])
+        self.write_batch(f"demandes-{os.getpid()}.jsonl.ffffffff.batch",
+                         [json.dumps({**DEMANDE, 'intake_id': 'a' * 32})])
+        self.assertEqual(intake.flush(), 1)
+        self.assertEqual(StoreRequest.objects.count(), 1)
+        self.assertFalse(os.path.exists(bad))
+        self.assertTrue(os.path.exists(os.path.join(self.dir, 'quarantine', os.path.basename(bad))))
+        self.assertEqual(intake.flush(), 0)
+
+    def test_refused_row_is_logged_without_dropping_others(self):
+        StoreRequest.objects.create(**DEMANDE, intake_id='c' * 32)
+        self.write_batch(f"demandes-{os.getpid()}.jsonl.00000000.batch", [
+            json.dumps({**DEMANDE, 'intake_id': 'c' * 32}),  # lot rejoué : déjà en base
+            json.dumps({**DEMANDE, 'contact_person': None, 'intake_id': 'd' * 32}),  # NOT NULL
+            json.dumps({**DEMANDE, 'intake_id': 'e' * 32}),
+        ])
+        with self.assertLogs('api', 'ERROR') as logs:
+            self.assertEqual(intake.flush(), 1)
+        self.assertEqual(set(StoreRequest.objects.values_list('intake_id', flat=True)), {'c' * 32, 'e' * 32})
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('d' * 32, logs.output[0])
+
+    def test_orphan_journal_is_recovered(self):
+        dead = next(pid for pid in range(999_999, 900_000, -1) if not _pid_alive(pid))
+        self.write_batch(f"demandes-{dead}.jsonl", [json.dumps({**DEMANDE, 'intake_id': 'b' * 32})])
+        self.assertEqual(intake.recover_orphans(), 1)
+        self.assertEqual(os.listdir(self.dir), [])
+        self.assertEqual(StoreRequest.objects.get().intake_id, 'b' * 32)
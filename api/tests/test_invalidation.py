@@ -0,0 +1,96 @@
+"""
+Watcher d'invalidation (api/helpers/invalidation.py) : tags avant / après modification,
+resume token enregistré seulement après l'invalidation de ses événements.
+"""
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from api.helpers import invalidation
+from api.helpers.invalidation import StoreWatcher, _TagBatcher, tags_for_change
+
+
+def _update(fields, after, before=None) -> dict:
+    change = {
+        'operationType': 'update', 'documentKey': {'_id': 1}, 'fullDocument': after,
+        'updateDescription': {'updatedFields': fields, 'removedFields': []},
+    }
+    if before is not None:
+        change['fullDocumentBeforeChange'] = before
+    return change
+
+
+class TagsForChangeTests(SimpleTestCase):
+
+    def test_category_move_invalidates_old_and_new_tags(self):
+        tags = tags_for_change('mytek', _update(
+            {'category': 'Téléphonie'},
+            after={'category': 'Téléphonie', 'brand': 'Samsung'},
+            before={'category': 'Informatique', 'brand': 'Samsung'},
+        ))
+        self.assertTrue({'categorie:informatique', 'categorie:téléphonie', 'categories'} <= tags)
+        self.assertNotIn('store:mytek', tags)
+
+    def test_brand_change_without_before_image_bumps_store(self):
+        tags = tags_for_change('mytek', _update({'brand': 'Apple'}, after={'brand': 'Apple'}))
+        self.assertIn('store:mytek', tags)
+
+    def test_price_update_stays_targeted(self):
+        tags = tags_for_change('mytek', _update({'price': 10}, after={'brand': 'Apple', 'reference': 'R1'}))
+        self.assertEqual(tags, {'produit:1', 'ref:r1', 'marque:apple'})
+
+
+class _Stream:
+    """Change stream factice : rend les événements puis s'arrête."""
+
+    def __init__(self, watcher, changes):
+        self.watcher = watcher
+        self.changes = list(changes)
+        self.resume_token = None
+        self.alive = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def try_next(self):
+        if not self.changes:
+            self.alive = False
+            return None
+        token, change = self.changes.pop(0)
+        if change is None:  # le batcher invalide le lot en cours
+            self.watcher.batcher.flush()
+            return None
+        self.resume_token = token
+        return change
+
+
+class ResumeTokenTests(SimpleTestCase):
+
+    def test_token_saved_only_after_flush(self):
+        batcher = _TagBatcher(debounce=3600)
+        watcher = StoreWatcher('mytek', batcher)
+        change = _update({'price': 1}, after={})
+        stream = _Stream(watcher, [('t1', change), ('t2', change), (None, None), ('t3', change)])
+        with mock.patch.object(invalidation, '_load_token', return_value='t0'), \
+                mock.patch.object(watcher, '_open', return_value=stream), \
+                mock.patch.object(invalidation, 'invalidate_tags') as invalidate, \
+                mock.patch.object(invalidation, '_save_token') as save:
+            watcher._watch()
+        invalidate.assert_called_once()
+        # t3 n'est pas encore invalidé : au redémarrage, il sera rejoué
+        save.assert_called_once_with('mytek', 't2')
+
+    def test_failed_flush_keeps_tags_and_token(self):
+        batcher = _TagBatcher(debounce=3600)
+        batcher.add({'produit:1'})
+        with mock.patch.object(invalidation, 'invalidate_tags', side_effect=RuntimeError), \
+                self.assertRaises(RuntimeError):
+            batcher.flush()
+        self.assertEqual(batcher.flushed, 0)
+        with mock.patch.object(invalidation, 'invalidate_tags') as invalidate:
+            batcher.flush()
+        invalidate.assert_called_once_with({'produit:1'})
+        self.assertEqual(batcher.flushed, 2)
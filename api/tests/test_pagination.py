@@ -0,0 +1,175 @@
+"""
+Totaux et pages des listes produits : la condition de pertinence des comptages garde
+les mêmes documents que filter_by_relevance ; concatenated_page (catégorie,
+sous-catégorie, marque) sert chaque page par skip/limit, sans trou ni doublon ;
+quota_docs (multi-marque) rend la même sélection d'une requête à l'autre, avec $topN
+comme avec le repli sans $topN ; interleave_by alterne les marques.
+Stand-in MongoDB : mongomock (requirements-dev.txt) ; il ignore $topN, émulé ci-dessous.
+"""
+import random
+from concurrent.futures import Future
+
+import mongomock
+from django.test import SimpleTestCase
+from pymongo.errors import OperationFailure
+
+from api.helpers.filters import interleave_by, quota_docs
+from api.helpers.search import filter_by_relevance, relevance_match
+from api.views import MAX_PAGE, PAGE_SIZE, concatenated_page, paginate_page
+
+
+def _done(value) -> Future:
+    future = Future()
+    if isinstance(value, Exception):
+        future.set_exception(value)
+    else:
+        future.set_result(value)
+    return future
+
+
+class _TopNCollection:
+    """
+    Collection mongomock qui exécute quota_pipeline() comme un serveur >= 5.2 : $match et
+    $project par mongomock, $group / $topN évalué ici, étapes suivantes par mongomock.
+    """
+
+    def __init__(self, col):
+        self.col = col
+
+    def aggregate(self, pipeline, **kwargs):
+        head, group, tail = pipeline[:2], pipeline[2]['$group'], pipeline[3:]
+        field = group['_id']['$toLower'].lstrip('$')
+        top = group['docs']['$topN']
+        assert top['output'] == '$$ROOT'
+        (sort_key, direction), = top['sortBy'].items()
+        groups = {}
+        for doc in self.col.aggregate(head):
+            groups.setdefault(str(doc[field]).lower(), []).append(doc)
+        staging = mongomock.MongoClient().db.groups
+        for key, docs in groups.items():
+            docs.sort(key=lambda d: d[sort_key], reverse=direction < 0)
+            staging.insert_one({'_id': key, 'docs': docs[:top['n']]})
+        return staging.aggregate(tail)
+
+
+class _OldServer:
+    """Serveur sans $topN : l'agrégation échoue avec `code`, find() passe à mongomock."""
+
+    def __init__(self, col, code):
+        self.col, self.code = col, code
+
+    def aggregate(self, pipeline, **kwargs):
+        raise OperationFailure('Unrecognized expression', code=self.code)
+
+    def find(self, *args, **kwargs):
+        return self.col.find(*args, **kwargs)
+
+
+class RelevanceCountTests(SimpleTestCase):
+
+    def test_match_keeps_same_docs_as_post_filter(self):
+        titles = ['PC Portable HP 15', 'Ecran HP 24', 'PC Gamer Asus', 'Souris Logitech', 'Clavier']
+        col = mongomock.MongoClient().db.produits
+        col.insert_many([{'title': t} for t in titles])
+        for q in ('pc hp', 'pc portable hp', 'pc portable hp 15 pouces noir gamer'):
+            words = q.split()
+            expected = {d['title'] for d in filter_by_relevance([{'title': t} for t in titles], words, len(words))}
+            counted = {d['title'] for d in col.find(relevance_match(words, len(words)))}
+            self.assertEqual(counted, expected, q)
+
+    def test_single_word_is_not_filtered(self):
+        self.assertIsNone(relevance_match(['hp'], 1))
+
+
+class ConcatenatedPageTests(SimpleTestCase):
+
+    def setUp(self):
+        db = mongomock.MongoClient().db
+        self.targets = []
+        for store, size in (('mytek', 45), ('tunisianet', 7), ('spacenet', 30)):
+            db[store].insert_many([{'title': f'{store} {i}', 'brand': 'hp'} for i in range(size)])
+            self.targets.append([db[store], store, {'brand': 'hp'}, _done(size)])
+
+    def walk(self):
+        seen = []
+        for page in range(1, 6):
+            seen += [(d['_source'], d['title']) for d in concatenated_page(self.targets, page, 'test')]
+        return seen
+
+    def test_pages_cover_every_doc_once(self):
+        seen = self.walk()
+        self.assertEqual(len(seen), 82)
+        self.assertEqual(len(set(seen)), 82)
+
+    def test_unknown_count_falls_back_to_window(self):
+        self.targets[0][3] = _done(RuntimeError('comptage KO'))
+        seen = self.walk()
+        self.assertEqual(len(set(seen)), 82)
+
+    def test_deep_page_skips_instead_of_loading_window(self):
+        docs = concatenated_page(self.targets, 3, 'test')
+        self.assertEqual([d['title'] for d in docs[:6]], [f'mytek {i}' for i in range(40, 45)] + ['tunisianet 0'])
+
+    def test_total_pages_is_capped(self):
+        meta = paginate_page([{}] * PAGE_SIZE, 1, counts=(10 ** 6, True))['meta']
+        self.assertEqual(meta['total_pages'], MAX_PAGE)
+        self.assertEqual(meta['total_items'], 10 ** 6)
+
+
+class QuotaDocsTests(SimpleTestCase):
+
+    def test_quota_per_brand_is_deterministic(self):
+        col = mongomock.MongoClient().db.produits
+        col.insert_many([{'title': f'{brand} {i}', 'brand': brand}
+                         for i in range(30) for brand in ('HP', 'hp', 'Asus')])
+        match = {'brand': {'$in': ['HP', 'hp', 'Asus']}}
+        docs = quota_docs(col, match, 'brand', 25, {'title': 1, 'brand': 1})
+        by_brand = {}
+        for doc in docs:
+            by_brand.setdefault(doc['brand'].lower(), []).append(doc['_id'])
+        self.assertEqual(list(by_brand), ['asus', 'hp'])
+        self.assertEqual({brand: len(ids) for brand, ids in by_brand.items()}, {'asus': 25, 'hp': 25})
+        # Les 25 premiers _id de chaque marque (casse ignorée), à chaque appel
+        for brand, ids in by_brand.items():
+            stored = [d['_id'] for d in col.find({'brand': {'$regex': f'^{brand}$', '$options': 'i'}}).sort('_id', 1)]
+            self.assertEqual(ids, stored[:25])
+        self.assertEqual(quota_docs(col, match, 'brand', 25, {'title': 1, 'brand': 1}), docs)
+
+    def setUp(self):
+        # _id dans le désordre d'insertion : l'ordre naturel n'est pas celui des _id
+        self.col = mongomock.MongoClient().db.melange
+        docs = [{'_id': i, 'title': f'{brand} {i}', 'brand': brand}
+                for i, brand in enumerate(['HP', 'hp', 'Asus', 'Dell'] * 12)]
+        random.Random(7).shuffle(docs)
+        self.col.insert_many(docs)
+        self.match = {'brand': {'$in': ['HP', 'hp', 'Asus', 'Dell']}}
+
+    def test_topn_pipeline_and_fallback_select_same_docs(self):
+        projection = {'title': 1, 'brand': 1}
+        for quota in (1, 5, 12, 40):
+            with_topn = quota_docs(_TopNCollection(self.col), self.match, 'brand', quota, projection)
+            fallback = quota_docs(_OldServer(self.col, 168), self.match, 'brand', quota, projection)
+            self.assertEqual(with_topn, fallback, quota)
+            # Marques dans l'ordre alphabétique, _id croissants dans chaque marque
+            self.assertEqual([(d['brand'].lower(), d['_id']) for d in with_topn],
+                             sorted((d['brand'].lower(), d['_id']) for d in with_topn))
+            self.assertEqual(len(with_topn), min(quota, 12) * 2 + min(quota, 24))
+
+    def test_only_unknown_operator_errors_fall_back(self):
+        self.assertEqual(len(quota_docs(_OldServer(self.col, 15952), self.match, 'brand', 3, {'brand': 1})), 9)
+        with self.assertRaises(OperationFailure):
+            quota_docs(_OldServer(self.col, 11600), self.match, 'brand', 3, {'brand': 1})
+
+
+class InterleaveByTests(SimpleTestCase):
+
+    def test_brands_alternate_case_insensitively(self):
+        docs = [{'brand': b, 'n': i} for i, b in enumerate(['HP', 'hp', 'HP', 'Asus', 'Asus', 'Dell'])]
+        self.assertEqual([(d['brand'], d['n']) for d in interleave_by(docs, 'brand')],
+                         [('HP', 0), ('Asus', 3), ('Dell', 5), ('hp', 1), ('Asus', 4), ('HP', 2)])
+
+    def test_first_page_is_shared_between_brands(self):
+        docs = [{'brand': 'HP'}] * 40 + [{'brand': 'Asus'}] * 40 + [{'brand': None}] * 3
+        first_page = interleave_by(docs, 'brand')[:24]
+        counts = {b: sum(1 for d in first_page if d['brand'] == b) for b in ('HP', 'Asus', None)}
+        self.assertEqual(counts, {'HP': 11, 'Asus': 10, None: 3})
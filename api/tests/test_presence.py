@@ -0,0 +1,39 @@
+"""
+Résumés de présence (api/helpers/presence.py) : utilisés seulement quand un watcher
+confirme leur fraîcheur ; le store déjà constaté n'est jamais écarté.
+"""
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import SimpleTestCase
+
+from api.helpers import presence
+from api.helpers.invalidation import _beat
+from api.helpers.presence import StorePresence, prune_stores, tag_versions
+
+STORES = [(None, 'Mytek'), (None, 'Tunisianet')]
+
+
+class PresencePruningTests(SimpleTestCase):
+
+    def setUp(self):
+        caches['tags'].clear()
+        self.addCleanup(presence._summaries.clear)
+        for store in ('mytek', 'tunisianet'):
+            values = {kind: frozenset() for kind in presence.KINDS}
+            presence._summaries[store] = StorePresence(values, tag_versions(presence._tags(store)))
+
+    def test_without_watcher_every_store_is_queried(self):
+        with mock.patch.object(presence.threading, 'Thread') as thread:
+            self.assertEqual(prune_stores(STORES, references=['abc']), STORES)
+        thread.assert_not_called()  # pas de construction sans watcher
+
+    def test_with_watcher_empty_summaries_prune(self):
+        _beat('mytek', 10)
+        _beat('tunisianet', 10)
+        self.assertEqual(prune_stores(STORES, references=['abc']), [])
+
+    def test_store_of_the_product_is_kept(self):
+        _beat('mytek', 10)
+        _beat('tunisianet', 10)
+        self.assertEqual(prune_stores(STORES, references=['abc'], keep={'Mytek'}), [(None, 'Mytek')])
@@ -0,0 +1,57 @@
+"""
+Journal des recherches (api/helpers/querylog.py) : Space-Saving à buckets et lecture
+des instantanés quand un autre process les supprime.
+"""
+import json
+import os
+import random
+import shutil
+import tempfile
+from collections import Counter
+from unittest import mock
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+from api.helpers import querylog
+from api.helpers.querylog import SpaceSaving, top
+
+
+class SpaceSavingTests(SimpleTestCase):
+
+    def test_counts_and_heavy_hitters(self):
+        rng = random.Random(7)
+        stream = [str(int(rng.paretovariate(1.2))) for _ in range(20000)]
+        tracker = SpaceSaving(50)
+        for value in stream:
+            tracker.add(value)
+        self.assertEqual(len(tracker.counts), 50)
+        self.assertEqual(sum(tracker.counts.values()), len(stream))
+        self.assertEqual(tracker._min, min(tracker.counts.values()))
+        for value, count in Counter(stream).most_common(10):
+            self.assertGreaterEqual(tracker.counts[value], count)
+
+    def test_replaces_oldest_smallest_counter(self):
+        tracker = SpaceSaving(2)
+        for value in ('a', 'a', 'b', 'c'):
+            tracker.add(value)
+        self.assertEqual(tracker.counts, {'a': 2, 'c': 2})
+
+
+class TopTests(SimpleTestCase):
+
+    def test_expired_snapshot_removed_concurrently(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = os.path.join(directory, '1.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'updated': 0, 'counts': {'q': {'pc': 3}}}, f)
+        real_remove = os.remove
+
+        def remove_twice(target):
+            real_remove(target)  # un autre process l'a déjà supprimé
+            real_remove(target)
+
+        with override_settings(QUERY_LOG={**settings.QUERY_LOG, 'dir': directory}), \
+                mock.patch.object(querylog.os, 'remove', side_effect=remove_twice):
+            self.assertEqual(top('q', 5), [])
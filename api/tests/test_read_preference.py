@@ -0,0 +1,83 @@
+"""
+Read preference des lectures catalogue (db/mongo.py) : mode par store, maxStalenessSeconds,
+hedge seulement pour les agrégations de recherche et si MONGODB_READS['hedged_search'] ;
+commande mongo_reads (libellé des membres qui servent les lectures).
+Stand-in MongoDB : mongomock (requirements-dev.txt).
+"""
+import copy
+from unittest import mock
+
+import mongomock
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, override_settings
+from pymongo.read_preferences import Nearest, Primary, SecondaryPreferred
+
+from api.management.commands.mongo_reads import Command
+from db.mongo import MongoDBPool, read_preference_for
+
+
+def _reads(**overrides):
+    return {**settings.MONGODB_READS, 'read_preference': 'secondaryPreferred',
+            'max_staleness': 120, 'hedged_search': False, **overrides}
+
+
+def _config(**stores):
+    """MONGODB_CONFIG avec `read_preference` forcé pour les stores donnés (None : défaut global)."""
+    config = copy.deepcopy(settings.MONGODB_CONFIG)
+    for store in config:
+        config[store]['read_preference'] = stores.get(store)
+    return config
+
+
+class ReadPreferenceTests(SimpleTestCase):
+
+    @override_settings(MONGODB_READS=_reads(), MONGODB_CONFIG=_config())
+    def test_default_is_secondary_preferred_with_staleness(self):
+        pref = read_preference_for('mytek')
+        self.assertIsInstance(pref, SecondaryPreferred)
+        self.assertEqual(pref.max_staleness, 120)
+        self.assertIsNone(pref.hedge)
+
+    @override_settings(MONGODB_READS=_reads(), MONGODB_CONFIG=_config(spacenet='nearest', comparatif='primary'))
+    def test_per_store_override(self):
+        self.assertIsInstance(read_preference_for('spacenet'), Nearest)
+        self.assertIsInstance(read_preference_for('mytek'), SecondaryPreferred)
+        # primary n'accepte ni maxStalenessSeconds ni hedge
+        self.assertEqual(read_preference_for('comparatif', hedged=True), Primary())
+
+    @override_settings(MONGODB_READS=_reads(hedged_search=True), MONGODB_CONFIG=_config())
+    def test_hedge_only_for_search_reads(self):
+        self.assertEqual(read_preference_for('mytek', hedged=True).document,
+                         {'mode': 'secondaryPreferred', 'maxStalenessSeconds': 120, 'hedge': {'enabled': True}})
+        self.assertIsNone(read_preference_for('mytek').hedge)
+
+    @override_settings(MONGODB_READS=_reads(hedged_search=False), MONGODB_CONFIG=_config())
+    def test_hedge_disabled_by_setting(self):
+        self.assertIsNone(read_preference_for('mytek', hedged=True).hedge)
+
+    @override_settings(MONGODB_READS=_reads(), MONGODB_CONFIG=_config(mytek='secondaryOnly'))
+    def test_unknown_mode_is_rejected(self):
+        with self.assertRaises(ImproperlyConfigured):
+            read_preference_for('mytek')
+
+    @override_settings(MONGODB_READS=_reads(hedged_search=True), MONGODB_CONFIG=_config())
+    def test_pool_collections_carry_read_preference(self):
+        pool = MongoDBPool()
+        for patcher in (mock.patch.dict(pool._clients), mock.patch.dict(pool._read_prefs, clear=True)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        pool.register_client('mytek', mongomock.MongoClient())
+        self.assertIsInstance(pool.get_collection('mytek').read_preference, SecondaryPreferred)
+        self.assertEqual(pool.get_collection('mytek', hedged=True).read_preference.hedge, {'enabled': True})
+
+
+class MongoReadsCommandTests(SimpleTestCase):
+
+    def test_member_labels(self):
+        client = mock.Mock(primary=('db1', 27017), secondaries={('db2', 27017)})
+        member = Command()._member
+        self.assertEqual(member(client, ('db1', 27017)), 'db1:27017 (primaire)')
+        self.assertEqual(member(client, ('db2', 27017)), 'db2:27017 (secondaire)')
+        self.assertEqual(member(client, ('db3', 27017)), 'db3:27017')
+        self.assertEqual(member(client, None), '?')
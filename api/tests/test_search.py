@@ -0,0 +1,80 @@
+"""
+Filtres prix / promo / stock (api/helpers/search.py) : mêmes bornes en find / $match et en
+compound.filter Atlas Search ; une recherche filtrée vide dans Atlas mais pas sans filtres
+(index "Text" sans mapping des champs filtrés) repasse par le fallback regex.
+Stand-in MongoDB : mongomock (requirements-dev.txt).
+"""
+from unittest import mock
+
+import mongomock
+from django.core.cache import caches
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from api import views
+from api.helpers.search import build_match_filter, build_search_filters, build_text_search_compound
+
+
+class SearchFiltersTests(SimpleTestCase):
+
+    def test_clauses_match_find_filter(self):
+        self.assertEqual(build_search_filters(100, 500, en_promo=True, en_stock=True), [
+            {'range': {'path': 'price', 'gte': 100, 'lte': 500}},
+            {'range': {'path': 'discount', 'gt': 0}},
+            {'equals': {'path': 'etat_stock', 'value': 'En stock'}},
+        ])
+        self.assertEqual(build_match_filter(100, 500, en_promo=True, en_stock=True), {
+            'price': {'$gte': 100, '$lte': 500}, 'discount': {'$gt': 0}, 'etat_stock': 'En stock',
+        })
+
+    def test_single_bound_and_no_filter(self):
+        self.assertEqual(build_search_filters(prix_max=300), [{'range': {'path': 'price', 'lte': 300}}])
+        self.assertEqual(build_search_filters(), [])
+
+    def test_filters_do_not_score(self):
+        compound = build_text_search_compound('pc portable', 2, build_search_filters(en_stock=True))
+        self.assertEqual(compound['filter'], [{'equals': {'path': 'etat_stock', 'value': 'En stock'}}])
+        self.assertNotIn('filter', build_text_search_compound('pc portable', 2))
+
+
+class _UnmappedIndex:
+    """Collection mongomock + index "Text" qui ignore les champs filtrés (0 hit dès qu'il y a un filtre)."""
+
+    def __init__(self, col):
+        self.col = col
+
+    def __getattr__(self, name):
+        return getattr(self.col, name)
+
+    def aggregate(self, pipeline, **kwargs):
+        stage = pipeline[0]
+        if '$search' in stage:
+            if stage['$search']['compound'].get('filter'):
+                return iter([])
+            return iter(self.col.find({}, {'_id': 1}).limit(1))
+        if '$searchMeta' in stage:
+            return iter([])
+        return self.col.aggregate(pipeline, **kwargs)
+
+
+class UnmappedFilterFallbackTests(SimpleTestCase):
+
+    def setUp(self):
+        for alias in caches:
+            caches[alias].clear()
+        col = mongomock.MongoClient().db.mytek
+        col.insert_many([
+            {'title': 'PC Portable HP 15', 'price': 1500.0, 'etat_stock': 'En stock', 'brand': 'HP'},
+            {'title': 'PC Portable Lenovo', 'price': 900.0, 'etat_stock': 'En stock', 'brand': 'Lenovo'},
+        ])
+        store = _UnmappedIndex(col)
+        patcher = mock.patch.object(views, 'get_all_stores', return_value=[(lambda hedged=False: store, 'Mytek')])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_empty_filtered_search_falls_back_to_regex(self):
+        with self.assertLogs('api', 'WARNING') as logs:
+            response = self.client.get(reverse('produits-list'), {'q': 'pc portable', 'prix_max': 1000},
+                                       HTTP_HOST='localhost', secure=True)
+        self.assertEqual([p['nom'] for p in response.json()['data']], ['PC Portable Lenovo'])
+        self.assertTrue(any('mapping de l\'index "Text"' in line for line in logs.output))
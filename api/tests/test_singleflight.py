@@ -0,0 +1,120 @@
+"""
+Single-flight (api/helpers/singleflight.py) : un seul calcul pour des requêtes identiques
+simultanées, calcul propre des followers si le leader échoue ou si sa réponse n'est pas
+mise en cache, attente bornée par le budget de la requête.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from rest_framework.response import Response
+
+from api.helpers.deadline import request_deadline
+from api.helpers.singleflight import _lease_key, single_flight
+
+KEY = 'toprix:test:singleflight'
+
+
+class _View:
+    """Vue factice : le premier appel attend `gate` ; `fail_first` : il lève une exception."""
+
+    def __init__(self, fail_first=False):
+        self.gate = threading.Event()
+        self.calls = 0
+        self.fail_first = fail_first
+        self.lock = threading.Lock()
+        self.view = single_flight('search_results', lambda request: KEY)(self)
+
+    def __call__(self, request):
+        with self.lock:
+            self.calls += 1
+            first = self.calls == 1
+        if first:
+            self.gate.wait(5)
+            if self.fail_first:
+                raise RuntimeError('leader KO')
+        return Response({'calls': self.calls})
+
+
+def _run(view, n):
+    """n requêtes en parallèle ; retourne (réponses, exceptions)."""
+    responses, errors = [], []
+
+    def call():
+        try:
+            responses.append(view(RequestFactory().get('/')))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(n)]
+    for thread in threads:
+        thread.start()
+    return threads, responses, errors
+
+
+class SingleFlightTests(SimpleTestCase):
+
+    def setUp(self):
+        for alias in caches:
+            caches[alias].clear()
+
+    def start_leader_then_followers(self, fake, followers):
+        leader = _run(fake.view, 1)
+        while fake.calls < 1:
+            time.sleep(0.005)
+        others = _run(fake.view, followers)
+        time.sleep(0.1)  # followers en attente du leader
+        fake.gate.set()
+        for thread in leader[0] + others[0]:
+            thread.join()
+        return leader[1] + others[1], leader[2] + others[2]
+
+    def test_followers_share_leader_response(self):
+        fake = _View()
+        responses, errors = self.start_leader_then_followers(fake, 5)
+        self.assertEqual(errors, [])
+        self.assertEqual(fake.calls, 1)
+        self.assertEqual([r.data for r in responses], [{'calls': 1}] * 6)
+
+    def test_failed_leader_lets_followers_compute(self):
+        fake = _View(fail_first=True)
+        responses, errors = self.start_leader_then_followers(fake, 3)
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(len(responses), 3)
+        self.assertEqual(fake.calls, 4)
+
+    def test_remote_leader_response_is_read_from_cache(self):
+        fake = _View()
+        fake.gate.set()
+        cache.add(_lease_key(KEY), 'autre-process', 15)
+        threading.Timer(0.1, lambda: cache.set(KEY, {'calls': 'remote'})).start()
+        self.assertEqual(fake.view(RequestFactory().get('/')).data, {'calls': 'remote'})
+        self.assertEqual(fake.calls, 0)
+
+    def test_remote_partial_response_is_recomputed(self):
+        # Le leader d'un autre process rend son bail sans écrire (réponse partielle)
+        fake = _View()
+        fake.gate.set()
+        cache.add(_lease_key(KEY), 'autre-process', 15)
+        threading.Timer(0.1, lambda: cache.delete(_lease_key(KEY))).start()
+        self.assertEqual(fake.view(RequestFactory().get('/')).data, {'calls': 1})
+        self.assertEqual(fake.calls, 1)
+
+    def test_wait_is_capped_by_request_deadline(self):
+        budget = {**settings.REQUEST_DEADLINE, 'enabled': True, 'budgets': {'test': 0.2}}
+        with override_settings(REQUEST_DEADLINE=budget,
+                               SINGLE_FLIGHT={**settings.SINGLE_FLIGHT, 'enabled': True, 'wait': 10}):
+            fake = _View()
+            view = request_deadline('test')(fake.view)
+            leader = _run(view, 1)
+            while fake.calls < 1:
+                time.sleep(0.005)
+            start = time.monotonic()
+            response = view(RequestFactory().get('/'))  # follower d'un leader bloqué
+            elapsed = time.monotonic() - start
+            fake.gate.set()
+            leader[0][0].join()
+        self.assertLess(elapsed, 1)
+        self.assertEqual(response.data, {'calls': 2})
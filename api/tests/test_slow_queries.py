@@ -0,0 +1,30 @@
+"""
+Journal des requêtes lentes (db/slow_queries.py) : forme sans littéraux, explain envoyé
+avec la read preference du store plutôt qu'au primaire.
+"""
+from unittest import mock
+
+from django.test import SimpleTestCase
+from pymongo.read_preferences import SecondaryPreferred
+
+from db.slow_queries import SlowQueryListener, query_shape
+
+
+class SlowQueryTests(SimpleTestCase):
+
+    def test_shape_strips_literals(self):
+        shape = query_shape({'brand': {'$in': ['HP', 'Asus']}, 'price': {'$gte': 100}})
+        self.assertEqual(shape, {'brand': {'$in': ['?']}, 'price': {'$gte': '?'}})
+
+    def test_explain_uses_store_read_preference(self):
+        pool = mock.MagicMock()
+        pool.read_preference.return_value = SecondaryPreferred(max_staleness=120)
+        command = pool.get_client.return_value.__getitem__.return_value.command
+        command.return_value = {'queryPlanner': {'winningPlan': {'stage': 'COLLSCAN'}}}
+        entry = {}
+        with mock.patch('db.mongo.MongoDBPool', return_value=pool), \
+                self.assertLogs('api.slow_queries', 'WARNING'):
+            SlowQueryListener('mytek')._explain('toprix', {'find': 'produits'}, entry)
+        pool.read_preference.assert_called_once_with('mytek')
+        self.assertEqual(command.call_args.kwargs['read_preference'], SecondaryPreferred(max_staleness=120))
+        self.assertEqual(entry['explain']['plan'], ['COLLSCAN'])
@@ -0,0 +1,166 @@
+"""
+Proxy de miniatures (api/helpers/thumbnails.py) contre un serveur HTTP local :
+génération puis hit disque, redirection vers un hôte non autorisé refusée, image trop
+grande refusée avant décodage (sans changer la limite globale de Pillow), misses
+simultanés regroupés en un seul téléchargement, fichier évincé avant lecture régénéré.
+"""
+import http.server
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from api.helpers import thumbnails
+from api.helpers.thumbnails import ThumbnailError, get_thumbnail
+
+
+def _jpeg_bytes(size) -> bytes:
+    buf = io.BytesIO()
+    Image.new('RGB', size, (30, 120, 200)).save(buf, 'JPEG')
+    return buf.getvalue()
+
+
+class _Shop(http.server.BaseHTTPRequestHandler):
+    """Boutique factice : /image.jpg, /lent.jpg (0,3 s), /redirect?to=<url>."""
+    hits = None  # chemin → nombre de requêtes (réinitialisé par test)
+    image = b''
+
+    def do_GET(self):
+        path, _, query = self.path.partition('?')
+        with self.server.lock:
+            self.hits[path] = self.hits.get(path, 0) + 1
+        if path == '/redirect':
+            self.send_response(302)
+            self.send_header('Location', query[len('to='):])
+            self.end_headers()
+            return
+        if path not in ('/image.jpg', '/lent.jpg', '/interne'):
+            self.send_error(404)
+            return
+        if path == '/lent.jpg':
+            time.sleep(0.3)
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(self.image)))
+        self.end_headers()
+        self.wfile.write(self.image)
+
+    def log_message(self, *args):
+        pass
+
+
+class ThumbnailProxyTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _Shop)
+        cls.server.lock = threading.Lock()
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        _Shop.hits = {}
+        _Shop.image = _jpeg_bytes((1000, 500))
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        # Seul 127.0.0.1 est autorisé : 'localhost' joue l'hôte interne
+        proxy = override_settings(IMAGE_PROXY={
+            **settings.IMAGE_PROXY, 'dir': root, 'allowed_hosts': ('127.0.0.1',),
+        })
+        proxy.enable()
+        self.addCleanup(proxy.disable)
+
+    def test_generates_then_serves_from_disk(self):
+        path = get_thumbnail(f"{self.base}/image.jpg", 320)
+        with Image.open(path) as img:
+            self.assertEqual((img.format, img.width), ('WEBP', 320))
+        self.assertEqual(get_thumbnail(f"{self.base}/image.jpg", 320), path)
+        self.assertEqual(_Shop.hits, {'/image.jpg': 1})
+
+    def test_view_serves_webp_with_long_cache(self):
+        response = self.client.get(reverse('image-miniature'), {'url': f"{self.base}/image.jpg", 'w': 160},
+                                   HTTP_HOST='localhost', secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertIn('immutable', response['Cache-Control'])
+        response.close()
+
+    def test_file_evicted_before_open_is_regenerated(self):
+        url = f"{self.base}/image.jpg"
+        path = get_thumbnail(url, 160)
+        os.remove(path)  # éviction LRU entre la recherche et l'ouverture
+        real_exists = os.path.exists
+        seen = []
+
+        def exists_once(target):
+            if target == path and not seen:
+                seen.append(target)
+                return True
+            return real_exists(target)
+
+        with mock.patch.object(thumbnails.os.path, 'exists', side_effect=exists_once):
+            response = self.client.get(reverse('image-miniature'), {'url': url, 'w': 160},
+                                       HTTP_HOST='localhost', secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'RIFF'))
+        response.close()
+        self.assertEqual(_Shop.hits, {'/image.jpg': 2})
+
+    def test_pillow_global_limit_is_untouched(self):
+        # Valeur par défaut de Pillow : les variantes du blog (api/helpers/images.py) n'en changent pas
+        self.assertEqual(Image.MAX_IMAGE_PIXELS, int(1024 * 1024 * 1024 // 4 // 3))
+
+    def test_redirect_to_other_host_is_refused(self):
+        internal = f"http://localhost:{self.server.server_port}/interne"
+        with self.assertRaises(ThumbnailError):
+            get_thumbnail(f"{self.base}/redirect?to={internal}", 320)
+        self.assertNotIn('/interne', _Shop.hits)
+
+    def test_redirect_within_allowed_host_is_followed(self):
+        path = get_thumbnail(f"{self.base}/redirect?to={self.base}/image.jpg", 320)
+        with Image.open(path) as img:
+            self.assertEqual(img.width, 320)
+
+    def test_too_many_pixels_is_refused_before_decoding(self):
+        with override_settings(IMAGE_PROXY={**settings.IMAGE_PROXY, 'max_pixels': 100_000}), \
+                self.assertRaises(ThumbnailError):
+            get_thumbnail(f"{self.base}/image.jpg", 320)
+
+    def test_too_many_bytes_is_refused(self):
+        with override_settings(IMAGE_PROXY={**settings.IMAGE_PROXY, 'max_source_bytes': 1024}), \
+                self.assertRaises(ThumbnailError):
+            get_thumbnail(f"{self.base}/image.jpg", 320)
+
+    def test_concurrent_misses_download_once(self):
+        url = f"{self.base}/lent.jpg"
+        paths, errors = [], []
+
+        def fetch():
+            try:
+                paths.append(get_thumbnail(url, 320))
+            except Exception as e:
+                errors.append(e)
+
+        workers = [threading.Thread(target=fetch) for _ in range(6)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(set(paths)), 1)
+        self.assertEqual(_Shop.hits, {'/lent.jpg': 1})
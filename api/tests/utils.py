@@ -0,0 +1,28 @@
+"""Outils communs aux tests de l'API."""
+import io
+import shutil
+import tempfile
+
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from PIL import Image
+
+
+def jpeg(name: str, size=(64, 48)) -> SimpleUploadedFile:
+    """Petit JPEG uni, prêt pour un ImageField."""
+    buf = io.BytesIO()
+    Image.new('RGB', size, (200, 30, 30)).save(buf, 'JPEG')
+    return SimpleUploadedFile(name, buf.getvalue(), content_type='image/jpeg')
+
+
+def isolate(testcase) -> str:
+    """MEDIA_ROOT temporaire et caches vidés pour `testcase` ; retourne le MEDIA_ROOT."""
+    media = tempfile.mkdtemp()
+    testcase.addCleanup(shutil.rmtree, media, ignore_errors=True)
+    media_settings = override_settings(MEDIA_ROOT=media)
+    media_settings.enable()
+    testcase.addCleanup(media_settings.disable)
+    for alias in caches:
+        caches[alias].clear()
+    return media
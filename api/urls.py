@@ -9,6 +9,7 @@ from . import views
 urlpatterns = [
     # Produits
     path('produits/',         views.produits_list,    name='produits-list'),
+    path('produits/facets/',  views.produits_facets,  name='produits-facets'),  # avant <slug>
     path('produits/<slug:slug>/', views.produit_detail, name='produit-detail'),
 
     # Catégories
@@ -29,4 +30,7 @@ urlpatterns = [
 
     # Demandes
     path('demandes/', views.demandes_create, name='demandes-create'),
+
+    # Images
+    path('images/miniature/', views.image_miniature, name='image-miniature'),
 ]
@@ -13,42 +13,90 @@ Endpoints :
   GET  /api/v1/blog/<slug>/        → détail article
   GET  /api/v1/boutiques/          → liste boutiques
   POST /api/v1/demandes/           → soumettre une demande
+  GET  /api/v1/images/miniature/   → miniature d'une image produit (proxy)
+  GET  /metrics                    → métriques (format texte Prometheus)
 """
 import logging
+import os
 import re
-import unicodedata
 from itertools import zip_longest
 from bson import ObjectId
 
 from django.conf import settings
+from django.http import FileResponse, HttpResponse
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
 
-from db.mongo import get_comparatif, get_all_stores, get_categories_config
+from db.mongo import get_all_stores, get_categories_config
 from .models import BlogPost, BlogSummary, BlogSpecifications, BlogSection, StoreRequest
 from .helpers.search import (
     clean_search_query,
     is_reference_query,
     build_reference_pipeline,
+    build_text_search_compound,
     build_text_search_pipeline,
+    build_match_filter,
+    build_search_filters,
+    build_search_probe,
     filter_by_relevance,
     filter_exact_matches,
+    relevance_match,
+    safe_price,
 )
+from .helpers.blog import absolutize_media, get_post_detail
+from .helpers.comparatif import build_offer, get_offer
+from .helpers.filters import in_filter, interleave_by, quota_docs, slugify_fr, split_values
+from .helpers.facets import (
+    merge_facets,
+    mongo_facet_pipeline,
+    parse_mongo_facets,
+    parse_search_meta,
+    search_meta_pipeline,
+)
+from .helpers.breaker import circuit_allows, circuit_record, is_request_timeout, is_store_failure
+from .helpers.cache import cache_epoch, get_cached, make_key, set_cached
+from .helpers.counts import count_documents, count_text, start_count, sum_counts
+from .helpers.deadline import deadline_passed, max_time_ms, request_deadline, time_limit
+from .helpers.intake import intake
+from .helpers.singleflight import single_flight
+from .helpers.metrics import counter, render_text
+from .helpers.presence import prune_stores
+from .helpers.querylog import record_search
+from .helpers.thumbnails import ThumbnailError, open_thumbnail, thumbnail_url
+from .helpers.timing import timed
 from .serializers import (
     BlogPostListSerializer,
-    BlogPostDetailSerializer,
     StoreRequestSerializer,
 )
 
 logger = logging.getLogger('api')
 
+SEARCH_FALLBACKS = counter(
+    'toprix_search_fallback_total',
+    "Bascules Atlas Search → regex par store",
+    ('store',),
+)
+SEARCH_FILTER_FALLBACKS = counter(
+    'toprix_search_filter_fallback_total',
+    "Recherches filtrées vides dans Atlas Search mais non vides en regex (mapping de l'index \"Text\")",
+    ('store',),
+)
+STORE_ERRORS = counter(
+    'toprix_store_errors_total',
+    "Erreurs MongoDB non récupérées par store et endpoint",
+    ('store', 'endpoint'),
+)
+
 # ============================================
 # CONSTANTES
 # ============================================
 PAGE_SIZE = 20
 MAX_PAGE = 100
 
+# Colonnes lues par la liste du blog (ni content, ni relations)
+BLOG_LIST_FIELDS = ('id', 'slug', 'title', 'image', 'published_date', 'excerpt')
+
 # Champs à projeter dans les per-store collections
 PRODUIT_PROJECTION = {
     '_id': 1,
@@ -65,26 +113,6 @@ PRODUIT_PROJECTION = {
     'url': 1,
 }
 
-# Mapping des champs comparatif
-COMPARATIF_KEYS = {
-    'reference':        'Réf Mytek',
-    'mytek_nom':        'Produit Mytek',
-    'mytek_prix':       'Prix Mytek',
-    'mytek_stock':      'Stock Mytek',
-    'mytek_url':        'URL Mytek',
-    'mytek_image':      'Image Mytek',
-    'tunisianet_nom':   'Produit Tunisianet',
-    'tunisianet_prix':  'Prix Tunisianet',
-    'tunisianet_stock': 'Stock Tunisianet',
-    'tunisianet_url':   'URL Tunisianet',
-    'tunisianet_image': 'Image Tunisianet',
-    'spacenet_nom':     'Produit Spacenet',
-    'spacenet_prix':    'Prix Spacenet',
-    'spacenet_stock':   'Stock Spacenet',
-    'spacenet_url':     'URL Spacenet',
-    'spacenet_image':   'Image Spacenet',
-}
-
 # Boutiques fixes
 BOUTIQUES = [
     {'id': 'mytek',       'nom': 'Mytek',       'site_web': 'https://www.mytek.tn'},
@@ -97,15 +125,6 @@ BOUTIQUES = [
 # HELPERS
 # ============================================
 
-def safe_price(val):
-    """Convertit une valeur en float > 0, sinon None."""
-    try:
-        p = float(val)
-        return p if p > 0 else None
-    except (ValueError, TypeError):
-        return None
-
-
 def format_produit_from_store(doc, store_name: str) -> dict:
     """
     Transforme un document per-store en format API Produit.
@@ -121,6 +140,7 @@ def format_produit_from_store(doc, store_name: str) -> dict:
         'prix_min': safe_price(doc.get('price')),
         'prix_max': safe_price(doc.get('old_price')),
         'image': doc.get('product_image') or doc.get('image', ''),
+        'miniature': thumbnail_url(doc.get('product_image') or doc.get('image', '')),
         'en_stock': doc.get('etat_stock') == 'En stock',
         'discount': doc.get('discount', 0),
         'reference': doc.get('reference', ''),
@@ -131,48 +151,212 @@ def format_produit_from_store(doc, store_name: str) -> dict:
 
 def format_produit_from_comparatif(doc) -> dict:
     """
-    Transforme un document comparatif en format API Produit (résumé).
-    Utilisé pour la recherche dans le comparatif.
+    Transforme un document comparatif (brut ou déjà matérialisé, cf. api/helpers/comparatif.py)
+    en format API Produit (résumé). Utilisé pour la recherche dans le comparatif.
     """
-    d = {key: doc.get(val) for key, val in COMPARATIF_KEYS.items()}
-
-    nom = d['mytek_nom'] or d['tunisianet_nom'] or d['spacenet_nom'] or ''
-    image = d['mytek_image'] or d['tunisianet_image'] or d['spacenet_image'] or ''
-
-    prix = [safe_price(d[k]) for k in ('mytek_prix', 'tunisianet_prix', 'spacenet_prix') if safe_price(d[k])]
-    prix_min = min(prix) if prix else None
-    prix_max = max(prix) if prix else None
+    offer = doc if 'offres' in doc else build_offer(doc)
+    return {
+        'id': str(offer['_id']),
+        'slug': offer['Slug'],
+        'nom': offer['nom'],
+        'marque': offer['marque'],
+        'categorie': '',
+        'prix_min': offer['prix_min'],
+        'prix_max': offer['prix_max'],
+        'image': offer['image'],
+        'miniature': thumbnail_url(offer['image']),
+        'reference': offer['reference'],
+    }
 
-    # Extraire marque depuis le nom (premier mot)
-    marque = nom.split()[0].title() if nom else ''
 
+def page_meta(page: int, total: int, par_page: int = PAGE_SIZE) -> dict:
+    """meta au format ReponseAPI ; total_pages plafonné à MAX_PAGE (get_page_number)."""
     return {
-        'id': str(doc.get('_id', '')),
-        'slug': doc.get('Slug', ''),
-        'nom': nom,
-        'marque': marque,
-        'categorie': '',
-        'prix_min': prix_min,
-        'prix_max': prix_max,
-        'image': image,
-        'reference': d.get('reference', ''),
+        'page': page,
+        'total_pages': min(MAX_PAGE, max(1, -(-total // par_page))),  # ceil division
+        'total_items': total,
+        'par_page': par_page,
     }
 
 
-def paginate(items: list, page: int, par_page: int = PAGE_SIZE) -> dict:
-    """Pagine une liste et retourne le format ReponseAPI."""
-    total = len(items)
+def paginate(items: list, page: int, par_page: int = PAGE_SIZE, counts=None) -> dict:
+    """
+    Pagine une liste et retourne le format ReponseAPI.
+    `counts` : (total, exact) de sum_counts() ; à défaut, total = len(items)
+    (plafonné par les limites de fetch).
+    """
+    total = len(items) if counts is None else max(counts[0], len(items))
     start = (page - 1) * par_page
     end = start + par_page
-    return {
-        'data': items[start:end],
-        'meta': {
-            'page': page,
-            'total_pages': max(1, -(-total // par_page)),  # ceil division
-            'total_items': total,
-            'par_page': par_page,
-        }
-    }
+    response = {'data': items[start:end], 'meta': page_meta(page, total, par_page)}
+    if counts is not None and not counts[1]:
+        response['meta']['total_estime'] = True  # comptage arrêté au seuil : total minimal
+    return response
+
+
+def paginate_page(items: list, page: int, par_page: int = PAGE_SIZE, counts=None) -> dict:
+    """
+    Comme paginate(), quand `items` est déjà la page demandée (concatenated_page).
+    Sans comptage, total minimal (une page de plus si celle-ci est pleine).
+    """
+    seen = (page - 1) * par_page + len(items) if items else 0
+    if counts is None:
+        total = seen + (len(items) == par_page)
+    else:
+        total = max(counts[0], seen)
+    response = {'data': items, 'meta': page_meta(page, total, par_page)}
+    if counts is None or not counts[1]:
+        response['meta']['total_estime'] = True
+    return response
+
+
+def paginate_queryset(queryset, page: int, par_page: int = PAGE_SIZE):
+    """
+    Pagination SQL (COUNT + LIMIT/OFFSET) : seule la page demandée est chargée.
+    Retourne (objets de la page, meta au format ReponseAPI).
+    """
+    total = queryset.count()
+    start = (page - 1) * par_page
+    return list(queryset[start:start + par_page]), page_meta(page, total, par_page)
+
+
+def _known_count(future):
+    """Résultat d'un comptage de start_count(), None s'il a échoué ou tarde."""
+    try:
+        return future.result(timeout=settings.RESULT_COUNTS['timeout'])
+    except Exception:
+        return None
+
+
+def concatenated_page(targets: list, page: int, endpoint: str, later: int = 0,
+                      failed_stores: set = None) -> list:
+    """
+    Docs bruts (avec '_source') de la page `page` quand les boutiques sont listées à la
+    suite, sans fusion ni dédoublonnage (catégorie, sous-catégorie, marque).
+    targets : [(col, store_name, query, Future de start_count)], dans l'ordre d'affichage.
+    Les comptages des boutiques précédentes situent le début de la page : skip/limit
+    dans la boutique où elle commence, puis les suivantes. Comptage indisponible ou
+    plafonné (RESULT_COUNTS['threshold']) : fenêtre depuis le début de cette boutique.
+    `later` : appels MongoDB qui suivent (budget réservé, helpers/deadline.py).
+    Les targets sont déjà admises par circuit_allows() (une fois par boutique et par
+    requête, chez l'appelant : la sonde half-open n'est pas consommée deux fois).
+    `failed_stores` : reçoit les boutiques sautées (budget épuisé) ou en erreur.
+    """
+    failed = failed_stores if failed_stores is not None else set()
+    skip, need = (page - 1) * PAGE_SIZE, PAGE_SIZE
+    threshold = settings.RESULT_COUNTS['threshold']
+    docs = []
+    for i, (col, store_name, query, count) in enumerate(targets):
+        if need <= 0:
+            break
+        if deadline_passed(store_name):
+            failed.add(store_name)
+            continue
+        total = _known_count(count) if skip else None
+        if total is not None and total <= skip:
+            if total < threshold:
+                skip -= total  # la page commence après cette boutique
+                continue
+            total = None  # total minimal : position inconnue
+        with timed('mongo', store_name):
+            try:
+                cursor = col.find(query, PRODUIT_PROJECTION, max_time_ms=max_time_ms(len(targets) - i + later))
+                if skip and total is None:
+                    window = list(cursor.limit(skip + need))
+                    results = window[skip:]
+                    skip = max(0, skip - len(window))
+                else:
+                    results = list(cursor.skip(skip).limit(need))
+                    skip = 0
+                circuit_record(store_name)
+            except Exception as e:
+                circuit_record(store_name, e)
+                logger.error("Erreur %s / %s : %s", endpoint, store_name, e)
+                STORE_ERRORS.inc(store=store_name.lower(), endpoint=endpoint)
+                failed.add(store_name)
+                continue
+        for doc in results:
+            doc['_source'] = store_name
+        docs.extend(results)
+        need -= len(results)
+    return docs
+
+
+def interleave_stores(raw_docs: list) -> list:
+    """
+    Équilibrage round-robin par boutique (docs bruts avec '_source').
+    Interleave Tunisianet / Mytek / Spacenet pour éviter qu'une boutique
+    monopolise la première page (ex : en_promo=1 sans filtre catégorie).
+    """
+    if not raw_docs:
+        return raw_docs
+    per_store: dict = {}
+    for doc in raw_docs:
+        per_store.setdefault(doc.get('_source', ''), []).append(doc)
+    interleaved = []
+    for groupe in zip_longest(*per_store.values()):
+        for doc in groupe:
+            if doc is not None:
+                interleaved.append(doc)
+    return interleaved
+
+
+def merge_store_docs(raw_docs: list, tri: str = '') -> list:
+    """
+    Transforme les docs bruts (avec '_source') en produits API :
+    formatage, dédoublonnage par référence (meilleur prix), tri prix.
+    """
+    # ── Formatage ────────────────────────────────────────────────────────────
+    produits = [
+        format_produit_from_store(doc, doc.pop('_source'))
+        for doc in raw_docs
+    ]
+
+    # ── Dédoublonnage par référence (garder le meilleur prix) ────────────────
+    seen_refs = {}
+    deduped = []
+    for p in produits:
+        ref = p.get('reference', '')
+        if ref and ref in seen_refs:
+            if (p['prix_min'] or 0) < (seen_refs[ref]['prix_min'] or 9999999):
+                seen_refs[ref] = p
+        elif ref:
+            seen_refs[ref] = p
+            deduped.append(p)
+        else:
+            deduped.append(p)
+
+    final = [seen_refs.get(p.get('reference'), p) if p.get('reference') else p for p in deduped]
+
+    # ── Tri par prix ─────────────────────────────────────────────────────────
+    if tri == 'prix_asc':
+        final.sort(key=lambda x: x.get('prix_min') or 9_999_999)
+    elif tri == 'prix_desc':
+        final.sort(key=lambda x: -(x.get('prix_min') or 0))
+
+    return final
+
+
+def product_tags(produits: list) -> set:
+    """Tags d'invalidation des produits d'une réponse (api/helpers/invalidation.py)."""
+    tags = set()
+    for p in produits:
+        tags.add(f"produit:{p['id']}")
+        if p.get('reference'):
+            tags.add(f"ref:{p['reference'].lower()}")
+    return tags
+
+
+def store_tags(stores) -> set:
+    return {f"store:{name.lower()}" for _, name in stores}
+
+
+def flag_partial(response: dict, failed_stores) -> dict:
+    """Signale dans meta les boutiques absentes du résultat (erreur ou disjoncteur ouvert)."""
+    if failed_stores:
+        response['meta']['partiel'] = True
+        response['meta']['boutiques_indisponibles'] = sorted(failed_stores)
+    return response
 
 
 def get_page_number(request) -> int:
@@ -183,15 +367,86 @@ def get_page_number(request) -> int:
         return 1
 
 
-def slugify_fr(text: str) -> str:
-    """Convertit un texte français en slug URL (minuscules, tirets, sans accents)."""
-    text = (text or '').strip().lower()
-    text = ''.join(
-        c for c in unicodedata.normalize('NFD', text)
-        if unicodedata.category(c) != 'Mn'
-    )
-    text = re.sub(r'[^a-z0-9]+', '-', text)
-    return text.strip('-')
+def search_params(request) -> dict:
+    """
+    Paramètres de filtrage communs à /produits/ et /produits/facets/.
+    categorie, marque et boutique acceptent plusieurs valeurs séparées par des virgules
+    (normalisées en minuscules, cf. api/helpers/filters.py).
+    """
+    return {
+        'q': request.GET.get('q', '').strip(),
+        'categories': split_values(request.GET.get('categorie', '')),
+        'marques': split_values(request.GET.get('marque', '')),
+        'prix_min': safe_price(request.GET.get('prix_min', '')),
+        'prix_max': safe_price(request.GET.get('prix_max', '')),
+        'en_promo': request.GET.get('en_promo', '').strip() in ('1', 'true'),
+        'boutiques': split_values(request.GET.get('boutique', '')),  # 'mytek' | 'tunisianet' | 'spacenet'
+        'en_stock': request.GET.get('en_stock', '').strip() in ('1', 'true'),
+    }
+
+
+def selected_stores(boutiques: list) -> list:
+    """Stores demandées (toutes si aucune boutique valide n'est demandée)."""
+    all_stores = get_all_stores()
+    selected = [(fn, name) for fn, name in all_stores if name.lower() in boutiques]
+    return selected or all_stores
+
+
+def distinct_paths(col, query_filter: dict, parts: int = 1) -> list:
+    """category_path distincts (équivalent de distinct(), borné par maxTimeMS)."""
+    pipeline = [{'$match': query_filter}, {'$group': {'_id': '$category_path'}}]
+    return [doc['_id'] for doc in col.aggregate(pipeline, **time_limit(parts)) if doc['_id']]
+
+
+def category_filter(col, categorie: str, base_filter: dict, parts: int = 1) -> dict:
+    """
+    Filtre MongoDB d'un slug sous-catégorie (`parent/sous`) pour une collection.
+    Essaie `subcategory` puis `category_path` (slugify_fr), en restant dans `base_filter`.
+    """
+    cat_parent, cat_sous = categorie.split('/', 1)
+    query_filter = {**base_filter, 'category': {'$regex': f'^{re.escape(cat_parent)}$', '$options': 'i'}}
+    sous_filter = {'$regex': f'^{re.escape(cat_sous)}$', '$options': 'i'}
+    # Essayer subcategory d'abord, fallback category_path
+    if col.count_documents({**query_filter, 'subcategory': sous_filter}, limit=1, **time_limit(parts)) > 0:
+        return {'category': query_filter['category'], 'subcategory': sous_filter}
+
+    # Fallback : chercher via category_path (slugify_fr)
+    paths = distinct_paths(col, query_filter, parts)
+    matching_noms = set()
+    for path in paths:
+        segments = [p.strip() for p in path.split('>')]
+        if len(segments) >= 2 and slugify_fr(segments[1]) == cat_sous:
+            matching_noms.add(segments[1])
+    if matching_noms:
+        sous_regex = '|'.join(re.escape(n) for n in matching_noms)
+        return {'category': query_filter['category'], 'category_path': {'$regex': sous_regex, '$options': 'i'}}
+    return {'category': query_filter['category'], 'subcategory': sous_filter}
+
+
+def categories_filter(store_name: str, col, categories: list, base_filter: dict, parts: int = 1):
+    """
+    Filtre MongoDB de slugs catégorie (`parent` ou `parent/sous`) pour un store : les
+    catégories parentes en un seul $in (api/helpers/filters.py), les sous-catégories
+    via category_filter(). None si le store n'a aucune des catégories parentes demandées
+    (et aucune sous-catégorie).
+    """
+    clauses = []
+    parents = [c for c in categories if '/' not in c]
+    if parents:
+        stored = in_filter(store_name, col, 'category', parents, parts)
+        if stored:
+            clauses.append({'category': stored})
+    clauses.extend(category_filter(col, c, base_filter, parts) for c in categories if '/' in c)
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {'$or': clauses}
+
+
+def filter_tags(categories: list, marques: list) -> set:
+    """Tags d'invalidation des filtres catégorie / marque d'une recherche."""
+    tags = {f"categorie:{c.split('/', 1)[0]}" for c in categories}
+    tags.update(f"marque:{m}" for m in marques)
+    return tags
 
 
 # ============================================
@@ -199,223 +454,421 @@ def slugify_fr(text: str) -> str:
 # ============================================
 
 @api_view(['GET'])
+@record_search
+@request_deadline('produits-list')  # englobe l'attente single-flight
+@single_flight('search_results', lambda request: make_key('search_results', request.GET))
 def produits_list(request):
     """
     GET /api/v1/produits/
     Params: q, page, categorie, marque, prix_min, prix_max, en_promo, boutique, en_stock, tri
+    (categorie, marque, boutique : plusieurs valeurs séparées par des virgules)
 
     Logique de recherche :
     - q seul  → Atlas Search (phrase/fuzzy) si index "Text" disponible, sinon fallback regex
     - q + référence détectée → pipeline exact reference match
-    - categorie / marque → regex classique sur les champs MongoDB
-    - prix_min / prix_max / en_promo → post-filtrage Python après recherche
-    - boutique → filtre sur une seule collection (mytek/tunisianet/spacenet)
+    - categorie / marque → $in sur les valeurs stockées de chaque store (api/helpers/filters.py),
+      une seule requête par store, quota par marque dans l'agrégation
+    - prix_min / prix_max / en_promo / en_stock → filtres MongoDB (compound.filter Atlas Search, $match, find)
+    - boutique → filtre sur les collections demandées (mytek/tunisianet/spacenet)
     - en_stock → filtre etat_stock == 'En stock'
     - tri → prix_asc ou prix_desc appliqué après déduplication
     - Post-filtrage par pertinence pour queries multi-mots
     """
-    q = request.GET.get('q', '').strip()
-    categorie = request.GET.get('categorie', '').strip()
-    marque_raw = request.GET.get('marque', '').strip()
-    marques = [m.strip() for m in marque_raw.split(',') if m.strip()]
-    marque = marques[0] if len(marques) == 1 else marque_raw  # compat affichage
-    prix_min = safe_price(request.GET.get('prix_min', ''))
-    prix_max = safe_price(request.GET.get('prix_max', ''))
-    en_promo = request.GET.get('en_promo', '').strip() in ('1', 'true')
-    boutique = request.GET.get('boutique', '').strip().lower()   # 'mytek' | 'tunisianet' | 'spacenet'
-    en_stock = request.GET.get('en_stock', '').strip() in ('1', 'true')
+    params = search_params(request)
+    q, categories, marques = params['q'], params['categories'], params['marques']
+    prix_min, prix_max = params['prix_min'], params['prix_max']
+    en_promo, en_stock, boutiques = params['en_promo'], params['en_stock'], params['boutiques']
     tri = request.GET.get('tri', '').strip()                     # 'prix_asc' | 'prix_desc'
     page = get_page_number(request)
 
-    if not q and not categorie and not marques and prix_min is None and prix_max is None and not en_promo and not boutique and not en_stock:
+    if not q and not categories and not marques and prix_min is None and prix_max is None and not en_promo and not boutiques and not en_stock:
         return Response({'data': [], 'meta': {'page': 1, 'total_pages': 0, 'total_items': 0, 'par_page': PAGE_SIZE}})
 
-    # Filtrage des collections selon la boutique demandée
-    all_stores = get_all_stores()
-    if boutique in ('mytek', 'tunisianet', 'spacenet'):
-        stores_to_query = [(fn, name) for fn, name in all_stores if name.lower() == boutique]
-    else:
-        stores_to_query = all_stores
+    cache_key = make_key('search_results', request.GET)  # lecture : @single_flight
+    epoch = cache_epoch()
+
+    # Filtrage des collections selon les boutiques demandées
+    stores_to_query = selected_stores(boutiques)
 
     # Nettoyage de la requête textuelle
     if q:
         q = clean_search_query(q)
-        if not q and not categorie and not marques and prix_min is None and prix_max is None and not en_promo:
+        if not q and not categories and not marques and prix_min is None and prix_max is None and not en_promo:
             return Response({'data': [], 'meta': {'page': 1, 'total_pages': 0, 'total_items': 0, 'par_page': PAGE_SIZE}})
 
     raw_docs = []  # docs bruts MongoDB, chacun avec '_source' = store_name
+    failed_stores = set()  # stores en erreur → résultat partiel, non mis en cache
+    count_futures = {}  # comptages par store (meta.total_items), cf. api/helpers/counts.py
+    truncated_stores = set()  # stores dont la fenêtre de fetch est pleine → total compté
 
-    if q and not categorie and not marques:
+    if q and not categories and not marques:
         # ── Recherche textuelle pure : Atlas Search ──────────────────────────
         is_reference = is_reference_query(q)
         query_words = q.split()
         num_words = len(query_words)
-        fetch_limit = PAGE_SIZE * 3  # marge pour la déduplication
-
-        if is_reference:
-            logger.info(f"Recherche référence : {q}")
-            pipeline = build_reference_pipeline(q, skip=0, limit=fetch_limit)
-        else:
-            logger.info(f"Recherche texte Atlas Search : {q}")
-            pipeline = build_text_search_pipeline(q, num_words, skip=0, limit=fetch_limit)
-
-        def run_pipeline(pipeline):
-            """Exécute un pipeline sur toutes les stores sélectionnées."""
-            docs = []
+        fetch_limit = PAGE_SIZE * (page + 2)  # pages précédentes + marge pour la déduplication
+        # Filtres appliqués par MongoDB : fetch_limit ne compte que des docs retenus
+        match_filter = build_match_filter(prix_min, prix_max, en_promo, en_stock)
+        search_filters = build_search_filters(prix_min, prix_max, en_promo, en_stock)
+        # Référence : seulement les stores où elle existe (api/helpers/presence.py)
+        reference_stores = prune_stores(stores_to_query, references=[q]) if is_reference else []
+
+        def start_counts(reference):
+            """Comptage par boutique, en parallèle des pipelines de page."""
+            if reference:
+                query = {'reference': {'$regex': f'^{re.escape(q)}$', '$options': 'i'}, **match_filter}
+                for get_col, store_name in reference_stores:
+                    count_futures[store_name] = start_count(
+                        store_name, ('reference', query), lambda get_col=get_col: count_documents(get_col(), query))
+                return
+            compound = build_text_search_compound(q, num_words, search_filters)
+            title_query = {'title': {'$regex': re.escape(q), '$options': 'i'}, **match_filter}
+            # Multi-mots : même règle que filter_by_relevance, sinon le total dépasse les pages servies
+            relevance = relevance_match(query_words, num_words)
             for get_col, store_name in stores_to_query:
-                try:
-                    col = get_col()
-                    results = list(col.aggregate(pipeline, allowDiskUse=True))
+                count_futures[store_name] = start_count(
+                    store_name, ('text', compound, relevance),
+                    lambda get_col=get_col: count_text(get_col(), compound, title_query, relevance))
+
+        with timed('pipeline'):
+            if is_reference:
+                logger.info("Recherche référence : %s", q)
+                pipeline = build_reference_pipeline(q, skip=0, limit=fetch_limit, filters=match_filter)
+            else:
+                logger.info("Recherche texte Atlas Search : %s", q)
+                pipeline = build_text_search_pipeline(q, num_words, skip=0, limit=fetch_limit,
+                                                      filters=search_filters)
+        start_counts(is_reference)
+
+        def search_hits_without_filters(get_col, store_name, parts) -> bool:
+            """La recherche texte sans les filtres prix / promo / stock trouve-t-elle au moins un produit ?"""
+            if deadline_passed(store_name):
+                return False
+            try:
+                return bool(list(get_col(hedged=True).aggregate(build_search_probe(q, num_words),
+                                                                **time_limit(parts))))
+            except Exception:
+                return False
+
+        def run_pipeline(pipeline, stores, later: int = 0):
+            """
+            Exécute un pipeline sur les `stores` (disjoncteurs : helpers/breaker.py).
+            `later` : passes qui peuvent suivre (fallback texte d'une référence), budget réservé.
+            """
+            docs = []
+            truncated_stores.clear()
+            atlas = '$search' in pipeline[0]
+            for i, (get_col, store_name) in enumerate(stores):
+                # Appels séquentiels restants, cette store comprise : part du budget (helpers/deadline.py)
+                parts = len(stores) + later * len(stores_to_query) - i
+                if deadline_passed(store_name) or not circuit_allows(store_name):
+                    failed_stores.add(store_name)
+                    continue
+                with timed('mongo', store_name):
+                    results = None
+                    if not atlas or circuit_allows(store_name, 'search'):
+                        try:
+                            # hedged=True : hedged reads si activées (db/mongo.py)
+                            results = list(get_col(hedged=True).aggregate(pipeline, allowDiskUse=True,
+                                                                          **time_limit(parts)))
+                            circuit_record(store_name)
+                            if atlas:
+                                circuit_record(store_name, kind='search')
+                        except Exception as e:
+                            circuit_record(store_name, e)
+                            if atlas:
+                                circuit_record(store_name, e, kind='search')
+                            if is_store_failure(e):
+                                # Cluster injoignable : inutile d'attendre un second timeout en regex
+                                logger.error("Store %s injoignable : %s", store_name, e)
+                                STORE_ERRORS.inc(store=store_name.lower(), endpoint='produits-list')
+                                failed_stores.add(store_name)
+                                continue
+                            logger.warning("Atlas Search indisponible pour %s, fallback regex : %s", store_name, e)
+                            SEARCH_FALLBACKS.inc(store=store_name.lower())
+                    # Filtres sans résultat alors que la recherche seule en a : index "Text" qui ne
+                    # mappe peut-être pas price / discount / etat_stock → vérification en regex
+                    unmapped = (bool(atlas and search_filters and results == [])
+                                and search_hits_without_filters(get_col, store_name, parts))
+                    if unmapped:
+                        results = None
+                    if results is None:
+                        if deadline_passed(store_name):
+                            # Fallback trop tardif : la réponse partira sans cette boutique
+                            failed_stores.add(store_name)
+                            continue
+                        try:
+                            query_filter = {'title': {'$regex': re.escape(q), '$options': 'i'}, **match_filter}
+                            results = list(get_col().find(query_filter, PRODUIT_PROJECTION,
+                                                          max_time_ms=max_time_ms(parts)).limit(fetch_limit))
+                            circuit_record(store_name)
+                            if unmapped and results:
+                                logger.warning(
+                                    "Recherche filtrée vide dans Atlas Search mais %s résultat(s) en regex pour %s : "
+                                    "vérifier le mapping de l'index \"Text\" (docs/deployment.md)",
+                                    len(results), store_name)
+                                SEARCH_FILTER_FALLBACKS.inc(store=store_name.lower())
+                                # Le comptage Atlas filtré vaut 0 lui aussi : compter en regex
+                                count_futures[store_name] = start_count(
+                                    store_name, ('regex', query_filter),
+                                    lambda get_col=get_col, query=query_filter: count_documents(get_col(), query))
+                        except Exception as e2:
+                            circuit_record(store_name, e2)
+                            logger.error("Fallback regex échoué %s : %s", store_name, e2)
+                            STORE_ERRORS.inc(store=store_name.lower(), endpoint='produits-list')
+                            failed_stores.add(store_name)
+                            continue
                     for doc in results:
                         doc['_source'] = store_name
                     docs.extend(results)
-                    logger.info(f"{store_name} : {len(results)} résultats")
-                except Exception as e:
-                    logger.warning(f"Atlas Search indisponible pour {store_name}, fallback regex : {e}")
-                    try:
-                        col = get_col()
-                        query_filter = {'title': {'$regex': re.escape(q), '$options': 'i'}}
-                        for doc in col.find(query_filter, PRODUIT_PROJECTION).limit(fetch_limit):
-                            doc['_source'] = store_name
-                            docs.append(doc)
-                    except Exception as e2:
-                        logger.error(f"Fallback regex échoué {store_name} : {e2}")
+                    if len(results) >= fetch_limit:
+                        truncated_stores.add(store_name)
+                    logger.debug("%s : %s résultats", store_name, len(results))
             return docs
 
-        raw_docs = run_pipeline(pipeline)
+        if is_reference:
+            raw_docs = run_pipeline(pipeline, reference_stores, later=1)
+        else:
+            raw_docs = run_pipeline(pipeline, stores_to_query)
 
         # Référence : exact match obligatoire, sinon fallback title search
         if is_reference:
             if raw_docs:
-                raw_docs, found_exact = filter_exact_matches(raw_docs)
+                with timed('relevance'):
+                    raw_docs, found_exact = filter_exact_matches(raw_docs)
                 if not found_exact:
-                    logger.info(f"Référence '{q}' sans exact match, fallback recherche texte")
+                    logger.info("Référence '%s' sans exact match, fallback recherche texte", q)
                     is_reference = False
-                    pipeline = build_text_search_pipeline(q, num_words, skip=0, limit=fetch_limit)
-                    raw_docs = run_pipeline(pipeline)
+                    start_counts(False)
+                    with timed('pipeline'):
+                        pipeline = build_text_search_pipeline(q, num_words, skip=0, limit=fetch_limit,
+                                                              filters=search_filters)
+                    raw_docs = run_pipeline(pipeline, stores_to_query)
             else:
-                logger.info(f"Référence '{q}' introuvable, fallback recherche texte")
+                logger.info("Référence '%s' introuvable, fallback recherche texte", q)
                 is_reference = False
-                pipeline = build_text_search_pipeline(q, num_words, skip=0, limit=fetch_limit)
-                raw_docs = run_pipeline(pipeline)
+                start_counts(False)
+                with timed('pipeline'):
+                    pipeline = build_text_search_pipeline(q, num_words, skip=0, limit=fetch_limit,
+                                                          filters=search_filters)
+                raw_docs = run_pipeline(pipeline, stores_to_query)
 
         # Post-filtrage pertinence (uniquement pour text search multi-mots)
         if not is_reference and num_words >= 2 and raw_docs:
-            raw_docs = filter_by_relevance(raw_docs, query_words, num_words)
+            with timed('relevance'):
+                raw_docs = filter_by_relevance(raw_docs, query_words, num_words)
 
     else:
-        # ── Filtre par catégorie / marque / prix / promo (regex classique) ───
-        for get_col, store_name in stores_to_query:
-            try:
-                col = get_col()
-                query_filter = {}
-                if q:
-                    query_filter['title'] = {'$regex': re.escape(q), '$options': 'i'}
-                if categorie:
-                    if '/' in categorie:
-                        cat_parent, cat_sous = categorie.split('/', 1)
-                        query_filter['category'] = {'$regex': f'^{re.escape(cat_parent)}$', '$options': 'i'}
-                        # Essayer subcategory d'abord, fallback category_path
-                        sub_test = dict(query_filter)
-                        sub_test['subcategory'] = {'$regex': f'^{re.escape(cat_sous)}$', '$options': 'i'}
-                        if col.count_documents(sub_test, limit=1) > 0:
-                            query_filter['subcategory'] = {'$regex': f'^{re.escape(cat_sous)}$', '$options': 'i'}
-                        else:
-                            # Fallback : chercher via category_path (slugify_fr)
-                            paths = col.distinct('category_path', query_filter)
-                            matching_noms = set()
-                            for path in paths:
-                                parts = [p.strip() for p in path.split('>')]
-                                if len(parts) >= 2 and slugify_fr(parts[1]) == cat_sous:
-                                    matching_noms.add(parts[1])
-                            if matching_noms:
-                                sous_regex = '|'.join(re.escape(n) for n in matching_noms)
-                                query_filter['category_path'] = {'$regex': sous_regex, '$options': 'i'}
-                            else:
-                                query_filter['subcategory'] = {'$regex': f'^{re.escape(cat_sous)}$', '$options': 'i'}
-                    else:
-                        query_filter['category'] = {'$regex': re.escape(categorie), '$options': 'i'}
-                if en_promo:
-                    query_filter['discount'] = {'$gt': 0}
-                if en_stock:
-                    query_filter['etat_stock'] = 'En stock'
-                if prix_min is not None or prix_max is not None:
-                    price_filter = {}
-                    if prix_min is not None:
-                        price_filter['$gte'] = prix_min
-                    if prix_max is not None:
-                        price_filter['$lte'] = prix_max
-                    query_filter['price'] = price_filter
-                if not query_filter and not marques:
-                    # Sans aucun critère textuel, on évite de charger toute la collection
-                    continue
-                # Multi-marque : une query par marque (équitable, sans sur-fetch)
-                brand_list = marques if len(marques) > 1 else (marques or [None])
-                for brand in brand_list:
-                    brand_filter = dict(query_filter)
-                    if brand:
-                        brand_filter['brand'] = {'$regex': re.escape(brand), '$options': 'i'}
-                    elif not brand_filter:
+        # ── Filtre par catégorie / marque / prix / promo : une requête par store ───
+        quota = PAGE_SIZE * (page + 1)  # par marque : pages précédentes + page demandée
+        # Stores qui n'ont aucune des catégories / marques demandées : pas interrogées
+        # (api/helpers/presence.py). Les tags de cache restent ceux de toutes les stores.
+        filter_stores = prune_stores(stores_to_query, categories=categories, marques=marques)
+        for i, (get_col, store_name) in enumerate(filter_stores):
+            parts = len(filter_stores) - i
+            if deadline_passed(store_name) or not circuit_allows(store_name):
+                failed_stores.add(store_name)
+                continue
+            with timed('mongo', store_name):
+                try:
+                    col = get_col()
+                    query_filter = {}
+                    if q:
+                        query_filter['title'] = {'$regex': re.escape(q), '$options': 'i'}
+                    if categories:
+                        cat_filter = categories_filter(store_name, col, categories, query_filter, parts)
+                        if cat_filter is None:
+                            continue  # aucune des catégories dans ce store
+                        query_filter.update(cat_filter)
+                    query_filter.update(build_match_filter(prix_min, prix_max, en_promo, en_stock))
+                    if marques:
+                        brands = in_filter(store_name, col, 'brand', marques, parts)
+                        if brands is None:
+                            continue  # aucune des marques dans ce store
+                        query_filter['brand'] = brands
+                    if not query_filter:
+                        # Sans aucun critère textuel, on évite de charger toute la collection
                         continue
-                    for doc in col.find(brand_filter, PRODUIT_PROJECTION).limit(PAGE_SIZE * 2):
+                    count_futures[store_name] = start_count(
+                        store_name, ('filter', query_filter),
+                        lambda col=col, query=query_filter: count_documents(col, query))
+                    if len(marques) > 1:
+                        # Multi-marque : quota par marque dans la même agrégation (équitable)
+                        results = quota_docs(col, query_filter, 'brand', quota, PRODUIT_PROJECTION, parts)
+                        per_brand = {}
+                        for doc in results:
+                            brand = str(doc.get('brand') or '').lower()
+                            per_brand[brand] = per_brand.get(brand, 0) + 1
+                        full = any(n >= quota for n in per_brand.values())
+                    else:
+                        results = list(col.find(query_filter, PRODUIT_PROJECTION,
+                                                max_time_ms=max_time_ms(parts)).limit(quota))
+                        full = len(results) >= quota
+                    for doc in results:
                         doc['_source'] = store_name
-                        raw_docs.append(doc)
-            except Exception as e:
-                logger.error(f"Erreur filtre {store_name} : {e}")
-                continue
-
-    # ── Équilibrage round-robin par boutique ─────────────────────────────────
-    # Interleave Tunisianet / Mytek / Spacenet pour éviter qu'une boutique
-    # monopolise la première page (ex : en_promo=1 sans filtre catégorie)
-    if raw_docs:
-        per_store: dict = {}
-        for doc in raw_docs:
-            per_store.setdefault(doc.get('_source', ''), []).append(doc)
-        raw_docs = []
-        for groupe in zip_longest(*per_store.values()):
-            for doc in groupe:
-                if doc is not None:
-                    raw_docs.append(doc)
-
-    # ── Post-filtrage prix / promotion / stock (applicable aux deux branches) ──
-    if prix_min is not None:
-        raw_docs = [d for d in raw_docs if safe_price(d.get('price')) is not None and safe_price(d.get('price')) >= prix_min]
-    if prix_max is not None:
-        raw_docs = [d for d in raw_docs if safe_price(d.get('price')) is not None and safe_price(d.get('price')) <= prix_max]
-    if en_promo:
-        raw_docs = [d for d in raw_docs if (d.get('discount') or 0) > 0]
-    if en_stock:
-        raw_docs = [d for d in raw_docs if d.get('etat_stock') == 'En stock']
+                    raw_docs.extend(results)
+                    if full:
+                        truncated_stores.add(store_name)
+                    circuit_record(store_name)
+                except Exception as e:
+                    circuit_record(store_name, e)
+                    logger.error("Erreur filtre %s : %s", store_name, e)
+                    STORE_ERRORS.inc(store=store_name.lower(), endpoint='produits-list')
+                    failed_stores.add(store_name)
+                    continue
 
-    # ── Formatage ────────────────────────────────────────────────────────────
-    produits = [
-        format_produit_from_store(doc, doc.pop('_source'))
-        for doc in raw_docs
-    ]
+    with timed('format'):
+        # ── Équilibrage round-robin par marque (multi-marque), puis par boutique ──
+        if len(marques) > 1:
+            raw_docs = interleave_by(raw_docs, 'brand')
+        raw_docs = interleave_stores(raw_docs)
+
+        fetched = len(raw_docs)
+        final = merge_store_docs(raw_docs, tri)
+
+    # Tout chargé : len(final) est exact. Sinon total compté, moins les doublons
+    # inter-boutiques déjà vus (ceux des pages non chargées restent comptés)
+    counts = None
+    if truncated_stores and not failed_stores:
+        counts = sum_counts(count_futures)
+        if counts is not None:
+            counts = (counts[0] - (fetched - len(final)), counts[1])
+    response = paginate(final, page, counts=counts)
+    flag_partial(response, failed_stores)
+    if not failed_stores:
+        tags = product_tags(response['data']) | store_tags(stores_to_query) | filter_tags(categories, marques)
+        set_cached('search_results', cache_key, response, tags=tags, since=epoch)
+    return Response(response)
 
-    # ── Dédoublonnage par référence (garder le meilleur prix) ────────────────
-    seen_refs = {}
-    deduped = []
-    for p in produits:
-        ref = p.get('reference', '')
-        if ref and ref in seen_refs:
-            if (p['prix_min'] or 0) < (seen_refs[ref]['prix_min'] or 9999999):
-                seen_refs[ref] = p
-        elif ref:
-            seen_refs[ref] = p
-            deduped.append(p)
-        else:
-            deduped.append(p)
 
-    final = [seen_refs.get(p.get('reference'), p) if p.get('reference') else p for p in deduped]
+# ============================================
+# PRODUITS — Facettes
+# ============================================
 
-    # ── Tri par prix ─────────────────────────────────────────────────────────
-    if tri == 'prix_asc':
-        final.sort(key=lambda x: x.get('prix_min') or 9_999_999)
-    elif tri == 'prix_desc':
-        final.sort(key=lambda x: -(x.get('prix_min') or 0))
+@api_view(['GET'])
+@request_deadline('produits-facets')  # englobe l'attente single-flight
+@single_flight('search_results', lambda request: make_key('search_results', 'facets', request.GET))
+def produits_facets(request):
+    """
+    GET /api/v1/produits/facets/
+    Mêmes filtres que /produits/ (sauf page / tri). Retourne le nombre de produits par
+    boutique, marque, catégorie, tranche de prix et en stock : une agrégation par
+    boutique ($searchMeta pour la recherche texte, $facet sinon), fusionnées.
+    Les comptages texte ne passent pas par le post-filtre de pertinence de la liste.
+    """
+    params = search_params(request)
+    q, categories, marques = params['q'], params['categories'], params['marques']
+    match_filter = build_match_filter(params['prix_min'], params['prix_max'], params['en_promo'], params['en_stock'])
 
-    return Response(paginate(final, page))
+    empty = {'data': merge_facets({}, category_nom), 'meta': {'total_items': 0}}
+    if q:
+        q = clean_search_query(q)
+    if not q and not categories and not marques and not match_filter:
+        return Response(empty)
+
+    cache_key = make_key('search_results', 'facets', request.GET)  # lecture : @single_flight
+    epoch = cache_epoch()
+
+    stores_to_query = selected_stores(params['boutiques'])
+
+    per_store = {}
+    failed_stores = set()
+
+    def run_facets(stores, build_match, text_search=None):
+        """
+        Facettes de chaque boutique de `stores` ; `text_search` = compound Atlas Search (fallback regex).
+        `build_match(store_name, col, parts)` : filtre $match (parts = part du budget, cf.
+        helpers/deadline.py) ; None si le store n'a aucune des valeurs demandées.
+        """
+        results = {}
+        for i, (get_col, store_name) in enumerate(stores):
+            parts = len(stores) - i
+            if deadline_passed(store_name) or not circuit_allows(store_name):
+                failed_stores.add(store_name)
+                continue
+            with timed('mongo', store_name):
+                col = get_col()
+                if text_search is not None and circuit_allows(store_name, 'search'):
+                    try:
+                        docs = list(get_col(hedged=True).aggregate(search_meta_pipeline(text_search),
+                                                                   **time_limit(parts)))
+                        results[store_name] = parse_search_meta(docs[0] if docs else {})
+                        circuit_record(store_name)
+                        circuit_record(store_name, kind='search')
+                        continue
+                    except Exception as e:
+                        circuit_record(store_name, e, kind='search')
+                        if is_store_failure(e):
+                            circuit_record(store_name, e)
+                            logger.error("Store %s injoignable : %s", store_name, e)
+                            STORE_ERRORS.inc(store=store_name.lower(), endpoint='produits-facets')
+                            failed_stores.add(store_name)
+                            continue
+                        logger.warning("Atlas Search indisponible pour %s (facettes), fallback regex : %s",
+                                       store_name, e)
+                        SEARCH_FALLBACKS.inc(store=store_name.lower())
+                if deadline_passed(store_name):
+                    failed_stores.add(store_name)
+                    continue
+                try:
+                    match = build_match(store_name, col, parts)
+                    if match is None:
+                        continue
+                    docs = list(col.aggregate(mongo_facet_pipeline(match), allowDiskUse=True, **time_limit(parts)))
+                    results[store_name] = parse_mongo_facets(docs[0])
+                    circuit_record(store_name)
+                except Exception as e:
+                    circuit_record(store_name, e)
+                    logger.error("Erreur facettes %s : %s", store_name, e)
+                    STORE_ERRORS.inc(store=store_name.lower(), endpoint='produits-facets')
+                    failed_stores.add(store_name)
+        return results
+
+    def title_match(store_name, col, parts):
+        return {'title': {'$regex': re.escape(q), '$options': 'i'}, **match_filter}
+
+    if q and not categories and not marques:
+        compound = build_text_search_compound(q, len(q.split()), build_search_filters(
+            params['prix_min'], params['prix_max'], params['en_promo'], params['en_stock']))
+        if is_reference_query(q):
+            reference = {'reference': {'$regex': f'^{re.escape(q)}$', '$options': 'i'}, **match_filter}
+            per_store = run_facets(prune_stores(stores_to_query, references=[q]),
+                                   lambda store_name, col, parts: reference)
+        if not any(f['total'] for f in per_store.values()):
+            # Texte libre, ou référence introuvable (même bascule que la liste)
+            failed_stores.clear()
+            per_store = run_facets(stores_to_query, title_match, text_search=compound)
+    else:
+        def filter_match(store_name, col, parts):
+            query_filter = {}
+            if q:
+                query_filter['title'] = {'$regex': re.escape(q), '$options': 'i'}
+            if categories:
+                cat_filter = categories_filter(store_name, col, categories, query_filter, parts)
+                if cat_filter is None:
+                    return None
+                query_filter.update(cat_filter)
+            query_filter.update(match_filter)
+            if marques:
+                brands = in_filter(store_name, col, 'brand', marques, parts)
+                if brands is None:
+                    return None
+                query_filter['brand'] = brands
+            return query_filter
+
+        per_store = run_facets(prune_stores(stores_to_query, categories=categories, marques=marques),
+                               filter_match)
+
+    with timed('format'):
+        response = {
+            'data': merge_facets(per_store, category_nom),
+            'meta': {'total_items': sum(f['total'] for f in per_store.values())},
+        }
+    flag_partial(response, failed_stores)
+    if not failed_stores:
+        tags = store_tags(stores_to_query) | filter_tags(categories, marques)
+        set_cached('search_results', cache_key, response, tags=tags, since=epoch)
+    return Response(response)
 
 
 # ============================================
@@ -423,6 +876,8 @@ def produits_list(request):
 # ============================================
 
 @api_view(['GET'])
+@request_deadline('produit-detail')  # englobe l'attente single-flight
+@single_flight('product_detail', lambda request, slug: make_key('product_detail', slug))
 def produit_detail(request, slug: str):
     """
     GET /api/v1/produits/<slug>/
@@ -431,6 +886,9 @@ def produit_detail(request, slug: str):
     """
     IS_OBJECT_ID = bool(re.match(r'^[0-9a-f]{24}$', slug, re.I))
 
+    cache_key = make_key('product_detail', slug)  # lecture : @single_flight
+    epoch = cache_epoch()
+
     if IS_OBJECT_ID:
         # Recherche par ObjectId dans les per-store collections
         try:
@@ -438,109 +896,120 @@ def produit_detail(request, slug: str):
         except Exception:
             return Response({'erreur': 'Identifiant invalide'}, status=status.HTTP_400_BAD_REQUEST)
 
-        for get_col, store_name in get_all_stores():
-            try:
-                doc = get_col().find_one({'_id': oid})
-                if doc:
-                    prix = safe_price(doc.get('price'))
-                    old_prix = safe_price(doc.get('old_price'))
-                    discount = safe_price(doc.get('discount')) or 0
-                    reference = doc.get('reference', '')
-
-                    # Cherche le même SKU dans les 3 stores
-                    all_offres = []
-                    if reference:
-                        for get_col2, store_name2 in get_all_stores():
-                            try:
-                                doc2 = get_col2().find_one(
-                                    {'reference': {'$regex': f'^{re.escape(reference)}$', '$options': 'i'}},
-                                    PRODUIT_PROJECTION,
-                                )
-                                if doc2:
-                                    p2 = safe_price(doc2.get('price'))
-                                    if p2:
-                                        all_offres.append({
-                                            'boutique': store_name2,
-                                            'prix': p2,
-                                            'stock': doc2.get('etat_stock', ''),
-                                            'url': doc2.get('url', ''),
-                                            'image': doc2.get('product_image', ''),
-                                        })
-                            except Exception:
-                                pass
-                        all_offres.sort(key=lambda x: x['prix'])
-                    elif prix:
-                        all_offres = [{'boutique': store_name, 'prix': prix,
-                                       'stock': doc.get('etat_stock', ''),
-                                       'url': doc.get('url', ''), 'image': doc.get('product_image', '')}]
-
-                    return Response({
-                        'id': str(doc['_id']),
-                        'slug': slug,
-                        'nom': doc.get('title', ''),
-                        'marque': (doc.get('brand') or '').title(),
-                        'categorie': doc.get('category', ''),
-                        'categorie_nom': doc.get('category_path', ''),
-                        'reference': reference,
-                        'image': doc.get('product_image', ''),
-                        'description': doc.get('fiche_technique', ''),
-                        'prix_min': min(o['prix'] for o in all_offres) if all_offres else prix,
-                        'prix_max': old_prix if old_prix and old_prix != prix else None,
-                        'discount': discount,
-                        'en_stock': doc.get('etat_stock') == 'En stock',
-                        'boutique': store_name,
-                        'url_boutique': doc.get('url', ''),
-                        'offres': all_offres,
-                    })
-            except Exception as e:
-                logger.error(f"Erreur produit_detail ObjectId {store_name}: {e}")
+        unreachable = False
+        stores = get_all_stores()
+        for i, (get_col, store_name) in enumerate(stores):
+            if deadline_passed(store_name) or not circuit_allows(store_name):
+                unreachable = True
                 continue
+            with timed('mongo', store_name):
+                try:
+                    # Recherche du doc puis des offres : au plus 2 appels par store restant
+                    doc = get_col().find_one({'_id': oid}, max_time_ms=max_time_ms(2 * (len(stores) - i)))
+                    circuit_record(store_name)
+                    if doc:
+                        prix = safe_price(doc.get('price'))
+                        old_prix = safe_price(doc.get('old_price'))
+                        discount = safe_price(doc.get('discount')) or 0
+                        reference = doc.get('reference', '')
+
+                        # Cherche le même SKU dans les 3 stores
+                        all_offres = []
+                        offres_completes = True
+                        if reference:
+                            # Le store du produit a forcément la référence, même si son résumé dit non
+                            offer_stores = prune_stores(stores, references=[reference], keep={store_name})
+                            for j, (get_col2, store_name2) in enumerate(offer_stores):
+                                if deadline_passed(store_name2) or not circuit_allows(store_name2):
+                                    offres_completes = False
+                                    continue
+                                try:
+                                    doc2 = get_col2().find_one(
+                                        {'reference': {'$regex': f'^{re.escape(reference)}$', '$options': 'i'}},
+                                        PRODUIT_PROJECTION,
+                                        max_time_ms=max_time_ms(len(offer_stores) - j),
+                                    )
+                                    circuit_record(store_name2)
+                                    if doc2:
+                                        p2 = safe_price(doc2.get('price'))
+                                        if p2:
+                                            all_offres.append({
+                                                'boutique': store_name2,
+                                                'prix': p2,
+                                                'stock': doc2.get('etat_stock', ''),
+                                                'url': doc2.get('url', ''),
+                                                'image': doc2.get('product_image', ''),
+                                            })
+                                except Exception as e:
+                                    circuit_record(store_name2, e)
+                                    offres_completes = False
+                            all_offres.sort(key=lambda x: x['prix'])
+                        elif prix:
+                            all_offres = [{'boutique': store_name, 'prix': prix,
+                                           'stock': doc.get('etat_stock', ''),
+                                           'url': doc.get('url', ''), 'image': doc.get('product_image', '')}]
+
+                        response = {
+                            'id': str(doc['_id']),
+                            'slug': slug,
+                            'nom': doc.get('title', ''),
+                            'marque': (doc.get('brand') or '').title(),
+                            'categorie': doc.get('category', ''),
+                            'categorie_nom': doc.get('category_path', ''),
+                            'reference': reference,
+                            'image': doc.get('product_image', ''),
+                            'description': doc.get('fiche_technique', ''),
+                            'prix_min': min(o['prix'] for o in all_offres) if all_offres else prix,
+                            'prix_max': old_prix if old_prix and old_prix != prix else None,
+                            'discount': discount,
+                            'en_stock': doc.get('etat_stock') == 'En stock',
+                            'boutique': store_name,
+                            'url_boutique': doc.get('url', ''),
+                            'offres': all_offres,
+                        }
+                        if offres_completes:
+                            tags = product_tags([response]) | store_tags(stores)
+                            set_cached('product_detail', cache_key, response, tags=tags, since=epoch)
+                        return Response(response)
+                except Exception as e:
+                    circuit_record(store_name, e)
+                    logger.error("Erreur produit_detail ObjectId %s: %s", store_name, e)
+                    STORE_ERRORS.inc(store=store_name.lower(), endpoint='produit-detail')
+                    # Store en panne ou budget épuisé : le produit y est peut-être
+                    unreachable = unreachable or is_store_failure(e) or is_request_timeout(e)
+                    continue
 
+        if unreachable:
+            # Le produit est peut-être dans la boutique indisponible : pas de 404 définitif
+            return Response({'erreur': 'Boutique temporairement indisponible'},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE)
         return Response({'erreur': 'Produit introuvable'}, status=status.HTTP_404_NOT_FOUND)
 
-    # Recherche dans comparatif par Slug
+    # Comparatif par Slug : offre matérialisée (sidecar comparatif_offers, lecture indexée)
     try:
-        col = get_comparatif()
-        doc = col.find_one({'Slug': slug})
+        with timed('mongo', 'comparatif'):
+            offer = get_offer(slug)
     except Exception as e:
-        logger.error(f"Erreur MongoDB produit_detail {slug}: {e}")
+        logger.error("Erreur MongoDB produit_detail %s: %s", slug, e)
         return Response({'erreur': 'Erreur serveur'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    if not doc:
+    if not offer:
         return Response({'erreur': 'Produit introuvable'}, status=status.HTTP_404_NOT_FOUND)
 
-    d = {key: doc.get(val) for key, val in COMPARATIF_KEYS.items()}
-
-    nom = d['mytek_nom'] or d['tunisianet_nom'] or d['spacenet_nom'] or ''
-    image = d['mytek_image'] or d['tunisianet_image'] or d['spacenet_image'] or ''
-    marque = nom.split()[0].title() if nom else ''
-
-    offres = []
-    for store_key, label in [('mytek', 'Mytek'), ('tunisianet', 'Tunisianet'), ('spacenet', 'Spacenet')]:
-        prix = safe_price(d.get(f'{store_key}_prix'))
-        if prix:
-            offres.append({
-                'boutique': label,
-                'prix': prix,
-                'stock': d.get(f'{store_key}_stock', ''),
-                'url': d.get(f'{store_key}_url', ''),
-                'image': d.get(f'{store_key}_image', ''),
-            })
-
-    offres.sort(key=lambda x: x['prix'])
-    prix_list = [o['prix'] for o in offres]
-
-    return Response({
-        'id': str(doc.get('_id', '')),
+    response = {
+        'id': str(offer['_id']),
         'slug': slug,
-        'nom': nom,
-        'marque': marque,
-        'reference': d.get('reference', ''),
-        'image': image,
-        'prix_min': min(prix_list) if prix_list else None,
-        'prix_max': max(prix_list) if prix_list else None,
-        'offres': offres,
-    })
+        'nom': offer['nom'],
+        'marque': offer['marque'],
+        'reference': offer['reference'],
+        'image': offer['image'],
+        'prix_min': offer['prix_min'],
+        'prix_max': offer['prix_max'],
+        'offres': offer['offres'],
+    }
+    tags = product_tags([response]) | {f"produit:{slug}", 'store:comparatif'}
+    set_cached('product_detail', cache_key, response, tags=tags, since=epoch)
+    return Response(response)
 
 
 # ============================================
@@ -565,6 +1034,11 @@ CATEGORY_NOMS = {
 }
 
 
+def category_nom(slug: str) -> str:
+    """Nom affiché d'une catégorie (CATEGORY_NOMS, sinon slug mis en forme)."""
+    return CATEGORY_NOMS.get(slug, slug.replace('-', ' ').title())
+
+
 def load_valid_categories():
     """
     Charge les slugs valides depuis categories_config (Mytek).
@@ -572,15 +1046,16 @@ def load_valid_categories():
     """
     try:
         col = get_categories_config()
-        doc = col.find_one({'_id': 'keyword_map'})
+        doc = col.find_one({'_id': 'keyword_map'}, max_time_ms=max_time_ms(4))  # puis 3 stores
         if doc and 'data' in doc:
             return {item[0] for item in doc['data']}
     except Exception as e:
-        logger.warning(f"Impossible de charger categories_config : {e}")
+        logger.warning("Impossible de charger categories_config : %s", e)
     return None
 
 
 @api_view(['GET'])
+@request_deadline('categories-list')
 def categories_list(request):
     """
     GET /api/v1/categories/
@@ -588,64 +1063,79 @@ def categories_list(request):
     Filtre selon categories_config (keyword_map de Mytek) pour exclure les catégories parasites.
     Noms canoniques via CATEGORY_NOMS.
     """
+    cache_key = make_key('category_list')
+    cached = get_cached('category_list', cache_key)
+    if cached is not None:
+        return Response(cached)
+    epoch = cache_epoch()
+
     valid_slugs = load_valid_categories()  # set de slugs autorisés, None = pas de filtrage
+    failed_stores = set()
 
     cats = {}       # {slug: {id, slug, nom, nombre_produits, sous_categories: {}}}
     sous_cats = {}  # {f'{parent}/{sous_slug}': {id, slug, nom, parent_slug, nombre_produits}}
 
-    for get_col, store_name in get_all_stores():
-        try:
-            col = get_col()
-            pipeline = [
-                {'$match': {'category': {'$exists': True, '$ne': None, '$ne': ''}}},
-                {'$group': {
-                    '_id': {'cat': '$category', 'path': '$category_path'},
-                    'count': {'$sum': 1},
-                }},
-            ]
-            for doc in col.aggregate(pipeline):
-                cat_slug = doc['_id']['cat']
-                path = doc['_id']['path'] or ''
-                count = doc['count']
-
-                if not cat_slug:
-                    continue
+    stores = get_all_stores()
+    for i, (get_col, store_name) in enumerate(stores):
+        if deadline_passed(store_name) or not circuit_allows(store_name):
+            failed_stores.add(store_name)
+            continue
+        with timed('mongo', store_name):
+            try:
+                col = get_col()
+                pipeline = [
+                    {'$match': {'category': {'$exists': True, '$ne': None, '$ne': ''}}},
+                    {'$group': {
+                        '_id': {'cat': '$category', 'path': '$category_path'},
+                        'count': {'$sum': 1},
+                    }},
+                ]
+                for doc in col.aggregate(pipeline, **time_limit(len(stores) - i)):
+                    cat_slug = doc['_id']['cat']
+                    path = doc['_id']['path'] or ''
+                    count = doc['count']
+
+                    if not cat_slug:
+                        continue
 
-                # Filtrer les catégories parasites
-                if valid_slugs is not None and cat_slug not in valid_slugs:
-                    continue
+                    # Filtrer les catégories parasites
+                    if valid_slugs is not None and cat_slug not in valid_slugs:
+                        continue
 
-                parts = [p.strip() for p in path.split('>')] if '>' in path else []
-
-                # Catégorie parente — nom canonique depuis CATEGORY_NOMS
-                if cat_slug not in cats:
-                    nom = CATEGORY_NOMS.get(cat_slug, cat_slug.replace('-', ' ').title())
-                    cats[cat_slug] = {
-                        'id': cat_slug,
-                        'slug': cat_slug,
-                        'nom': nom,
-                        'nombre_produits': 0,
-                    }
-                cats[cat_slug]['nombre_produits'] += count
-
-                # Sous-catégorie (2ème segment du path)
-                if len(parts) >= 2:
-                    sous_nom = parts[1]
-                    sous_slug = slugify_fr(sous_nom)
-                    key = f'{cat_slug}/{sous_slug}'
-                    if key not in sous_cats:
-                        sous_cats[key] = {
-                            'id': key,
-                            'slug': key,
-                            'nom': sous_nom,
-                            'parent_slug': cat_slug,
+                    parts = [p.strip() for p in path.split('>')] if '>' in path else []
+
+                    # Catégorie parente — nom canonique depuis CATEGORY_NOMS
+                    if cat_slug not in cats:
+                        nom = category_nom(cat_slug)
+                        cats[cat_slug] = {
+                            'id': cat_slug,
+                            'slug': cat_slug,
+                            'nom': nom,
                             'nombre_produits': 0,
                         }
-                    sous_cats[key]['nombre_produits'] += count
+                    cats[cat_slug]['nombre_produits'] += count
 
-        except Exception as e:
-            logger.error(f"Erreur catégories {store_name}: {e}")
-            continue
+                    # Sous-catégorie (2ème segment du path)
+                    if len(parts) >= 2:
+                        sous_nom = parts[1]
+                        sous_slug = slugify_fr(sous_nom)
+                        key = f'{cat_slug}/{sous_slug}'
+                        if key not in sous_cats:
+                            sous_cats[key] = {
+                                'id': key,
+                                'slug': key,
+                                'nom': sous_nom,
+                                'parent_slug': cat_slug,
+                                'nombre_produits': 0,
+                            }
+                        sous_cats[key]['nombre_produits'] += count
+                circuit_record(store_name)
+            except Exception as e:
+                circuit_record(store_name, e)
+                logger.error("Erreur catégories %s: %s", store_name, e)
+                STORE_ERRORS.inc(store=store_name.lower(), endpoint='categories-list')
+                failed_stores.add(store_name)
+                continue
 
     # Injecter les sous-catégories dans chaque catégorie parente
     for cat in cats.values():
@@ -655,77 +1145,109 @@ def categories_list(request):
         )
 
     result = sorted(cats.values(), key=lambda x: -x['nombre_produits'])
-    return Response({'data': result, 'meta': {'total_items': len(result)}})
+    response = flag_partial({'data': result, 'meta': {'total_items': len(result)}}, failed_stores)
+    if not failed_stores:
+        set_cached('category_list', cache_key, response,
+                   tags={'categories'} | store_tags(stores), since=epoch)
+    return Response(response)
 
 
 @api_view(['GET'])
+@request_deadline('categorie-detail')
 def categorie_detail(request, slug: str):
     """
     GET /api/v1/categories/<slug>/
     Retourne la catégorie + ses produits.
     """
     page = get_page_number(request)
-    produits = []
+    count_futures = {}
+    failed_stores = set()
     categorie_nom = slug.replace('-', ' ').title()
 
-    for get_col, store_name in get_all_stores():
-        try:
-            col = get_col()
-            query = {'category': {'$regex': f'^{re.escape(slug)}$', '$options': 'i'}}
-            results = col.find(query, PRODUIT_PROJECTION).limit(PAGE_SIZE * 3)
-            for doc in results:
-                if not categorie_nom or categorie_nom == slug:
-                    categorie_nom = doc.get('category_path', categorie_nom)
-                produits.append(format_produit_from_store(doc, store_name))
-        except Exception as e:
-            logger.error(f"Erreur catégorie {slug} / {store_name}: {e}")
+    # Seulement les boutiques qui ont la catégorie (api/helpers/presence.py)
+    stores = prune_stores(get_all_stores(), categories=[slug])
+    query = {'category': {'$regex': f'^{re.escape(slug)}$', '$options': 'i'}}
+    targets = []
+    for get_col, store_name in stores:
+        # Une seule admission par boutique et par requête (la page et les sous-catégories la partagent)
+        if not circuit_allows(store_name):
+            failed_stores.add(store_name)
             continue
+        col = get_col()
+        count_futures[store_name] = start_count(
+            store_name, ('categorie', query), lambda col=col: count_documents(col, query))
+        targets.append((col, store_name, query, count_futures[store_name]))
 
-    if not produits:
+    # Part du budget réservée à la boucle des sous-catégories qui suit
+    produits = []
+    for doc in concatenated_page(targets, page, 'categorie-detail', later=len(stores),
+                                 failed_stores=failed_stores):
+        if not categorie_nom or categorie_nom == slug:
+            categorie_nom = doc.get('category_path', categorie_nom)
+        produits.append(format_produit_from_store(doc, doc.pop('_source')))
+
+    counts = sum_counts(count_futures)
+    if not produits and failed_stores:
+        # La catégorie est peut-être dans une boutique indisponible : pas de 404 définitif
+        return Response({'erreur': 'Boutique temporairement indisponible'},
+                        status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    if not produits and (counts is None or counts[0] == 0):
         return Response({'erreur': 'Catégorie introuvable'}, status=status.HTTP_404_NOT_FOUND)
 
-    # Récupérer les sous-catégories via le champ subcategory
+    # Récupérer les sous-catégories via le champ subcategory (boutiques déjà admises)
     sous_cats = {}
-    for get_col, store_name in get_all_stores():
-        try:
-            col = get_col()
-            pipeline = [
-                {'$match': {
-                    'category': {'$regex': f'^{re.escape(slug)}$', '$options': 'i'},
-                    'subcategory': {'$exists': True, '$ne': None, '$ne': ''},
-                }},
-                {'$group': {
-                    '_id': '$subcategory',
-                    'count': {'$sum': 1},
-                }},
-            ]
-            for doc in col.aggregate(pipeline):
-                sous_slug = doc['_id']
-                count = doc['count']
-                key = f'{slug}/{sous_slug}'
-                if key not in sous_cats:
-                    sous_cats[key] = {
-                        'id': key, 'slug': key,
-                        'nom': sous_slug.replace('-', ' ').title(),
-                        'parent_slug': slug,
-                        'nombre_produits': 0,
-                    }
-                sous_cats[key]['nombre_produits'] += count
-        except Exception as e:
-            logger.error(f"Erreur sous-cats {slug} / {store_name}: {e}")
+    admitted = {store_name for _, store_name, _, _ in targets}
+    for i, (get_col, store_name) in enumerate(stores):
+        if store_name not in admitted:
+            continue
+        if deadline_passed(store_name):
+            failed_stores.add(store_name)
+            continue
+        with timed('mongo', store_name):
+            try:
+                col = get_col()
+                pipeline = [
+                    {'$match': {
+                        'category': {'$regex': f'^{re.escape(slug)}$', '$options': 'i'},
+                        'subcategory': {'$exists': True, '$ne': None, '$ne': ''},
+                    }},
+                    {'$group': {
+                        '_id': '$subcategory',
+                        'count': {'$sum': 1},
+                    }},
+                ]
+                for doc in col.aggregate(pipeline, **time_limit(len(stores) - i)):
+                    sous_slug = doc['_id']
+                    count = doc['count']
+                    key = f'{slug}/{sous_slug}'
+                    if key not in sous_cats:
+                        sous_cats[key] = {
+                            'id': key, 'slug': key,
+                            'nom': sous_slug.replace('-', ' ').title(),
+                            'parent_slug': slug,
+                            'nombre_produits': 0,
+                        }
+                    sous_cats[key]['nombre_produits'] += count
+                circuit_record(store_name)
+            except Exception as e:
+                circuit_record(store_name, e)
+                logger.error("Erreur sous-cats %s / %s: %s", slug, store_name, e)
+                STORE_ERRORS.inc(store=store_name.lower(), endpoint='categorie-detail')
+                failed_stores.add(store_name)
 
     sous_list = sorted(sous_cats.values(), key=lambda x: -x['nombre_produits'])
 
-    response = paginate(produits, page)
+    response = paginate_page(produits, page, counts=counts)
     response['categorie'] = {
         'slug': slug,
         'nom': categorie_nom,
         'sous_categories': sous_list,
     }
-    return Response(response)
+    return Response(flag_partial(response, failed_stores))
 
 
 @api_view(['GET'])
+@request_deadline('sous-categorie-detail')
 def sous_categorie_detail(request, parent: str, sous: str):
     """
     GET /api/v1/categories/<parent>/<sous>/
@@ -733,70 +1255,90 @@ def sous_categorie_detail(request, parent: str, sous: str):
     Cherche d'abord via le champ `subcategory`, puis fallback sur `category_path`.
     """
     page = get_page_number(request)
-    produits = []
+    count_futures = {}
+    failed_stores = set()
+    targets = []
     sous_nom = sous.replace('-', ' ').title()
 
-    for get_col, store_name in get_all_stores():
-        try:
-            col = get_col()
-
-            # 1. Chercher via le champ subcategory (prioritaire)
-            query = {
-                'category': {'$regex': f'^{re.escape(parent)}$', '$options': 'i'},
-                'subcategory': {'$regex': f'^{re.escape(sous)}$', '$options': 'i'},
-            }
-            count = col.count_documents(query)
-
-            if count > 0:
-                # Récupérer le nom lisible depuis un document
-                sample = col.find_one(query, {'subcategory': 1, 'category_path': 1})
-                if sample and sample.get('category_path'):
-                    parts = [p.strip() for p in sample['category_path'].split('>')]
-                    if len(parts) >= 2:
+    stores = prune_stores(get_all_stores(), categories=[f'{parent}/{sous}'])
+    for i, (get_col, store_name) in enumerate(stores):
+        if deadline_passed(store_name) or not circuit_allows(store_name):
+            failed_stores.add(store_name)
+            continue
+        with timed('mongo', store_name):
+            try:
+                col = get_col()
+
+                # 1. Chercher via le champ subcategory (prioritaire)
+                query = {
+                    'category': {'$regex': f'^{re.escape(parent)}$', '$options': 'i'},
+                    'subcategory': {'$regex': f'^{re.escape(sous)}$', '$options': 'i'},
+                }
+                # Un document témoin suffit (nom lisible + présence) ; le total est compté à part
+                sample = col.find_one(query, {'subcategory': 1, 'category_path': 1},
+                                      max_time_ms=max_time_ms(len(stores) - i))
+
+                if sample:
+                    # Récupérer le nom lisible depuis un document
+                    if sample.get('category_path'):
+                        parts = [p.strip() for p in sample['category_path'].split('>')]
+                        if len(parts) >= 2:
+                            sous_nom = parts[1]
+                    count_futures[store_name] = start_count(
+                        store_name, ('sous-categorie', query), lambda col=col, query=query: count_documents(col, query))
+                    targets.append((col, store_name, query, count_futures[store_name]))
+                    circuit_record(store_name)
+                    continue
+
+                # 2. Fallback : chercher via category_path (slugify_fr)
+                paths = distinct_paths(col, {
+                    'category': {'$regex': f'^{re.escape(parent)}$', '$options': 'i'},
+                }, len(stores) - i)
+                matching_sous_noms = set()
+                for path in paths:
+                    parts = [p.strip() for p in path.split('>')]
+                    if len(parts) >= 2 and slugify_fr(parts[1]) == sous:
+                        matching_sous_noms.add(parts[1])
                         sous_nom = parts[1]
-                results = col.find(query, PRODUIT_PROJECTION).limit(PAGE_SIZE * 3)
-                for doc in results:
-                    produits.append(format_produit_from_store(doc, store_name))
-                continue
 
-            # 2. Fallback : chercher via category_path (slugify_fr)
-            paths = col.distinct('category_path', {
-                'category': {'$regex': f'^{re.escape(parent)}$', '$options': 'i'},
-            })
-            matching_sous_noms = set()
-            for path in paths:
-                parts = [p.strip() for p in path.split('>')]
-                if len(parts) >= 2 and slugify_fr(parts[1]) == sous:
-                    matching_sous_noms.add(parts[1])
-                    sous_nom = parts[1]
-
-            if not matching_sous_noms:
-                continue
+                if not matching_sous_noms:
+                    circuit_record(store_name)
+                    continue
 
-            sous_regex = '|'.join(re.escape(n) for n in matching_sous_noms)
-            query = {
-                'category': {'$regex': f'^{re.escape(parent)}$', '$options': 'i'},
-                'category_path': {'$regex': sous_regex, '$options': 'i'},
-            }
-            results = col.find(query, PRODUIT_PROJECTION).limit(PAGE_SIZE * 3)
-            for doc in results:
-                produits.append(format_produit_from_store(doc, store_name))
-
-        except Exception as e:
-            logger.error(f"Erreur sous-catégorie {parent}/{sous}: {e}")
-            continue
+                sous_regex = '|'.join(re.escape(n) for n in matching_sous_noms)
+                query = {
+                    'category': {'$regex': f'^{re.escape(parent)}$', '$options': 'i'},
+                    'category_path': {'$regex': sous_regex, '$options': 'i'},
+                }
+                count_futures[store_name] = start_count(
+                    store_name, ('sous-categorie', query), lambda col=col, query=query: count_documents(col, query))
+                targets.append((col, store_name, query, count_futures[store_name]))
+                circuit_record(store_name)
+            except Exception as e:
+                circuit_record(store_name, e)
+                logger.error("Erreur sous-catégorie %s/%s: %s", parent, sous, e)
+                STORE_ERRORS.inc(store=store_name.lower(), endpoint='sous-categorie-detail')
+                failed_stores.add(store_name)
+                continue
 
-    if not produits:
+    produits = [format_produit_from_store(doc, doc.pop('_source'))
+                for doc in concatenated_page(targets, page, 'sous-categorie-detail',
+                                             failed_stores=failed_stores)]
+    counts = sum_counts(count_futures)
+    if not produits and failed_stores:
+        return Response({'erreur': 'Boutique temporairement indisponible'},
+                        status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    if not produits and (counts is None or counts[0] == 0):
         return Response({'erreur': 'Sous-catégorie introuvable'}, status=status.HTTP_404_NOT_FOUND)
 
-    response = paginate(produits, page)
+    response = paginate_page(produits, page, counts=counts)
     response['categorie'] = {
         'slug': f'{parent}/{sous}',
         'nom': sous_nom,
         'parent_slug': parent,
         'parent_nom': parent.replace('-', ' ').title(),
     }
-    return Response(response)
+    return Response(flag_partial(response, failed_stores))
 
 
 # ============================================
@@ -804,68 +1346,99 @@ def sous_categorie_detail(request, parent: str, sous: str):
 # ============================================
 
 @api_view(['GET'])
+@request_deadline('marques-list')
 def marques_list(request):
     """
     GET /api/v1/marques/
     Agrège les marques distinctes depuis les 3 collections.
     """
+    cache_key = make_key('brand_list')
+    cached = get_cached('brand_list', cache_key)
+    if cached is not None:
+        return Response(cached)
+    epoch = cache_epoch()
+
     brands = {}
+    failed_stores = set()
 
-    for get_col, store_name in get_all_stores():
-        try:
-            col = get_col()
-            pipeline = [
-                {'$match': {'brand': {'$exists': True, '$ne': None, '$ne': ''}}},
-                {'$group': {
-                    '_id': '$brand',
-                    'count': {'$sum': 1},
-                }},
-            ]
-            for doc in col.aggregate(pipeline):
-                slug = (doc['_id'] or '').lower().strip()
-                if slug:
-                    if slug not in brands:
-                        brands[slug] = {
-                            'id': slug,
-                            'slug': slug,
-                            'nom': doc['_id'].title(),
-                            'nombre_produits': 0,
-                        }
-                    brands[slug]['nombre_produits'] += doc['count']
-        except Exception as e:
-            logger.error(f"Erreur marques {store_name}: {e}")
+    stores = get_all_stores()
+    for i, (get_col, store_name) in enumerate(stores):
+        if deadline_passed(store_name) or not circuit_allows(store_name):
+            failed_stores.add(store_name)
             continue
+        with timed('mongo', store_name):
+            try:
+                col = get_col()
+                pipeline = [
+                    {'$match': {'brand': {'$exists': True, '$ne': None, '$ne': ''}}},
+                    {'$group': {
+                        '_id': '$brand',
+                        'count': {'$sum': 1},
+                    }},
+                ]
+                for doc in col.aggregate(pipeline, **time_limit(len(stores) - i)):
+                    slug = (doc['_id'] or '').lower().strip()
+                    if slug:
+                        if slug not in brands:
+                            brands[slug] = {
+                                'id': slug,
+                                'slug': slug,
+                                'nom': doc['_id'].title(),
+                                'nombre_produits': 0,
+                            }
+                        brands[slug]['nombre_produits'] += doc['count']
+                circuit_record(store_name)
+            except Exception as e:
+                circuit_record(store_name, e)
+                logger.error("Erreur marques %s: %s", store_name, e)
+                STORE_ERRORS.inc(store=store_name.lower(), endpoint='marques-list')
+                failed_stores.add(store_name)
+                continue
 
     result = sorted(brands.values(), key=lambda x: -x['nombre_produits'])
-    return Response({'data': result, 'meta': {'total_items': len(result)}})
+    response = flag_partial({'data': result, 'meta': {'total_items': len(result)}}, failed_stores)
+    if not failed_stores:
+        set_cached('brand_list', cache_key, response,
+                   tags={'marques'} | store_tags(stores), since=epoch)
+    return Response(response)
 
 
 @api_view(['GET'])
+@request_deadline('marque-detail')
 def marque_detail(request, nom: str):
     """
     GET /api/v1/marques/<nom>/
     Retourne la marque + ses produits.
     """
     page = get_page_number(request)
-    produits = []
-
-    for get_col, store_name in get_all_stores():
-        try:
-            col = get_col()
-            query = {'brand': {'$regex': f'^{re.escape(nom)}$', '$options': 'i'}}
-            results = col.find(query, PRODUIT_PROJECTION).limit(PAGE_SIZE * 3)
-            for doc in results:
-                produits.append(format_produit_from_store(doc, store_name))
-        except Exception as e:
-            logger.error(f"Erreur marque {nom} / {store_name}: {e}")
+    count_futures = {}
+    failed_stores = set()
+
+    stores = prune_stores(get_all_stores(), marques=[nom])
+    query = {'brand': {'$regex': f'^{re.escape(nom)}$', '$options': 'i'}}
+    targets = []
+    for get_col, store_name in stores:
+        if not circuit_allows(store_name):
+            failed_stores.add(store_name)
             continue
-
-    if not produits:
+        col = get_col()
+        count_futures[store_name] = start_count(
+            store_name, ('marque', query), lambda col=col: count_documents(col, query))
+        targets.append((col, store_name, query, count_futures[store_name]))
+
+    produits = [format_produit_from_store(doc, doc.pop('_source'))
+                for doc in concatenated_page(targets, page, 'marque-detail',
+                                             failed_stores=failed_stores)]
+    counts = sum_counts(count_futures)
+    if not produits and failed_stores:
+        return Response({'erreur': 'Boutique temporairement indisponible'},
+                        status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    if not produits and (counts is None or counts[0] == 0):
         return Response({'erreur': 'Marque introuvable'}, status=status.HTTP_404_NOT_FOUND)
 
-    response = paginate(produits, page)
+    response = paginate_page(produits, page, counts=counts)
     response['marque'] = {'slug': nom.lower(), 'nom': nom.title()}
-    return Response(response)
+    return Response(flag_partial(response, failed_stores))
 
 
 # ============================================
@@ -876,20 +1449,26 @@ def marque_detail(request, nom: str):
 def blog_list(request):
     """GET /api/v1/blog/"""
     page = get_page_number(request)
-    posts = list(BlogPost.objects.prefetch_related('summary', 'specs').order_by('-published_date'))
-    data = [BlogPostListSerializer(p, context={'request': request}).data for p in posts]
-    return Response(paginate(data, page))
+    posts = (
+        BlogPost.objects
+        .only(*BLOG_LIST_FIELDS)
+        .order_by('-published_date', '-id')  # -id : ordre stable entre pages à date égale
+    )
+    posts, meta = paginate_queryset(posts, page)
+    data = BlogPostListSerializer(posts, many=True, context={'request': request}).data
+    return Response({'data': data, 'meta': meta})
 
 
 @api_view(['GET'])
 def blog_detail(request, slug: str):
-    """GET /api/v1/blog/<slug>/"""
-    try:
-        post = BlogPost.objects.prefetch_related('summary', 'specs', 'sections').get(slug=slug)
-    except BlogPost.DoesNotExist:
+    """
+    GET /api/v1/blog/<slug>/
+    Payload matérialisé (api/helpers/blog.py), invalidé par les signaux des modèles blog.
+    """
+    payload = get_post_detail(slug)
+    if payload is None:
         return Response({'erreur': 'Article introuvable'}, status=status.HTTP_404_NOT_FOUND)
-
-    return Response(BlogPostDetailSerializer(post, context={'request': request}).data)
+    return Response(absolutize_media(payload, request.build_absolute_uri('/')[:-1]))
 
 
 # ============================================
@@ -908,9 +1487,51 @@ def boutiques_list(request):
 
 @api_view(['POST'])
 def demandes_create(request):
-    """POST /api/v1/demandes/"""
+    """
+    POST /api/v1/demandes/
+    Validation immédiate ; l'insertion SQLite et l'email sont différés (api/helpers/intake.py).
+    """
     serializer = StoreRequestSerializer(data=request.data)
     if serializer.is_valid():
-        serializer.save()
+        intake.enqueue(serializer.validated_data)
         return Response({'message': 'Demande enregistrée avec succès.'}, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+# ============================================
+# IMAGES
+# ============================================
+
+def image_miniature(request):
+    """
+    GET /api/v1/images/miniature/?url=<image boutique>&w=320
+    Miniature WebP d'une image produit, mise en cache disque et navigateur (1 an).
+    """
+    url = request.GET.get('url', '')
+    try:
+        width = int(request.GET.get('w', settings.IMAGE_PROXY['default_width']))
+        with timed('thumbnail'):
+            path, image = open_thumbnail(url, width)
+    except (ValueError, ThumbnailError) as e:
+        logger.info("Miniature refusée (%s) : %s", e, url)
+        return HttpResponse(status=status.HTTP_404_NOT_FOUND)
+
+    response = FileResponse(image, content_type='image/webp')
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    response['ETag'] = '"%s"' % os.path.basename(path)[:-len('.webp')]
+    return response
+
+
+# ============================================
+# MÉTRIQUES
+# ============================================
+
+def metrics(request):
+    """
+    GET /metrics — format d'exposition texte Prometheus (métriques du process courant).
+    Si METRICS_TOKEN est défini : header `Authorization: Bearer <token>` obligatoire.
+    """
+    token = settings.METRICS_TOKEN
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponse(status=status.HTTP_401_UNAUTHORIZED)
+    return HttpResponse(render_text(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,10 @@
+"""
+============================================
+BENCH — Benchmarks reproductibles de l'API
+============================================
+- catalogue.py : catalogue synthétique Tunisianet / Mytek / Spacenet + comparatif
+- scenarios.py : mix de requêtes réaliste (recherche, catégorie, marque, détail)
+- runner.py    : rejoue le mix et calcule débit + latences p50/p95/p99
+
+Point d'entrée : python manage.py bench (voir api/management/commands/bench.py)
+"""
@@ -0,0 +1,175 @@
+"""
+============================================
+BENCH/CATALOGUE.PY — Catalogue synthétique
+============================================
+Génère un catalogue déterministe (même seed → mêmes documents, mêmes _id)
+au format des collections scrapées :
+- une collection par boutique (tunisianet / mytek / spacenet)
+- la collection comparatif (produits présents dans au moins 2 boutiques)
+- le document categories_config/keyword_map (base Mytek)
+"""
+import hashlib
+import random
+from typing import Dict, List
+
+from bson import ObjectId
+
+from api.views import slugify_fr
+
+STORES = {
+    'tunisianet': {'label': 'Tunisianet', 'site': 'https://www.tunisianet.com.tn', 'presence': 0.7},
+    'mytek':      {'label': 'Mytek',      'site': 'https://www.mytek.tn',          'presence': 0.8},
+    'spacenet':   {'label': 'Spacenet',   'site': 'https://spacenet.tn',           'presence': 0.55},
+}
+
+# {catégorie: ({sous-catégorie: (prix_min, prix_max)}, [marques])}
+TAXONOMIE = {
+    'informatique': (
+        {'PC Portable': (900, 6500), 'PC de Bureau': (700, 4500), 'Écran': (250, 2200), 'Imprimante': (150, 1800)},
+        ['hp', 'lenovo', 'dell', 'asus', 'acer', 'msi'],
+    ),
+    'telephonie': (
+        {'Smartphone': (250, 5500), 'Tablette': (350, 4000), 'Montre Connectée': (90, 1800)},
+        ['samsung', 'apple', 'xiaomi', 'oppo', 'realme', 'honor'],
+    ),
+    'electromenager': (
+        {'Réfrigérateur': (900, 5500), 'Machine à Laver': (800, 3500), 'Climatiseur': (1100, 4200), 'Micro-Ondes': (180, 900)},
+        ['samsung', 'lg', 'condor', 'beko', 'tcl', 'brandt'],
+    ),
+    'gaming': (
+        {'Console': (900, 2800), 'Manette': (60, 450), 'Casque Gamer': (50, 900)},
+        ['sony', 'microsoft', 'razer', 'logitech', 'redragon'],
+    ),
+    'tv-et-son': (
+        {'Téléviseur': (600, 9000), 'Barre de Son': (200, 2500), 'Enceinte Bluetooth': (40, 1200)},
+        ['samsung', 'lg', 'tcl', 'jbl', 'sony'],
+    ),
+    'photo-et-video': (
+        {'Appareil Photo': (700, 9000), 'Caméra Sport': (300, 2200)},
+        ['canon', 'nikon', 'gopro', 'sony'],
+    ),
+    'surveillance': (
+        {'Caméra IP': (80, 900), 'Kit Vidéosurveillance': (400, 2500)},
+        ['hikvision', 'dahua', 'ezviz'],
+    ),
+}
+
+COULEURS = ['Noir', 'Blanc', 'Gris', 'Bleu', 'Argent']
+STOCKS = ['En stock'] * 6 + ['Sur commande'] * 2 + ['Hors stock']
+
+
+def _object_id(*parts) -> ObjectId:
+    """ObjectId stable dérivé d'une clé (pour des chemins de détail identiques d'un run à l'autre)."""
+    return ObjectId(hashlib.md5('/'.join(map(str, parts)).encode()).hexdigest()[:24])
+
+
+def _modele(rng: random.Random) -> str:
+    return f"{rng.choice('ABCGKMSTVXZ')}{rng.randint(10, 990)}{rng.choice(['', 'S', 'X', 'Pro', 'Plus', 'Max'])}".strip()
+
+
+def generate_catalogue(size: int = 5000, seed: int = 42) -> Dict[str, List[dict]]:
+    """
+    Génère `size` produits distincts répartis sur les 3 boutiques.
+    Retourne {'tunisianet': [...], 'mytek': [...], 'spacenet': [...], 'comparatif': [...]}.
+    """
+    rng = random.Random(seed)
+    catalogue = {store: [] for store in STORES}
+    catalogue['comparatif'] = []
+    categories = list(TAXONOMIE)
+
+    for i in range(size):
+        cat = rng.choice(categories)
+        sous_cats, marques = TAXONOMIE[cat]
+        sous = rng.choice(list(sous_cats))
+        brand = rng.choice(marques)
+        modele = _modele(rng)
+        couleur = rng.choice(COULEURS)
+        reference = f"{brand[:3].upper()}-{modele.upper()}-{i:05d}"
+        base_title = f"{sous} {brand.upper()} {modele}"
+        low, high = sous_cats[sous]
+        base_price = round(rng.uniform(low, high))
+
+        offres = {}
+        for store, info in STORES.items():
+            if rng.random() > info['presence']:
+                continue
+            price = round(base_price * rng.uniform(0.92, 1.08), 3)
+            old_price, discount = None, 0
+            if rng.random() < 0.3:
+                old_price = round(price * rng.uniform(1.05, 1.3), 3)
+                discount = round(old_price - price, 3)
+            title = f"{base_title} - {couleur} ({reference})" if store == 'tunisianet' else f"{base_title} {couleur}"
+            slug_titre = slugify_fr(title)
+            doc = {
+                '_id': _object_id(store, i),
+                'title': title,
+                'brand': brand if store != 'spacenet' else brand.upper(),
+                'category': cat,
+                'category_path': f"{cat.replace('-', ' ').title()} > {sous}",
+                'price': price,
+                'old_price': old_price,
+                'discount': discount,
+                'etat_stock': rng.choice(STOCKS),
+                'product_image': f"{info['site']}/media/catalog/product/{slug_titre}.jpg",
+                'url': f"{info['site']}/{slug_titre}.html",
+                'reference': reference,
+                'fiche_technique': f"{base_title} — fiche technique synthétique. " * 8,
+                'identification_date': '2026-02-13T14:23',
+            }
+            # Seul Mytek expose un champ subcategory (les autres passent par category_path)
+            if store == 'mytek':
+                doc['subcategory'] = slugify_fr(sous)
+            catalogue[store].append(doc)
+            offres[store] = doc
+
+        if len(offres) >= 2:
+            comp = {
+                '_id': _object_id('comparatif', i),
+                'Slug': f"{slugify_fr(base_title)}-{i}",
+                'Matching': 'Exact Match',
+                'Réf Mytek': reference,
+            }
+            for store, info in STORES.items():
+                doc = offres.get(store)
+                label = info['label']
+                comp[f'Produit {label}'] = doc['title'] if doc else None
+                comp[f'Prix {label}'] = str(doc['price']) if doc else None
+                comp[f'Stock {label}'] = doc['etat_stock'] if doc else None
+                comp[f'URL {label}'] = doc['url'] if doc else None
+                comp[f'Image {label}'] = doc['product_image'] if doc else None
+            catalogue['comparatif'].append(comp)
+
+    return catalogue
+
+
+def keyword_map() -> dict:
+    """Document categories_config/keyword_map correspondant à la taxonomie synthétique."""
+    return {
+        '_id': 'keyword_map',
+        'data': [[cat, [s.lower() for s in sous_cats]] for cat, (sous_cats, _) in TAXONOMIE.items()],
+    }
+
+
+def seed_database(client, db_name: str, catalogue: Dict[str, List[dict]]) -> Dict[str, dict]:
+    """
+    Écrit le catalogue dans `db_name` (collections remises à zéro) et crée les index
+    attendus en production. Retourne un MONGODB_CONFIG pointant vers ces collections.
+    """
+    db = client[db_name]
+    config = {}
+    for name, docs in catalogue.items():
+        col = db[name]
+        col.drop()
+        if docs:
+            col.insert_many([dict(d) for d in docs])
+        if name == 'comparatif':
+            col.create_index('Slug')
+        else:
+            for field in ('category', 'brand', 'reference'):
+                col.create_index(field)
+        config[name] = {'db': db_name, 'collection': name}
+
+    config_col = db['categories_config']
+    config_col.drop()
+    config_col.insert_one(keyword_map())
+    return config
@@ -0,0 +1,116 @@
+"""
+============================================
+BENCH/RUNNER.PY — Rejeu et statistiques
+============================================
+Rejoue une liste de chemins via le client de test Django (middlewares inclus),
+regroupe les latences par endpoint (nom de route) et calcule :
+- débit (req/s)
+- latences p50 / p95 / p99 / moyenne (ms)
+- nombre de réponses en erreur (status >= 500)
+"""
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.test import Client
+from django.urls import resolve
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Percentile par rang le plus proche (valeurs déjà triées)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def _endpoint(path: str) -> str:
+    return resolve(path.split('?', 1)[0]).url_name
+
+
+def make_client() -> Client:
+    host = next((h.lstrip('.') for h in settings.ALLOWED_HOSTS if h != '*'), 'localhost')
+    return Client(HTTP_HOST=host)
+
+
+def replay(paths: List[str], warmup: int = 50, concurrency: int = 1) -> Tuple[Dict[str, List[Tuple[float, int]]], float]:
+    """
+    Rejoue `paths` et retourne ({endpoint: [(secondes, status), ...]}, durée murale).
+    Les `warmup` premières requêtes ne sont pas mesurées.
+    """
+    secure = getattr(settings, 'SECURE_SSL_REDIRECT', False)
+    client = make_client()
+    for path in paths[:warmup]:
+        client.get(path, secure=secure)
+
+    measured = paths[warmup:]
+
+    def hit(path):
+        c = client if concurrency == 1 else make_client()
+        start = time.perf_counter()
+        response = c.get(path, secure=secure)
+        return _endpoint(path), time.perf_counter() - start, response.status_code
+
+    results: Dict[str, List[Tuple[float, int]]] = {}
+    wall_start = time.perf_counter()
+    if concurrency == 1:
+        samples = [hit(p) for p in measured]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            samples = list(pool.map(hit, measured))
+    wall = time.perf_counter() - wall_start
+
+    for endpoint, elapsed, status_code in samples:
+        results.setdefault(endpoint, []).append((elapsed, status_code))
+    return results, wall
+
+
+def summarize(results: Dict[str, List[Tuple[float, int]]], wall: float) -> dict:
+    """Agrège les échantillons bruts en statistiques par endpoint + total."""
+    def stats(samples, duration):
+        latencies = sorted(s for s, _ in samples)
+        return {
+            'count': len(samples),
+            'errors': sum(1 for _, code in samples if code >= 500),
+            'throughput': round(len(samples) / duration, 2) if duration else 0.0,
+            'mean_ms': round(1000 * sum(latencies) / len(latencies), 3) if latencies else 0.0,
+            'p50_ms': round(1000 * percentile(latencies, 50), 3),
+            'p95_ms': round(1000 * percentile(latencies, 95), 3),
+            'p99_ms': round(1000 * percentile(latencies, 99), 3),
+        }
+
+    endpoints = {
+        name: stats(samples, sum(s for s, _ in samples))
+        for name, samples in sorted(results.items())
+    }
+    all_samples = [s for samples in results.values() for s in samples]
+    return {'endpoints': endpoints, 'total': stats(all_samples, wall)}
+
+
+def format_report(summary: dict, baseline: dict = None) -> str:
+    """Tableau texte ; si `baseline` est fourni, ajoute l'écart p50/p95/p99 en %."""
+    header = f"{'endpoint':<24}{'n':>6}{'err':>5}{'req/s':>10}{'p50':>10}{'p95':>10}{'p99':>10}"
+    if baseline:
+        header += f"{'Δp50':>9}{'Δp95':>9}{'Δp99':>9}"
+    lines = [header, '-' * len(header)]
+
+    rows = list(summary['endpoints'].items()) + [('TOTAL', summary['total'])]
+    base_rows = {}
+    if baseline:
+        base_rows = dict(baseline.get('endpoints', {}))
+        base_rows['TOTAL'] = baseline.get('total', {})
+
+    for name, s in rows:
+        line = (f"{name:<24}{s['count']:>6}{s['errors']:>5}{s['throughput']:>10.1f}"
+                f"{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}{s['p99_ms']:>10.2f}")
+        if baseline:
+            base = base_rows.get(name)
+            for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+                if base and base.get(key):
+                    line += f"{100 * (s[key] - base[key]) / base[key]:>+8.1f}%"
+                else:
+                    line += f"{'—':>9}"
+        lines.append(line)
+    return '\n'.join(lines)
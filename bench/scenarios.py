@@ -0,0 +1,98 @@
+"""
+============================================
+BENCH/SCENARIOS.PY — Mix de requêtes
+============================================
+Construit une liste déterministe de chemins d'API à rejouer, pondérée
+pour ressembler au trafic réel du frontend :
+- recherche texte / référence        (produits-list)
+- navigation catégorie / sous-cat     (categorie-detail, sous-categorie-detail)
+- navigation marque / filtres         (marque-detail, produits-list)
+- fiches produit                      (produit-detail)
+- listes globales                     (categories-list, marques-list)
+"""
+import random
+from typing import Dict, List
+from urllib.parse import urlencode
+
+from api.views import slugify_fr
+
+# (type de scénario, poids)
+MIX = [
+    ('search_text',      30),
+    ('search_reference',  8),
+    ('filter',           10),
+    ('category',         10),
+    ('sous_category',     5),
+    ('brand',            10),
+    ('detail_store',     12),
+    ('detail_comparatif', 8),
+    ('categories_list',   4),
+    ('marques_list',      3),
+]
+
+PREFIX = '/api/v1'
+
+
+def _produits(params: dict) -> str:
+    return f"{PREFIX}/produits/?{urlencode(params)}"
+
+
+def build_requests(catalogue: Dict[str, List[dict]], count: int = 1000, seed: int = 42) -> List[str]:
+    """Retourne `count` chemins d'API tirés selon MIX (même seed → même séquence)."""
+    rng = random.Random(seed)
+    store_docs = [doc for store in ('tunisianet', 'mytek', 'spacenet') for doc in catalogue[store]]
+    comparatif = catalogue['comparatif']
+    if not store_docs:
+        raise ValueError('Catalogue vide')
+
+    categories = sorted({d['category'] for d in store_docs})
+    marques = sorted({d['brand'].lower() for d in store_docs})
+    kinds = [k for k, _ in MIX]
+    weights = [w for _, w in MIX]
+
+    paths = []
+    while len(paths) < count:
+        kind = rng.choices(kinds, weights)[0]
+        doc = rng.choice(store_docs)
+        sous = doc['category_path'].split('>')[-1].strip()
+
+        if kind == 'search_text':
+            words = doc['title'].split()
+            choix = [
+                ' '.join(words[:2]),                       # "PC Portable"
+                f"{sous} {doc['brand']}",                  # "Smartphone samsung"
+                ' '.join(words[:4]),                       # "PC Portable HP K410S"
+                doc['brand'],                              # "lenovo"
+            ]
+            paths.append(_produits({'q': rng.choice(choix), 'page': rng.choice([1, 1, 1, 2])}))
+        elif kind == 'search_reference':
+            paths.append(_produits({'q': doc['reference']}))
+        elif kind == 'filter':
+            params = rng.choice([
+                {'en_promo': 1},
+                {'categorie': doc['category'], 'en_stock': 1},
+                {'categorie': doc['category'], 'prix_max': round(doc['price'] * 1.2)},
+                {'marque': ','.join(rng.sample(marques, 3))},
+                {'boutique': rng.choice(['mytek', 'tunisianet', 'spacenet']), 'en_promo': 1},
+                {'categorie': f"{doc['category']}/{slugify_fr(sous)}"},
+            ])
+            if rng.random() < 0.3:
+                params['tri'] = rng.choice(['prix_asc', 'prix_desc'])
+            paths.append(_produits(params))
+        elif kind == 'category':
+            paths.append(f"{PREFIX}/categories/{rng.choice(categories)}/")
+        elif kind == 'sous_category':
+            paths.append(f"{PREFIX}/categories/{doc['category']}/{slugify_fr(sous)}/")
+        elif kind == 'brand':
+            paths.append(f"{PREFIX}/marques/{rng.choice(marques)}/")
+        elif kind == 'detail_store':
+            paths.append(f"{PREFIX}/produits/{doc['_id']}/")
+        elif kind == 'detail_comparatif':
+            if comparatif:
+                paths.append(f"{PREFIX}/produits/{rng.choice(comparatif)['Slug']}/")
+        elif kind == 'categories_list':
+            paths.append(f"{PREFIX}/categories/")
+        elif kind == 'marques_list':
+            paths.append(f"{PREFIX}/marques/")
+
+    return paths
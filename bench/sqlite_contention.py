@@ -0,0 +1,120 @@
+"""
+============================================
+BENCH/SQLITE_CONTENTION.PY — Lectures blog vs écritures demandes
+============================================
+Mesure l'effet des PRAGMA SQLite (settings.SQLITE_PRAGMAS) sur la contention :
+des lecteurs rejouent la requête de la liste du blog pendant que des écrivains
+insèrent des demandes, chacun avec sa propre connexion (comme des workers distincts).
+
+Pour chaque profil : latences des lectures (p50 / p95 / p99 / max), débits,
+et nombre d'erreurs "database is locked".
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Dict
+
+from .runner import percentile
+
+# Comportement SQLite par défaut (journal rollback, fsync à chaque commit)
+DEFAULT_PROFILE = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+
+SCHEMA = """
+CREATE TABLE post (id INTEGER PRIMARY KEY, title TEXT, slug TEXT, excerpt TEXT, content TEXT, published REAL);
+CREATE INDEX post_published ON post (published DESC, id DESC);
+CREATE TABLE demande (id INTEGER PRIMARY KEY, contact TEXT, email TEXT, message TEXT, created REAL);
+"""
+READ_SQL = "SELECT id, title, slug, excerpt, published FROM post ORDER BY published DESC, id DESC LIMIT 20 OFFSET ?"
+WRITE_SQL = "INSERT INTO demande (contact, email, message, created) VALUES (?, ?, ?, ?)"
+
+
+def _connect(path: str, pragmas: Dict[str, object], busy_timeout_ms: int) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=busy_timeout_ms / 1000, isolation_level=None, check_same_thread=False)
+    for key, value in pragmas.items():
+        conn.execute(f"PRAGMA {key}={value}")
+    return conn
+
+
+def _seed(path: str, posts: int) -> None:
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    conn.executemany(
+        "INSERT INTO post (title, slug, excerpt, content, published) VALUES (?, ?, ?, ?, ?)",
+        [(f"Article {i}", f"article-{i}", 'x' * 300, 'y' * 8000, i) for i in range(posts)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def run_profile(pragmas: Dict[str, object], readers: int = 4, writers: int = 2,
+                duration: float = 5.0, posts: int = 2000) -> dict:
+    busy_timeout = int(pragmas.get('busy_timeout', 5000))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'contention.sqlite3')
+        _seed(path, posts)
+
+        stop = threading.Event()
+        lock = threading.Lock()
+        read_latencies, counts = [], {'writes': 0, 'locked': 0}
+
+        def reader(n):
+            conn = _connect(path, pragmas, busy_timeout)
+            local, i = [], n
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    conn.execute(READ_SQL, ((i * 20) % posts,)).fetchall()
+                    local.append(time.perf_counter() - start)
+                except sqlite3.OperationalError:
+                    with lock:
+                        counts['locked'] += 1
+                i += 1
+            conn.close()
+            with lock:
+                read_latencies.extend(local)
+
+        def writer(n):
+            conn = _connect(path, pragmas, busy_timeout)
+            while not stop.is_set():
+                try:
+                    conn.execute("BEGIN IMMEDIATE")
+                    conn.execute(WRITE_SQL, (f"Contact {n}", 'a@b.tn', 'm' * 500, time.time()))
+                    conn.execute("COMMIT")
+                    with lock:
+                        counts['writes'] += 1
+                except sqlite3.OperationalError:
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    with lock:
+                        counts['locked'] += 1
+            conn.close()
+
+        threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+        threads += [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+        for t in threads:
+            t.start()
+        time.sleep(duration)
+        stop.set()
+        for t in threads:
+            t.join()
+
+    ordered = sorted(read_latencies)
+    return {
+        'reads_per_s': round(len(ordered) / duration, 1),
+        'writes_per_s': round(counts['writes'] / duration, 1),
+        'locked_errors': counts['locked'],
+        **{f'read_{name}_ms': round(percentile(ordered, pct) * 1000, 2)
+           for name, pct in (('p50', 50), ('p95', 95), ('p99', 99))},
+        'read_max_ms': round(ordered[-1] * 1000, 2) if ordered else 0.0,
+    }
+
+
+def format_comparison(results: Dict[str, dict]) -> str:
+    columns = ['reads_per_s', 'writes_per_s', 'read_p50_ms', 'read_p95_ms', 'read_p99_ms', 'read_max_ms', 'locked_errors']
+    width = max(len(c) for c in columns) + 2
+    lines = [' ' * width + ''.join(f"{name:>14}" for name in results)]
+    for column in columns:
+        lines.append(f"{column:<{width}}" + ''.join(f"{r[column]:>14}" for r in results.values()))
+    return '\n'.join(lines)
@@ -0,0 +1,87 @@
+"""
+============================================
+CORE/LOG_HANDLERS.PY — Handlers de logs non bloquants
+============================================
+AsyncHandler enveloppe un handler classique (RotatingFileHandler, StreamHandler…) :
+- le thread de la requête ne fait que déposer le LogRecord dans une file en mémoire
+- un thread d'écriture (QueueListener) formate le message et écrit sur disque / console,
+  rotation de fichier comprise
+- file bornée : si elle est pleine, l'enregistrement est abandonné (compté) plutôt
+  que de bloquer la requête
+
+Le formatage (`msg % args`) est fait par le thread d'écriture : avec des appels
+`logger.info("… %s", valeur)`, la requête ne paie jamais la mise en forme.
+
+Le thread d'écriture démarre au premier log du process (compatible fork gunicorn)
+et est vidé à l'arrêt : logging.shutdown() (atexit) appelle close() sur chaque handler.
+
+Configuration (core/settings.py, LOGGING) :
+    'api_file': {
+        '()': 'core.log_handlers.AsyncHandler',
+        'target': 'logging.handlers.RotatingFileHandler',
+        'filename': LOGS_DIR / 'api.log', 'maxBytes': 5242880, 'backupCount': 3,
+        'level': 'INFO', 'formatter': 'verbose',
+    }
+"""
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+from django.utils.module_loading import import_string
+
+from api.helpers.metrics import counter
+
+LOG_RECORDS_DROPPED = counter(
+    'toprix_log_records_dropped_total',
+    "Enregistrements de log abandonnés (file d'écriture pleine)",
+    ('handler',),
+)
+
+
+class AsyncHandler(QueueHandler):
+
+    def __init__(self, target: str, queue_size: int = 10000, **target_kwargs):
+        super().__init__(queue.Queue(queue_size))
+        self.target = import_string(target)(**target_kwargs)
+        self.queue_size = queue_size
+        self._listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def setFormatter(self, fmt):
+        super().setFormatter(fmt)
+        self.target.setFormatter(fmt)
+
+    def _ensure_listener(self) -> None:
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # Après un fork, la file et le thread hérités du parent sont inutilisables
+            self.queue = queue.Queue(self.queue_size)
+            self._listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+            self._listener.start()
+            self._pid = os.getpid()
+
+    def prepare(self, record):
+        # Pas de self.format() ici : le thread d'écriture s'en charge
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc(handler=self.name or type(self.target).__name__)
+
+    def emit(self, record):
+        self._ensure_listener()
+        super().emit(record)
+
+    def close(self):
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+            self._pid = None
+        self.target.close()
+        super().close()
@@ -38,6 +38,7 @@ INSTALLED_APPS = [
 # MIDDLEWARE
 # ============================================
 MIDDLEWARE = [
+    'api.middleware.ServerTimingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -72,36 +73,69 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # ============================================
 # BASE DE DONNÉES SQLite (Blog, Demandes)
 # ============================================
+# PRAGMA appliqués à chaque nouvelle connexion (profil mesuré par `python manage.py bench_sqlite`)
+# - WAL : les lectures ne sont plus bloquées par une écriture en cours
+# - synchronous=NORMAL : fsync aux checkpoints seulement (sûr en WAL)
+# - busy_timeout : attente du verrou d'écriture au lieu d'un "database is locked" immédiat
+SQLITE_PRAGMAS = {
+    'journal_mode': config('SQLITE_JOURNAL_MODE', default='WAL'),
+    'synchronous':  config('SQLITE_SYNCHRONOUS', default='NORMAL'),
+    'mmap_size':    config('SQLITE_MMAP_SIZE', default=134217728, cast=int),   # 128 Mo
+    'cache_size':   config('SQLITE_CACHE_SIZE', default=-20000, cast=int),     # négatif = Kio (20 Mo)
+    'busy_timeout': config('SQLITE_BUSY_TIMEOUT_MS', default=5000, cast=int),
+    'temp_store':   'MEMORY',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {k}={v}' for k, v in SQLITE_PRAGMAS.items()),
+            # Verrou d'écriture pris dès BEGIN : évite les échecs de promotion lecture → écriture
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
 # ============================================
 # MONGODB — Produits (identique à public_python)
 # ============================================
+# Lectures catalogue (db/mongo.py) : read preference par défaut (surchargée par
+# store), retard max toléré d'un secondaire (s, ≥ 90 ; -1 = sans limite), hedged reads
+# des agrégations de recherche (clusters shardés uniquement, via mongos)
+MONGODB_READS = {
+    'read_preference': config('MONGODB_READ_PREFERENCE', default='secondaryPreferred'),
+    'max_staleness': config('MONGODB_MAX_STALENESS', default=120, cast=int),
+    'hedged_search': config('MONGODB_HEDGED_READS', default=False, cast=bool),
+}
+
 MONGODB_CONFIG = {
     'tunisianet': {
         'uri':        config('MONGODB_TUNISIANET_URI'),
         'db':         config('MONGODB_TUNISIANET_DB', default='Produits'),
         'collection': config('MONGODB_TUNISIANET_COLLECTION', default='DB'),
+        'read_preference': config('MONGODB_TUNISIANET_READ_PREFERENCE', default=MONGODB_READS['read_preference']),
     },
     'mytek': {
         'uri':        config('MONGODB_MYTEK_URI'),
         'db':         config('MONGODB_MYTEK_DB', default='Produits'),
         'collection': config('MONGODB_MYTEK_COLLECTION', default='DB'),
+        'read_preference': config('MONGODB_MYTEK_READ_PREFERENCE', default=MONGODB_READS['read_preference']),
     },
     'spacenet': {
         'uri':        config('MONGODB_SPACENET_URI'),
         'db':         config('MONGODB_SPACENET_DB', default='Produits'),
         'collection': config('MONGODB_SPACENET_COLLECTION', default='DB'),
+        'read_preference': config('MONGODB_SPACENET_READ_PREFERENCE', default=MONGODB_READS['read_preference']),
     },
     'comparatif': {
         'uri':        config('MONGODB_COMPARATIF_URI'),
         'db':         config('MONGODB_COMPARATIF_DB', default='Produits'),
         'collection': config('MONGODB_COMPARATIF_COLLECTION', default='DB'),
+        'read_preference': config('MONGODB_COMPARATIF_READ_PREFERENCE', default=MONGODB_READS['read_preference']),
+        # Offres matérialisées (manage.py build_comparatif_offers)
+        'offers_collection': config('MONGODB_COMPARATIF_OFFERS_COLLECTION', default='comparatif_offers'),
     },
 }
 
@@ -133,33 +167,165 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='noreply@toprix.net')
 
+# ============================================
+# DEMANDES — écriture différée (api/helpers/intake.py)
+# ============================================
+DEMANDES_INTAKE = {
+    'dir':            config('DEMANDES_INTAKE_DIR', default=str(BASE_DIR / 'var' / 'demandes')),
+    'flush_interval': config('DEMANDES_FLUSH_INTERVAL', default=2.0, cast=float),
+    'batch_size':     200,
+    'notify_email':   config('DEMANDES_NOTIFY_EMAIL', default=''),
+}
+
 # ============================================
 # CACHE LocMem (identique à public_python)
 # ============================================
+# LocMem = un cache par process. Avec plusieurs process (Passenger / gunicorn), utiliser un
+# backend partagé pour que l'invalidation du blog (api/signals.py) soit vue partout :
+# CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache, CACHE_LOCATION=/chemin/cache
+CACHE_BACKEND = config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache')
+CACHE_LOCATION = config('CACHE_LOCATION', default='toprix-api-cache')
+
+
+def _cache_alias(name: str, max_entries: int, location: str = '') -> dict:
+    """
+    Alias séparé sur le même backend que 'default', à un emplacement dérivé de
+    CACHE_LOCATION : sous-dossier (FileBasedCache), nom distinct (LocMem), préfixe de
+    clés (serveur memcached / redis). Jamais évincé par le cache des réponses API.
+    """
+    alias = {'BACKEND': CACHE_BACKEND, 'OPTIONS': {'MAX_ENTRIES': max_entries}, 'TIMEOUT': 86400}
+    if location:
+        alias['LOCATION'] = location
+    elif CACHE_BACKEND.endswith('FileBasedCache'):
+        alias['LOCATION'] = os.path.join(CACHE_LOCATION, name)
+    elif CACHE_BACKEND.endswith('LocMemCache'):
+        alias['LOCATION'] = f"{CACHE_LOCATION}-{name}"
+    else:
+        alias.update(LOCATION=CACHE_LOCATION, KEY_PREFIX=name)
+    return alias
+
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'toprix-api-cache',
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': CACHE_LOCATION,
         'OPTIONS': {
             'MAX_ENTRIES': 500,
         },
         'TIMEOUT': 86400,
-    }
+    },
+    # Sessions (admin)
+    'sessions': _cache_alias('sessions', 5000, config('SESSION_CACHE_LOCATION', default='')),
+    # Versions des tags d'invalidation (api/helpers/cache.py) : quelques dizaines d'octets
+    # chacune, une par produit / référence / marque / catégorie vus ou modifiés
+    'tags': _cache_alias('tags', config('CACHE_TAG_MAX_ENTRIES', default=200000, cast=int)),
 }
 
+# Invalidation ciblée par change streams MongoDB (api/helpers/invalidation.py)
+CACHE_INVALIDATION = {
+    'in_process':        config('CACHE_INVALIDATION_IN_PROCESS', default=False, cast=bool),
+    'debounce':          1.0,
+    'retry_delay':       10,
+    'marker_collection': config('SCRAPE_MARKER_COLLECTION', default=''),
+    'marker_field':      config('SCRAPE_MARKER_FIELD', default='version'),
+    'poll_interval':     config('SCRAPE_MARKER_POLL', default=30, cast=int),
+    'heartbeat':         10,  # s : battement par store suivi, périmé après 3 battements manqués
+}
+
+# Durées de cache (s) par namespace (api/helpers/cache.py), 0 = pas de cache.
+# Réponses API (search_results … brand_list) : identiques pour tous les visiteurs,
+# 3 à 6 requêtes MongoDB par miss. La durée borne le retard sur les scrapes quand le
+# watcher (api/helpers/invalidation.py) ne tourne pas ; avec lui, les tags invalident plus tôt.
 CACHE_TIMES = {
-    'search_results': 3600,
-    'product_detail': 43200,
-    'category_list':  86400,
-    'brand_list':     86400,
+    'search_results': config('CACHE_TTL_SEARCH', default=3600, cast=int),
+    # Prix et offres affichés : au plus 10 min de retard sans watcher, assez pour absorber
+    # les rafales sur une fiche partagée
+    'product_detail': config('CACHE_TTL_PRODUCT_DETAIL', default=600, cast=int),
+    'category_list':  config('CACHE_TTL_LISTS', default=86400, cast=int),   # sans prix
+    'brand_list':     config('CACHE_TTL_LISTS', default=86400, cast=int),
+    'blog_detail':    604800,  # reconstruit à chaque modification (api/signals.py)
+    'image_variants': 2592000,  # variantes sur disque, clé = nom du fichier original
+    'result_counts':  3600,     # meta.total_items par store et filtre (api/helpers/counts.py)
+    'field_values':   86400,    # valeurs marque / catégorie stockées par store (api/helpers/filters.py)
+}
+
+# Disjoncteurs par boutique (api/helpers/breaker.py) : échecs consécutifs avant
+# ouverture, durée d'ouverture (s) avant une requête de sonde
+CIRCUIT_BREAKER = {
+    'store': {
+        'failures': config('BREAKER_STORE_FAILURES', default=5, cast=int),
+        'cooldown': config('BREAKER_STORE_COOLDOWN', default=30, cast=float),
+    },
+    'search': {  # index Atlas Search "Text" → fallback regex direct
+        'failures': config('BREAKER_SEARCH_FAILURES', default=3, cast=int),
+        'cooldown': config('BREAKER_SEARCH_COOLDOWN', default=300, cast=float),
+    },
+}
+
+# Budget de temps MongoDB par requête (api/helpers/deadline.py), en secondes,
+# réparti entre stores et fallbacks et transmis en maxTimeMS
+REQUEST_DEADLINE = {
+    'enabled': config('REQUEST_DEADLINE', default=True, cast=bool),
+    'default': config('REQUEST_DEADLINE_DEFAULT', default=5.0, cast=float),
+    'budgets': {  # par endpoint (nom d'URL)
+        'produits-list': config('REQUEST_DEADLINE_SEARCH', default=3.0, cast=float),
+        'produits-facets': config('REQUEST_DEADLINE_SEARCH', default=3.0, cast=float),
+        'produit-detail': config('REQUEST_DEADLINE_DETAIL', default=2.0, cast=float),
+    },
+    'min_query_ms': 50,  # plancher de maxTimeMS (0 = pas de limite pour MongoDB)
+}
+
+# Résumés de présence par store (api/helpers/presence.py) : marques, catégories,
+# sous-catégories et références en mémoire, pour ne pas interroger un store qui
+# ne peut rien renvoyer. Reconstruits après chaque scrape (tags du watcher)
+STORE_PRESENCE = {
+    'enabled':       config('STORE_PRESENCE', default=True, cast=bool),
+    'max_age':       config('STORE_PRESENCE_MAX_AGE', default=3600, cast=int),  # s, même sans invalidation
+    'build_timeout': 60,  # s : maxTimeMS des agrégations de construction
+}
+
+# Offres comparatif matérialisées (api/helpers/comparatif.py) : âge maximal (s) d'une
+# entrée servie quand aucun watcher ne suit comparatif (au-delà : calcul depuis comparatif)
+COMPARATIF_OFFERS = {
+    'max_age': config('COMPARATIF_OFFERS_MAX_AGE', default=3600, cast=int),
+}
+
+# Regroupement des misses identiques simultanés (api/helpers/singleflight.py)
+SINGLE_FLIGHT = {
+    'enabled': config('SINGLE_FLIGHT', default=True, cast=bool),
+    'lease':   15,    # s : bail du leader dans le cache partagé (borne un leader mort)
+    'wait':    10,    # s : attente max d'un follower avant de calculer lui-même
+    'poll':    0.05,  # s : relecture du cache par les followers d'un autre process
+}
+
+# Fréquence des recherches, pour manage.py prewarm_cache (api/helpers/querylog.py)
+QUERY_LOG = {
+    'enabled':        config('QUERY_LOG', default=True, cast=bool),
+    'dir':            config('QUERY_LOG_DIR', default=str(BASE_DIR / 'var' / 'querylog')),
+    'capacity':       1000,       # compteurs par type et par process
+    'flush_interval': 60,         # s
+    'max_age':        7 * 86400,  # s : instantanés plus anciens ignorés (process disparus)
+}
+
+# Comptage des résultats (meta.total_items) en parallèle des requêtes de page
+RESULT_COUNTS = {
+    # Au-delà, comptage arrêté : total minimal, meta.total_estime = true
+    'threshold': config('RESULT_COUNT_THRESHOLD', default=10000, cast=int),
+    'workers':   config('RESULT_COUNT_WORKERS', default=6, cast=int),
+    'timeout':   config('RESULT_COUNT_TIMEOUT', default=2.0, cast=float),
 }
 
 # ============================================
 # SESSION (identique à public_python)
 # ============================================
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+# cached_db : lecture depuis le cache `sessions`, écriture en base seulement quand la
+# session change (connexion, déconnexion) → plus de lecture django_session par requête admin
+SESSION_ENGINE = config('SESSION_ENGINE', default='django.contrib.sessions.backends.cached_db')
+SESSION_CACHE_ALIAS = 'sessions'
 SESSION_COOKIE_AGE = 86400
 SESSION_SAVE_EVERY_REQUEST = False
+# Purge des sessions expirées par les process WSGI (api/helpers/sessions.py), 0 = désactivée
+SESSION_SWEEP_INTERVAL = config('SESSION_SWEEP_INTERVAL', default=21600, cast=int)
 
 # ============================================
 # VALIDATION MOTS DE PASSE
@@ -181,6 +347,29 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'public' / 'media'
 
+# URL publique du backend (liens absolus hors requête : miniatures produits)
+API_BASE_URL = config('API_BASE_URL', default='').rstrip('/')
+
+# Proxy de miniatures des images produits (api/helpers/thumbnails.py)
+IMAGE_PROXY = {
+    'dir':              config('IMAGE_PROXY_DIR', default=str(BASE_DIR / 'cache' / 'thumbnails')),
+    'max_bytes':        config('IMAGE_PROXY_MAX_MB', default=500, cast=int) * 1024 * 1024,
+    'max_source_bytes': 10 * 1024 * 1024,
+    'max_pixels':       40_000_000,  # largeur × hauteur annoncées, contrôlées avant décodage
+    'widths':           (160, 320, 480),
+    'default_width':    320,
+    'quality':          78,
+    'timeout':          5,
+    'allowed_hosts':    ('mytek.tn', 'tunisianet.com.tn', 'spacenet.tn'),
+}
+
+# Variantes responsives des images du blog (api/helpers/images.py)
+IMAGE_VARIANTS = {
+    'widths':            (320, 640, 1024, 1600),
+    'quality':           80,
+    'placeholder_width': 16,
+}
+
 # ============================================
 # INTERNATIONALISATION
 # ============================================
@@ -197,6 +386,23 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 DATA_UPLOAD_MAX_MEMORY_SIZE = 5242880
 FILE_UPLOAD_MAX_MEMORY_SIZE = 5242880
 
+# Header Server-Timing (étapes mesurées par api.middleware.ServerTimingMiddleware).
+# Désactivé par défaut : il expose les latences internes par store. Sans lui, le header
+# est envoyé aux seules requêtes `Authorization: Bearer <METRICS_TOKEN>`
+SERVER_TIMING = config('SERVER_TIMING', default=False, cast=bool)
+
+# Journal des requêtes MongoDB lentes (db/slow_queries.py → logs/slow_queries.log)
+SLOW_QUERY = {
+    'threshold_ms':     config('SLOW_QUERY_MS', default=500, cast=int),
+    'sample_rate':      config('SLOW_QUERY_SAMPLE_RATE', default=1.0, cast=float),
+    'max_per_minute':   config('SLOW_QUERY_MAX_PER_MINUTE', default=30, cast=int),
+    'explain':          config('SLOW_QUERY_EXPLAIN', default=True, cast=bool),
+    'explain_interval': 600,  # un explain par forme de requête toutes les 10 min
+}
+
+# Endpoint /metrics (vide = accès libre, sinon header Authorization: Bearer <token>)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
 # ============================================
 # LOGGING avec rotation (identique à public_python)
 # ============================================
@@ -218,14 +424,17 @@ LOGGING = {
         },
     },
     'handlers': {
+        # Handlers non bloquants : écriture / rotation dans un thread dédié (core/log_handlers.py)
         'console': {
             'level': 'INFO',
-            'class': 'logging.StreamHandler',
+            '()': 'core.log_handlers.AsyncHandler',
+            'target': 'logging.StreamHandler',
             'formatter': 'simple',
         },
         'file': {
             'level': 'INFO',
-            'class': 'logging.handlers.RotatingFileHandler',
+            '()': 'core.log_handlers.AsyncHandler',
+            'target': 'logging.handlers.RotatingFileHandler',
             'filename': LOGS_DIR / 'django.log',
             'maxBytes': 10485760,
             'backupCount': 5,
@@ -233,12 +442,22 @@ LOGGING = {
         },
         'api_file': {
             'level': 'INFO',
-            'class': 'logging.handlers.RotatingFileHandler',
+            '()': 'core.log_handlers.AsyncHandler',
+            'target': 'logging.handlers.RotatingFileHandler',
             'filename': LOGS_DIR / 'api.log',
             'maxBytes': 5242880,
             'backupCount': 3,
             'formatter': 'verbose',
         },
+        'slow_queries_file': {
+            'level': 'WARNING',
+            '()': 'core.log_handlers.AsyncHandler',
+            'target': 'logging.handlers.RotatingFileHandler',
+            'filename': LOGS_DIR / 'slow_queries.log',
+            'maxBytes': 5242880,
+            'backupCount': 3,
+            'formatter': 'simple',
+        },
     },
     'loggers': {
         'django': {
@@ -251,6 +470,11 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        'api.slow_queries': {
+            'handlers': ['slow_queries_file'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
     },
     'root': {
         'handlers': ['console', 'file'],
@@ -278,3 +502,4 @@ else:
     ALLOWED_HOSTS = ['*']
     LOGGING['loggers']['api']['level'] = 'DEBUG'
     CACHE_TIMES['search_results'] = 60
+    CACHE_TIMES['result_counts'] = 60
@@ -4,3 +4,15 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402 — après django.setup()
+
+from api.helpers.intake import start_intake_flusher  # noqa: E402
+from api.helpers.sessions import start_session_sweeper  # noqa: E402
+
+start_session_sweeper()
+start_intake_flusher()
+
+if settings.CACHE_INVALIDATION['in_process']:
+    from api.helpers.invalidation import start_watchers
+    start_watchers()
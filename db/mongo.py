@@ -2,21 +2,54 @@
 ============================================
 DB/MONGO.PY — Connexion MongoDB avec pooling
 ============================================
+Lectures catalogue : read preference par store (MONGODB_CONFIG[store]['read_preference'],
+défaut secondaryPreferred + maxStalenessSeconds, cf. MONGODB_READS) pour ne pas
+concurrencer les écritures des scrapers sur le primaire. Les écritures (offres
+comparatif) vont toujours au primaire.
+Les agrégations de recherche demandent get_col(hedged=True) : hedged reads si
+MONGODB_READS['hedged_search'] (mongos uniquement ; ignoré sur un replica set simple).
 """
 import logging
 import threading
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
 from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .monitoring import listeners_for
 
 logger = logging.getLogger(__name__)
 
+READ_MODES = {
+    'primary': Primary,
+    'primaryPreferred': PrimaryPreferred,
+    'secondary': Secondary,
+    'secondaryPreferred': SecondaryPreferred,
+    'nearest': Nearest,
+}
+
+
+def read_preference_for(store_name: str, hedged: bool = False):
+    """Read preference des lectures d'un store (hedged : agrégations de recherche)."""
+    reads = settings.MONGODB_READS
+    mode = settings.MONGODB_CONFIG[store_name].get('read_preference') or reads['read_preference']
+    if mode not in READ_MODES:
+        raise ImproperlyConfigured(f"Read preference inconnue pour {store_name} : {mode}")
+    if mode == 'primary':
+        return Primary()
+    kwargs = {'max_staleness': reads['max_staleness']}
+    if hedged and reads['hedged_search']:
+        kwargs['hedge'] = {'enabled': True}
+    return READ_MODES[mode](**kwargs)
+
 
 class MongoDBPool:
     """Singleton — connexion poolée par store."""
     _instance = None
     _lock = threading.Lock()
     _clients = {}
+    _read_prefs = {}  # (store, hedged) → ReadPreference
 
     def __new__(cls):
         if cls._instance is None:
@@ -40,42 +73,65 @@ class MongoDBPool:
                             connectTimeoutMS=10000,
                             socketTimeoutMS=20000,
                             retryWrites=True,
+                            event_listeners=listeners_for(store_name),
                         )
                         client.admin.command('ping')
                         self._clients[store_name] = client
-                        logger.info(f"MongoDB connecté : {store_name}")
+                        logger.info("MongoDB connecté : %s", store_name)
                     except (ConnectionFailure, ServerSelectionTimeoutError) as e:
-                        logger.error(f"MongoDB erreur {store_name}: {e}")
+                        logger.error("MongoDB erreur %s: %s", store_name, e)
                         raise
         return self._clients[store_name]
 
-    def get_collection(self, store_name: str):
+    def register_client(self, store_name: str, client) -> None:
+        """
+        Remplace le client d'un store (benchmarks, stand-in en mémoire).
+        Le client n'est pas pingé : il est supposé déjà prêt.
+        """
+        with self._lock:
+            self._clients[store_name] = client
+
+    def read_preference(self, store_name: str, hedged: bool = False):
+        key = (store_name, hedged)
+        if key not in self._read_prefs:
+            self._read_prefs[key] = read_preference_for(store_name, hedged)
+        return self._read_prefs[key]
+
+    def get_collection(self, store_name: str, hedged: bool = False):
         client = self.get_client(store_name)
         cfg = settings.MONGODB_CONFIG[store_name]
-        return client[cfg['db']][cfg['collection']]
+        return client[cfg['db']].get_collection(
+            cfg['collection'], read_preference=self.read_preference(store_name, hedged))
 
 
 # Instance globale
 _pool = MongoDBPool()
 
 
-def get_tunisianet():
-    return _pool.get_collection('tunisianet')
+def get_tunisianet(hedged: bool = False):
+    return _pool.get_collection('tunisianet', hedged)
 
-def get_mytek():
-    return _pool.get_collection('mytek')
+def get_mytek(hedged: bool = False):
+    return _pool.get_collection('mytek', hedged)
 
-def get_spacenet():
-    return _pool.get_collection('spacenet')
+def get_spacenet(hedged: bool = False):
+    return _pool.get_collection('spacenet', hedged)
 
 def get_comparatif():
     return _pool.get_collection('comparatif')
 
+def get_comparatif_offers():
+    """Collection sidecar des offres comparatif matérialisées (même base que comparatif)."""
+    client = _pool.get_client('comparatif')
+    cfg = settings.MONGODB_CONFIG['comparatif']
+    return client[cfg['db']].get_collection(
+        cfg['offers_collection'], read_preference=_pool.read_preference('comparatif'))
+
 def get_categories_config():
     """Retourne la collection categories_config depuis la base Mytek."""
     client = _pool.get_client('mytek')
     cfg = settings.MONGODB_CONFIG['mytek']
-    return client[cfg['db']]['categories_config']
+    return client[cfg['db']].get_collection('categories_config', read_preference=_pool.read_preference('mytek'))
 
 def get_all_stores():
     """Retourne [(fonction_collection, nom_store), ...]"""
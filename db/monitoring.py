@@ -0,0 +1,105 @@
+"""
+============================================
+DB/MONITORING.PY — Listeners pymongo
+============================================
+Branchés sur chaque MongoClient créé par MongoDBPool (un jeu de listeners par store) :
+- CommandMetrics : latence de chaque commande MongoDB (find, aggregate, getMore…)
+- PoolMetrics    : attente de checkout, connexions empruntées, checkouts en échec
+- SlowQueryListener (db/slow_queries.py) : journal des requêtes lentes + explain
+"""
+from pymongo import monitoring
+
+from api.helpers.metrics import counter, gauge, histogram
+from .slow_queries import SlowQueryListener
+
+MONGO_COMMAND_SECONDS = histogram(
+    'toprix_mongo_command_duration_seconds',
+    "Latence des commandes MongoDB par store",
+    ('store', 'command'),
+)
+MONGO_COMMAND_FAILURES = counter(
+    'toprix_mongo_command_failures_total',
+    "Commandes MongoDB en échec par store",
+    ('store', 'command'),
+)
+POOL_CHECKOUT_SECONDS = histogram(
+    'toprix_mongo_pool_checkout_wait_seconds',
+    "Attente pour obtenir une connexion du pool MongoDB",
+    ('store',),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0),
+)
+POOL_CHECKED_OUT = gauge(
+    'toprix_mongo_pool_checked_out',
+    "Connexions MongoDB actuellement empruntées (maxPoolSize=20)",
+    ('store',),
+)
+POOL_CHECKOUT_FAILURES = counter(
+    'toprix_mongo_pool_checkout_failures_total',
+    "Checkouts de connexion en échec (timeout = pool saturé)",
+    ('store', 'reason'),
+)
+
+# Commandes de service à ne pas compter comme requêtes applicatives
+IGNORED_COMMANDS = {'hello', 'ismaster', 'isMaster', 'ping', 'endSessions', 'saslStart', 'saslContinue'}
+
+
+class CommandMetrics(monitoring.CommandListener):
+
+    def __init__(self, store_name: str):
+        self.store = store_name
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        if event.command_name not in IGNORED_COMMANDS:
+            MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, store=self.store, command=event.command_name)
+
+    def failed(self, event):
+        if event.command_name not in IGNORED_COMMANDS:
+            MONGO_COMMAND_FAILURES.inc(store=self.store, command=event.command_name)
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+
+    def __init__(self, store_name: str):
+        self.store = store_name
+
+    def connection_checked_out(self, event):
+        POOL_CHECKED_OUT.inc(store=self.store)
+        POOL_CHECKOUT_SECONDS.observe(getattr(event, 'duration', 0.0), store=self.store)
+
+    def connection_checked_in(self, event):
+        POOL_CHECKED_OUT.dec(store=self.store)
+
+    def connection_check_out_failed(self, event):
+        POOL_CHECKOUT_FAILURES.inc(store=self.store, reason=event.reason)
+
+    # Événements non exploités
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+
+def listeners_for(store_name: str) -> list:
+    return [CommandMetrics(store_name), PoolMetrics(store_name), SlowQueryListener(store_name)]
@@ -0,0 +1,207 @@
+"""
+============================================
+DB/SLOW_QUERIES.PY — Journal des requêtes lentes
+============================================
+Listener pymongo branché sur chaque client de MongoDBPool.
+
+Pour toute commande (find, aggregate, distinct, count…) plus lente que
+SLOW_QUERY['threshold_ms'] :
+- forme de la requête (filtre / pipeline, littéraux remplacés par "?")
+- store, base, collection, durée
+- résumé de explain('executionStats') : plan gagnant (COLLSCAN / IXSCAN + index),
+  docs et clés examinés, docs retournés
+
+Garde-fous :
+- échantillonnage (sample_rate) et plafond d'entrées par minute (max_per_minute)
+- un seul explain par forme de requête toutes les `explain_interval` secondes
+- explain exécuté dans un thread dédié (file bornée) : jamais sur le thread de la requête
+- explain envoyé avec la read preference du store (MONGODB_CONFIG[store]['read_preference'])
+
+Sortie : logger `api.slow_queries` → logs/slow_queries.log (rotatif).
+"""
+import hashlib
+import json
+import logging
+import queue
+import random
+import threading
+import time
+
+from django.conf import settings
+from pymongo import monitoring
+
+logger = logging.getLogger('api.slow_queries')
+
+# Champs de commande utiles pour rejouer un explain (le reste = session, cluster time…)
+EXPLAIN_FIELDS = ('filter', 'projection', 'sort', 'limit', 'skip', 'pipeline', 'key', 'query',
+                  'cursor', 'hint', 'collation', 'allowDiskUse', 'maxTimeMS')
+SHAPE_FIELDS = ('filter', 'projection', 'sort', 'pipeline', 'key', 'query', 'hint')
+WATCHED_COMMANDS = {'find', 'aggregate', 'distinct', 'count'}
+
+
+def query_shape(value):
+    """Remplace les littéraux par "?" en gardant la structure (opérateurs, champs, étapes)."""
+    if isinstance(value, dict):
+        return {k: query_shape(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        if value and all(isinstance(v, dict) for v in value):
+            return [query_shape(v) for v in value]
+        return ['?'] if value else []
+    return '?'
+
+
+def _find_key(node, key):
+    """Premier sous-document `key` rencontré (parcours en profondeur, hors plans rejetés)."""
+    if isinstance(node, dict):
+        if isinstance(node.get(key), dict):
+            return node[key]
+        children = [v for k, v in node.items() if k not in ('rejectedPlans', 'allPlansExecution')]
+    elif isinstance(node, list):
+        children = node
+    else:
+        return None
+    for child in children:
+        found = _find_key(child, key)
+        if found is not None:
+            return found
+    return None
+
+
+def _plan_summary(explain: dict) -> dict:
+    """
+    Résumé d'un explain('executionStats') — find et aggregate ($cursor) :
+    étapes du plan gagnant (ex : ['FETCH', 'IXSCAN(brand_1)'] ou ['COLLSCAN']) + compteurs.
+    """
+    stages = []
+    node = _find_key(explain, 'winningPlan')
+    while isinstance(node, dict):
+        if node.get('stage'):
+            stages.append(f"{node['stage']}({node['indexName']})" if node.get('indexName') else node['stage'])
+        node = node.get('inputStage') or (node.get('inputStages') or [None])[0] or node.get('queryPlan')
+
+    stats = _find_key(explain, 'executionStats') or {}
+    return {
+        'plan': stages,
+        **{k: stats.get(k) for k in ('nReturned', 'executionTimeMillis', 'totalKeysExamined', 'totalDocsExamined')},
+    }
+
+
+class _RateLimiter:
+    """Plafond d'événements par fenêtre glissante d'une minute."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._window_start = 0.0
+        self._count = 0
+
+    def allow(self, per_minute: int) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if now - self._window_start >= 60:
+                self._window_start, self._count = now, 0
+            if self._count >= per_minute:
+                return False
+            self._count += 1
+            return True
+
+
+class _ExplainWorker:
+    """Thread unique qui exécute les explain en arrière-plan (file bornée, surplus ignoré)."""
+
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=50)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, job) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='slow-query-explain', daemon=True)
+                self._thread.start()
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            pass
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                job()
+            except Exception as e:
+                logger.warning("explain impossible : %s", e)
+
+
+_limiter = _RateLimiter()
+_explainer = _ExplainWorker()
+_last_explain = {}  # hash de forme → timestamp du dernier explain
+_last_explain_lock = threading.Lock()
+
+
+class SlowQueryListener(monitoring.CommandListener):
+
+    def __init__(self, store_name: str):
+        self.store = store_name
+        self._pending = {}  # request_id → commande (libérée au succès / à l'échec)
+
+    def started(self, event):
+        if event.command_name in WATCHED_COMMANDS:
+            self._pending[event.request_id] = event.command
+
+    def failed(self, event):
+        self._pending.pop(event.request_id, None)
+
+    def succeeded(self, event):
+        command = self._pending.pop(event.request_id, None)
+        if command is None:
+            return
+        cfg = settings.SLOW_QUERY
+        duration_ms = event.duration_micros / 1000
+        if duration_ms < cfg['threshold_ms'] or random.random() >= cfg['sample_rate']:
+            return
+        if not _limiter.allow(cfg['max_per_minute']):
+            return
+
+        collection = command.get(event.command_name)
+        shape = {k: query_shape(command[k]) for k in SHAPE_FIELDS if k in command}
+        shape_json = json.dumps(shape, sort_keys=True, default=str)
+        entry = {
+            'store': self.store,
+            'database': event.database_name,
+            'collection': collection,
+            'command': event.command_name,
+            'duration_ms': round(duration_ms, 1),
+            'shape': shape,
+        }
+
+        shape_hash = hashlib.md5(f"{self.store}:{collection}:{event.command_name}:{shape_json}".encode()).hexdigest()
+        now = time.monotonic()
+        with _last_explain_lock:
+            if len(_last_explain) > 1000:
+                _last_explain.clear()
+            due = cfg['explain'] and now - _last_explain.get(shape_hash, -1e9) >= cfg['explain_interval']
+            if due:
+                _last_explain[shape_hash] = now
+
+        if not due:
+            logger.warning("slow_query %s", json.dumps(entry, ensure_ascii=False, default=str))
+            return
+
+        explain_cmd = {event.command_name: collection}
+        explain_cmd.update({k: command[k] for k in EXPLAIN_FIELDS if k in command})
+        _explainer.submit(lambda: self._explain(event.database_name, explain_cmd, entry))
+
+    def _explain(self, database: str, explain_cmd: dict, entry: dict) -> None:
+        from db.mongo import MongoDBPool  # import tardif : db.mongo importe ce module
+
+        try:
+            pool = MongoDBPool()
+            # Même read preference que les lectures du store : l'explain vise le même type de
+            # membre que la requête lente (secondaire), sans charge ajoutée sur le primaire
+            result = pool.get_client(self.store)[database].command(
+                'explain', explain_cmd, verbosity='executionStats',
+                read_preference=pool.read_preference(self.store))
+            entry['explain'] = _plan_summary(result)
+        except Exception as e:
+            entry['explain_error'] = str(e)
+        logger.warning("slow_query %s", json.dumps(entry, ensure_ascii=False, default=str))